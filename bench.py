@@ -0,0 +1,404 @@
+"""
+Benchmarks del camino de datos: sync, loader, PDF y render del histórico.
+
+Corre contra fake_api.py (datos sintéticos con seed fijo, así que dos corridas
+con el mismo seed piden exactamente los mismos records) en un directorio
+temporal: no toca los caches, tokens ni ~/.garmin_tokens reales.
+
+Para cada benchmark y escala (1, 12 y 60 meses cerrados hasta el mes pasado):
+    cold   primera corrida con caches vacíos (st.cache_data, json_cache, PDF LRU,
+           store diario de Garmin)
+    warm   --repeat corridas más con los caches ya llenos: p50 / p90 / max
+    http   requests que recibió el servidor (cold y promedio warm)
+    peak   pico de memoria de Python (tracemalloc) en una corrida cold aparte
+
+Benchmarks:
+    whoop_monthly_summary   WhoopClientV2.get_monthly_summary mes por mes
+    garmin_sync_month       garmin_sync.sync_month mes por mes (cold = store vacío)
+    get_monthly_data        data_loader.get_monthly_data mes por mes (desde los caches)
+    historico_pdf           get_historico_pdf por año (cold = generate, warm = LRU)
+    historico_render        views.historico.show por año (AppTest; enero a fin de ventana)
+
+Uso:
+    python bench.py                          # escalas 1,12,60 -> bench_results.json
+    python bench.py --scales 1,12 --repeat 3 --latency 0.02 --out /tmp/bench.json
+    python bench.py --only get_monthly_data,historico_pdf
+    python bench.py --compare bench_results.json    # además compara p50 warm contra otra corrida
+"""
+
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+
+DEFAULT_SCALES = (1, 12, 60)
+DEFAULT_REPEAT = 5
+DEFAULT_OUT = 'bench_results.json'
+SEED = 3
+
+BENCHMARKS = (
+    'whoop_monthly_summary',
+    'garmin_sync_month',
+    'get_monthly_data',
+    'historico_pdf',
+    'historico_render',
+)
+# Estos leen whoop_cache.json / garmin_cache.json: antes se llenan con prime()
+READS_CACHES = ('get_monthly_data', 'historico_pdf', 'historico_render')
+
+
+def percentile(values, pct):
+    """Percentil por nearest-rank (suficiente para pocas muestras)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[rank - 1]
+
+
+def window(n_months, today=None):
+    """Los n meses cerrados que terminan el mes pasado: [(year, month)]."""
+    today = today or date.today()
+    year, month = today.year, today.month
+    months = []
+    for _ in range(n_months):
+        month -= 1
+        if month == 0:
+            year, month = year - 1, 12
+        months.append((year, month))
+    return months[::-1]
+
+
+def by_year(months):
+    """{year: [month, ...]} respetando el orden."""
+    years = {}
+    for year, month in months:
+        years.setdefault(year, []).append(month)
+    return years
+
+
+class Env:
+    """fake_api + directorio temporal + módulos del proyecto apuntando ahí."""
+
+    def __init__(self, scales, latency):
+        import fake_api
+
+        self.tmp = tempfile.mkdtemp(prefix='bench_')
+        oldest = window(max(scales))[0]
+        self.server = fake_api.start(seed=SEED, since=date(oldest[0], oldest[1], 1), latency=latency)
+
+        # Antes de importar config / clientes: leen las URLs y tokens del entorno
+        os.environ.update(self.server.env())
+        os.environ['HOME'] = self.tmp
+        os.environ.setdefault('WHOOP_CLIENT_ID', 'bench')
+        os.environ['WHOOP_TOKENS_JSON'] = json.dumps({
+            'access_token': fake_api.FAKE_TOKENS['whoop_access'],
+            'refresh_token': fake_api.FAKE_TOKENS['whoop_refresh'],
+        })
+        os.environ['GARMIN_TOKENS_JSON'] = json.dumps({
+            'garmin_tokens.json': {'di_token': fake_api.FAKE_TOKENS['garmin_di']},
+        })
+        # WhoopAuth escribe whoop_tokens.json en el cwd
+        os.chdir(self.tmp)
+
+        # Streamlit fuera de `streamlit run` avisa en cada función cacheada
+        logging.disable(logging.WARNING)
+
+        import data_loader
+        import garmin_client
+        import rate_limit
+        import garmin_store
+        import garmin_sync
+        import whoop_checkpoint
+        import whoop_streamlit
+        import whoop_sync
+
+        # Caches del proyecto al directorio temporal
+        whoop_sync.CACHE_FILE = whoop_streamlit.CACHE_FILE = os.path.join(self.tmp, 'whoop_cache.json')
+        garmin_sync.CACHE_FILE = data_loader.GARMIN_CACHE_FILE = os.path.join(self.tmp, 'garmin_cache.json')
+        garmin_store.STORE_FILE = os.path.join(self.tmp, 'garmin_days.json')
+        garmin_client.TOKENSTORE = os.path.join(self.tmp, '.garmin_tokens')
+        # Un bench cortado no deja páginas sintéticas que retome un sync real
+        whoop_checkpoint.CHECKPOINT_DIR = os.path.join(self.tmp, 'whoop_checkpoints')
+
+        # Sin rate limit ni presupuesto: se mide el código, no la espera a la API
+        for limits in rate_limit.PROVIDER_LIMITS.values():
+            limits.update(rate=1e6, burst=1e6, budget=None, budget_window=None)
+
+    def http_calls(self):
+        return self.server.api.stats()['total']
+
+    def reset_caches(self):
+        """Vacía todos los caches en memoria (no los archivos)."""
+        import streamlit as st
+        import json_cache
+        import pdf_export
+
+        st.cache_data.clear()
+        json_cache.invalidate()
+        with pdf_export._pdf_cache_lock:
+            pdf_export._pdf_cache.clear()
+
+    def close(self):
+        self.server.stop()
+
+
+def _quiet(fn, *args):
+    """fn(*args) sin los prints del sync / loader (ensucian la tabla)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args)
+
+
+def calendar_months(months):
+    """Los meses que muestra el histórico para la ventana: de enero al último mes de cada año."""
+    return [(year, month) for year, year_months in by_year(months).items() for month in range(1, max(year_months) + 1)]
+
+
+def prime(env, months):
+    """Llena whoop_cache.json y garmin_cache.json para los meses que falten (sin medir)."""
+    import garmin_client
+    import garmin_sync
+    import whoop_sync
+    from whoop_client_v2_corrected import WhoopClientV2
+
+    whoop_cache = whoop_sync.load_cache()
+    missing = [(y, m) for y, m in months if f"{y}-{m:02d}" not in whoop_cache]
+    if missing:
+        whoop = WhoopClientV2()
+        for year, year_months in by_year(missing).items():
+            whoop_cache = _quiet(whoop_sync.sync_months, whoop, year, year_months, whoop_cache)
+        _quiet(whoop_sync.save_cache, whoop_cache)
+
+    garmin_cache = garmin_sync.load_cache()
+    missing = [(y, m) for y, m in months if f"{y}-{m:02d}" not in garmin_cache]
+    if missing:
+        garmin = garmin_client.get_client()
+        for year, month in missing:
+            garmin_cache = _quiet(garmin_sync.sync_month, garmin, year, month, garmin_cache)
+        _quiet(garmin_sync.save_cache, garmin_cache)
+
+
+# ============ BENCHMARKS ============
+# Cada uno devuelve (setup_cold, run): setup_cold() deja el estado "cold" y
+# run() ejecuta una corrida completa para la escala.
+
+def _whoop_monthly_summary(env, months):
+    from whoop_client_v2_corrected import WhoopClientV2
+
+    client = WhoopClientV2()
+
+    def run():
+        for year, month in months:
+            client.get_monthly_summary(year, month)
+
+    return env.reset_caches, run
+
+
+def _garmin_sync_month(env, months):
+    import garmin_client
+    import garmin_store
+    import garmin_sync
+
+    def setup_cold():
+        env.reset_caches()
+        garmin_client.reset_client()
+        if os.path.exists(garmin_store.STORE_FILE):
+            os.remove(garmin_store.STORE_FILE)
+
+    def run():
+        garmin = garmin_client.get_client()
+        cache = garmin_sync.load_cache()
+        for year, month in months:
+            cache = garmin_sync.sync_month(garmin, year, month, cache)
+
+    return setup_cold, run
+
+
+def _get_monthly_data(env, months):
+    from data_loader import get_monthly_data
+
+    def run():
+        for year, month in months:
+            get_monthly_data(year, month)
+
+    return env.reset_caches, run
+
+
+def _year_data(months):
+    from data_loader import get_year_data
+    return {
+        year: get_year_data(year, tuple(year_months))
+        for year, year_months in by_year(months).items()
+    }
+
+
+def _historico_pdf(env, months):
+    import goals_setup
+    from pdf_export import get_historico_pdf
+
+    metas = goals_setup.get_user_goals()
+    data = _quiet(_year_data, months)
+
+    def run():
+        for year, year_months in by_year(months).items():
+            get_historico_pdf(data[year], metas, year_months, year)
+
+    return env.reset_caches, run
+
+
+def _render_historico(year, current_month):
+    import goals_setup
+    from views import historico
+    historico.show(goals_setup.get_user_goals(), current_month, year)
+
+
+def _historico_render(env, months):
+    from streamlit.testing.v1 import AppTest
+
+    # historico.show muestra los meses 1..current_month-1 del año
+    apps = [
+        AppTest.from_function(_render_historico, args=(year, max(year_months) + 1), default_timeout=120)
+        for year, year_months in by_year(months).items()
+    ]
+
+    def run():
+        for app in apps:
+            app.run()
+            if app.exception:
+                raise RuntimeError(app.exception[0].message)
+
+    return env.reset_caches, run
+
+
+_BENCH_FUNCS = {
+    'whoop_monthly_summary': _whoop_monthly_summary,
+    'garmin_sync_month': _garmin_sync_month,
+    'get_monthly_data': _get_monthly_data,
+    'historico_pdf': _historico_pdf,
+    'historico_render': _historico_render,
+}
+
+
+def _timed(env, run):
+    calls = env.http_calls()
+    start = time.perf_counter()
+    _quiet(run)
+    return time.perf_counter() - start, env.http_calls() - calls
+
+
+def bench_one(env, name, n_months, repeat):
+    months = window(n_months)
+    setup_cold, run = _BENCH_FUNCS[name](env, months)
+
+    setup_cold()
+    cold_s, cold_http = _timed(env, run)
+
+    warm = [_timed(env, run) for _ in range(repeat)]
+    warm_s = [elapsed for elapsed, _ in warm]
+
+    # Pico de memoria en una corrida cold aparte (tracemalloc distorsiona los tiempos)
+    setup_cold()
+    tracemalloc.start()
+    _quiet(run)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'months': n_months,
+        'cold_s': round(cold_s, 4),
+        'warm_p50_s': round(percentile(warm_s, 50), 4) if warm_s else None,
+        'warm_p90_s': round(percentile(warm_s, 90), 4) if warm_s else None,
+        'warm_max_s': round(max(warm_s), 4) if warm_s else None,
+        'http_cold': cold_http,
+        'http_warm_avg': round(sum(calls for _, calls in warm) / len(warm), 1) if warm else None,
+        'peak_mb': round(peak / 1024 / 1024, 2),
+    }
+
+
+def _format_row(name, r):
+    ms = lambda s: f"{s * 1000:9.1f}" if s is not None else f"{'-':>9}"
+    return (f"{name:<22} {r['months']:>4} {ms(r['cold_s'])} {ms(r['warm_p50_s'])} {ms(r['warm_p90_s'])} "
+            f"{r['http_cold']:>6} {r['http_warm_avg'] if r['http_warm_avg'] is not None else '-':>7} "
+            f"{r['peak_mb']:>8.2f}")
+
+
+def compare(results, baseline_path):
+    """Imprime el cambio de p50 warm (o cold) contra otra corrida."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    old = {(r['name'], r['months']): r for r in baseline.get('results', [])}
+    print(f"\n[COMPARE] vs {baseline_path} ({baseline.get('created_at', '?')})")
+    for r in results:
+        before = old.get((r['name'], r['months']))
+        if not before:
+            continue
+        key = 'warm_p50_s' if r['warm_p50_s'] and before.get('warm_p50_s') else 'cold_s'
+        if not before.get(key):
+            continue
+        change = (r[key] - before[key]) / before[key] * 100
+        print(f"   {r['name']:<22} {r['months']:>4}m {key:<10} {before[key] * 1000:9.1f} -> "
+              f"{r[key] * 1000:9.1f} ms ({change:+.0f}%)")
+
+
+def _arg(args, name, default):
+    if name in args:
+        idx = args.index(name)
+        if idx + 1 < len(args):
+            return args[idx + 1]
+    return default
+
+
+def main():
+    args = sys.argv[1:]
+    scales = tuple(int(s) for s in _arg(args, '--scales', ','.join(map(str, DEFAULT_SCALES))).split(','))
+    repeat = int(_arg(args, '--repeat', DEFAULT_REPEAT))
+    latency = float(_arg(args, '--latency', 0.0))
+    out = os.path.abspath(_arg(args, '--out', DEFAULT_OUT))
+    baseline = _arg(args, '--compare', None)
+    baseline = os.path.abspath(baseline) if baseline else None
+    names = _arg(args, '--only', None)
+    names = names.split(',') if names else BENCHMARKS
+
+    env = Env(scales, latency)
+    results = []
+    print(f"{'benchmark':<22} {'mes':>4} {'cold ms':>9} {'p50 ms':>9} {'p90 ms':>9} "
+          f"{'http':>6} {'http/w':>7} {'peak MB':>8}")
+    try:
+        for n_months in scales:
+            primed = False
+            for name in BENCHMARKS:
+                if name not in names:
+                    continue
+                if name in READS_CACHES and not primed:
+                    prime(env, calendar_months(window(n_months)))
+                    primed = True
+                result = bench_one(env, name, n_months, repeat)
+                results.append({'name': name, **result})
+                print(_format_row(name, result))
+    finally:
+        env.close()
+
+    report = {
+        'created_at': datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'seed': SEED,
+        'latency_s': latency,
+        'repeat': repeat,
+        'results': results,
+    }
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n>> Resultados en: {out}")
+
+    if baseline:
+        compare(results, baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -72,3 +72,19 @@ if not GARMIN_EMAIL or not GARMIN_PASSWORD:
         GARMIN_PASSWORD = GARMIN_PASSWORD or _garmin.get('password', '')
 
 WHOOP_REDIRECT_URI = 'http://localhost:8000/callback'
+
+# Panel DEBUG · MÉTRICAS del dashboard (métricas de todo el proceso): solo si
+# FITNESS_DEBUG=1 o [debug] enabled = true en secrets, nunca para cualquier visitante
+DEBUG_PANEL = os.environ.get('FITNESS_DEBUG', '') == '1'
+if not DEBUG_PANEL:
+    try:
+        import streamlit as st
+        DEBUG_PANEL = bool(st.secrets.get("debug", {}).get("enabled", False))
+    except Exception:
+        DEBUG_PANEL = bool(_load_secrets_toml().get('debug', {}).get('enabled', False))
+
+# Base URLs de las APIs. Override por env var para apuntar a un servidor local
+# (fake_api.py) en tests y benchmarks. GARMIN_API_BASE vacío = la de garminconnect.
+WHOOP_API_BASE = os.environ.get('WHOOP_API_BASE', 'https://api.prod.whoop.com/developer/v2').rstrip('/')
+WHOOP_OAUTH_BASE = os.environ.get('WHOOP_OAUTH_BASE', 'https://api.prod.whoop.com/oauth/oauth2').rstrip('/')
+GARMIN_API_BASE = os.environ.get('GARMIN_API_BASE', '').rstrip('/')
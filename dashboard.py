@@ -5,11 +5,13 @@ import streamlit as st
 from datetime import datetime
 from calendar import monthrange
 
+import config
 from goals_setup import get_user_goals, has_goals, show_goals_setup
-from data_loader import get_monthly_data
+from data_loader import get_monthly_data_swr, refresh_pending, invalidate_current_month
 import views.mes_actual as view_mes
 import views.historico as view_historico
 import views.meditacion as view_meditacion
+import views.debug as view_debug
 
 st.set_page_config(
     page_title="Fitness Tracker",
@@ -303,7 +305,8 @@ with col_nav4:
 
 with col_nav5:
     if st.button("ACTUALIZAR", use_container_width=True):
-        st.cache_data.clear()
+        # Solo el mes en curso: los meses cerrados se invalidan solos con el cron
+        invalidate_current_month()
         st.rerun()
 
 st.divider()
@@ -313,12 +316,28 @@ if st.session_state.vista == "metas":
     show_goals_setup(first_time=False)
 
 elif st.session_state.vista == "mes":
-    with st.spinner(''):
-        data = get_monthly_data(current_year, current_month)
-    view_mes.show(data, metas, days_elapsed, days_in_month, progress_pct, current_month, current_year)
+    # SWR: se pinta al instante desde el cache y los datos live reemplazan a
+    # los del cache cuando termina el refresh en background.
+    data, refreshing = get_monthly_data_swr(current_year, current_month)
+    view_mes.show(data, metas, days_elapsed, days_in_month, progress_pct, current_month, current_year,
+                  refreshing=refreshing)
+
+    if refreshing:
+        @st.fragment(run_every=2)
+        def _wait_for_live_data():
+            if not refresh_pending(current_year, current_month):
+                st.rerun()
+
+        _wait_for_live_data()
 
 elif st.session_state.vista == "historico":
     view_historico.show(metas, current_month, current_year)
 
 elif st.session_state.vista == "mente":
     view_meditacion.show(metas, current_month, current_year, days_elapsed, days_in_month)
+
+# ============ DEBUG ============
+if config.DEBUG_PANEL:
+    st.divider()
+    with st.expander("DEBUG · MÉTRICAS"):
+        view_debug.show()
@@ -1,21 +1,28 @@
 """
-Carga de datos mensuales: Garmin + WHOOP.
-Intenta API live primero, luego cae a cache local.
+Carga de datos mensuales: Garmin + WHOOP + meditacion.
+Mes en curso: intenta API live primero, luego cae a cache local. Meses
+cerrados: desde los caches locales. Las fuentes se cargan en paralelo, cada
+una con su propio timeout (ver POLÍTICA DE CACHE para los TTLs).
 """
-import json
 import os
+import threading
+import time
 import streamlit as st
-from datetime import datetime, timedelta
+import garmin_store
+import json_cache
+import metrics
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, wait
+from datetime import datetime
 from calendar import monthrange
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+
+GARMIN_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'garmin_cache.json')
 
 
 def _load_garmin_cache():
-    """Load Garmin data from local cache file (fallback)."""
-    cache_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'garmin_cache.json')
-    if os.path.exists(cache_path):
-        with open(cache_path, 'r') as f:
-            return json.load(f)
-    return {}
+    """Load Garmin data from local cache file (fallback). Read-only (json_cache)."""
+    return json_cache.read_json(GARMIN_CACHE_FILE)
 
 
 def _garmin_has_tokens():
@@ -29,55 +36,165 @@ def _get_garmin_live(year, month, start_date, end_date):
     """Fetch Garmin data live from API. Raises on failure."""
     if not _garmin_has_tokens():
         raise Exception("No Garmin tokens saved. Run: source .venv/bin/activate && python garmin_sync.py")
-    from garmin_client import GarminClient
-    garmin = GarminClient()
-    garmin.login()
-
-    total_steps = 0
-    days_with_steps = 0
-    current_date = start_date
-    while current_date <= end_date:
-        try:
-            stats = garmin.get_stats_for_date(current_date)
-            if stats and stats.get('totalSteps'):
-                total_steps += stats['totalSteps']
-                days_with_steps += 1
-        except Exception:
-            pass
-        current_date += timedelta(days=1)
-
-    steps_avg = round(total_steps / days_with_steps) if days_with_steps > 0 else 0
-
-    all_activities = garmin.get_activities(start_date, end_date)
-    activities_count = 0
-    strength_count = 0
-
-    for activity in all_activities:
-        activity_date_str = activity.get('startTimeLocal', '')
-        if activity_date_str:
-            activity_date = datetime.strptime(activity_date_str[:10], '%Y-%m-%d')
-            if activity_date.year == year and activity_date.month == month:
-                activity_type = activity.get('activityType', {}).get('typeKey', '').lower()
-                if 'breath' not in activity_type and 'meditation' not in activity_type:
-                    activities_count += 1
-                    if any(kw in activity_type for kw in ['strength', 'training', 'gym', 'weight']):
-                        strength_count += 1
+    from garmin_client import get_client
+    # Cliente compartido por el proceso: login una sola vez, no en cada rerun
+    garmin = get_client()
+
+    # Solo se piden los días que faltan en el store (+ hoy y ayer)
+    store = garmin_store.load_store()
+    fetched = garmin_store.update_store(store, garmin, start_date, end_date)
+    if fetched:
+        garmin_store.save_store(store)
+    steps_avg, activities_count, strength_count, _ = garmin_store.month_summary(store, year, month, end_date)
 
     return steps_avg, activities_count, strength_count
 
 
-@st.cache_data(ttl=60)
-def get_monthly_data(year, month):
-    today = datetime.now()
-    current_year = today.year
-    current_month = today.month
+# Timeout (segundos) por fuente: si una fuente se pasa, se usa su cache y las
+# demás no la esperan.
+SOURCE_TIMEOUTS = {
+    'meditation': 5,
+    'garmin': 45,
+    'whoop': 30,
+}
+
+# Executor compartido y acotado: las tres fuentes corren en paralelo sin abrir
+# threads ilimitados en cada rerun.
+_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix='data_loader')
+
+# Los refresh SWR llaman a get_monthly_data, que a su vez espera tareas de
+# _EXECUTOR: van en su propio executor para no ocupar workers de las fuentes.
+_REFRESH_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix='data_loader_refresh')
+
+
+def _submit(fn, *args, executor=_EXECUTOR):
+    """Submit fn to the shared executor, propagating the Streamlit script context
+    (whoop_streamlit lee st.session_state desde el worker)."""
+    ctx = get_script_run_ctx()
+
+    def run():
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(*args)
+
+    return executor.submit(run)
+
+
+def _cached(layer, fn, *args):
+    """Llama a una función st.cache_data contando hit/miss de `layer` en
+    metrics (su cuerpo marca el miss; si no corrió, fue hit)."""
+    with metrics.cache_lookup(layer):
+        return fn(*args)
+
+
+def _garmin_from_cache(cache_key, garmin_cache=None):
+    """Garmin entry from garmin_cache.json (or an already loaded cache) as (values, source)."""
+    if garmin_cache is None:
+        garmin_cache = _load_garmin_cache()
+    if cache_key not in garmin_cache:
+        return None, 'NO DATA'
+    cached = garmin_cache[cache_key]
+    values = {
+        'steps_avg': cached.get('steps_avg', 0),
+        'activities': cached.get('activities', 0),
+        'strength': cached.get('strength', 0),
+    }
+    return values, f"CACHE ({cached.get('synced_at', '?')})"
+
+
+def _garmin_live_values(year, month, start_date, end_date):
+    steps_avg, activities, strength = _get_garmin_live(year, month, start_date, end_date)
+    return {'steps_avg': steps_avg, 'activities': activities, 'strength': strength}, 'LIVE'
+
+
+@metrics.timed('fetch.garmin')
+def _fetch_garmin(year, month, start_date, end_date):
+    """Garmin values for the current month as (values, source): live first,
+    fall back to cache."""
+    cache_key = f"{year}-{month:02d}"
+    try:
+        values, source = _garmin_live_values(year, month, start_date, end_date)
+        print(f"[GARMIN] {cache_key} fetched LIVE")
+        return values, source
+    except Exception as e:
+        print(f"[GARMIN] Live fetch failed for {cache_key}: {e}")
+    return _garmin_fallback(cache_key)
+
+
+def _garmin_fallback(cache_key):
+    """Cache fallback for the current month (live failed or timed out)."""
+    try:
+        values, source = _garmin_from_cache(cache_key)
+        if values is not None:
+            print(f"[GARMIN] {cache_key} loaded from CACHE")
+        else:
+            print(f"[GARMIN] No cache data for {cache_key}")
+        return values, source
+    except Exception as cache_err:
+        print(f"[GARMIN] Cache load failed: {cache_err}")
+        return None, 'NO DATA'
+
+
+@metrics.timed('fetch.meditation')
+def _fetch_meditation(year, month):
+    import meditation_log as _mlog
+    return _mlog.monthly_stats(year, month)
+
+
+@metrics.timed('fetch.whoop')
+def _fetch_whoop(year, month):
+    from whoop_streamlit import get_whoop_data
+    return get_whoop_data(year, month)
+
+
+def _whoop_live_values(year, month):
+    from whoop_streamlit import get_whoop_monthly_live
+    return get_whoop_monthly_live(year, month), 'LIVE'
+
+
+def _apply_meditation(data, mstats):
+    data['meditation_sessions'] = mstats['sessions_count']
+    data['meditation_minutes'] = mstats['minutes_total']
+
+
+def _apply_garmin(data, values, source):
+    if values:
+        data.update(values)
+    data['garmin_source'] = source
+
+
+def _apply_whoop(data, whoop, source):
+    data['whoop_source'] = source
+    if not whoop:
+        return
+
+    for raw_key, data_key in [('hr_zones_1_3_hours', 'hr_zone_1_3'), ('hr_zones_4_5_hours', 'hr_zone_4_5')]:
+        try:
+            raw = whoop.get(raw_key, 0)
+            data[data_key] = round(float(raw), 1) if raw is not None else 0
+        except (TypeError, ValueError):
+            data[data_key] = 0
+
+    data['sleep_hours_avg'] = round(whoop.get('sleep_hours_avg', 0), 1)
+    # Estos tres se muestran como enteros (sin decimales)
+    data['recovery_score'] = int(round(whoop.get('avg_recovery_score', 0) or 0))
+    data['resting_hr'] = int(round(whoop.get('avg_resting_hr', 0) or 0))
+    data['sleep_consistency'] = int(round(whoop.get('avg_sleep_consistency', 0) or 0))
+    data['meditation_days'] = int(whoop.get('meditation_days', 0) or 0)
+    data['sauna_days'] = int(whoop.get('sauna_days', 0) or 0)
+
+
+def _result(future, source_name, cache_key):
+    """future.result() con el timeout de la fuente. Re-raises on timeout."""
+    try:
+        return future.result(timeout=SOURCE_TIMEOUTS[source_name])
+    except FuturesTimeout:
+        print(f"[{source_name.upper()}] Timeout ({SOURCE_TIMEOUTS[source_name]}s) for {cache_key}")
+        raise
 
-    last_day = monthrange(year, month)[1]
-    is_current = (year == current_year and month == current_month)
-    start_date = datetime(year, month, 1)
-    end_date = today if is_current else datetime(year, month, last_day)
 
-    data = {
+def _empty_data(year, month):
+    return {
         'month': month, 'year': year,
         'steps_avg': 0, 'activities': 0, 'strength': 0,
         'sleep_hours_avg': 0,
@@ -89,81 +206,305 @@ def get_monthly_data(year, month):
         'garmin_source': 'NO DATA',
     }
 
+
+def _is_current_month(year, month):
+    today = datetime.now()
+    return year == today.year and month == today.month
+
+
+# ============ POLÍTICA DE CACHE ============
+# - Meses cerrados: no cambian hasta que el cron reescribe un archivo de cache,
+#   así que se cachean sin TTL con la versión (mtime, tamaño) de los archivos
+#   en la key.
+# - Mes en curso: TTL corto para el mes armado, y cada fuente live con su
+#   propio TTL (Garmin es más caro: login + store).
+# - Meses cerrados que faltan en un cache se piden live y se reintentan tras GAP_TTL.
+CURRENT_MONTH_TTL = 60
+SOURCE_TTLS = {
+    'garmin': 300,
+    'whoop': 120,
+}
+GAP_TTL = 600
+
+
+def _cache_versions():
+    """Versión de los archivos de los que salen los meses cerrados."""
+    import meditation_log as _mlog
+    from whoop_streamlit import CACHE_FILE as WHOOP_CACHE_FILE
+    return (
+        json_cache.file_version(GARMIN_CACHE_FILE),
+        json_cache.file_version(WHOOP_CACHE_FILE),
+        _mlog.version(),
+    )
+
+
+@st.cache_data(ttl=SOURCE_TTLS['garmin'], show_spinner=False)
+def _fetch_garmin_current(year, month):
+    metrics.cache_miss('garmin_current')
+    start_date = datetime(year, month, 1)
+    return _fetch_garmin(year, month, start_date, datetime.now())
+
+
+@st.cache_data(ttl=SOURCE_TTLS['whoop'], show_spinner=False)
+def _fetch_whoop_current(year, month):
+    metrics.cache_miss('whoop_current')
+    return _fetch_whoop(year, month)
+
+
+@st.cache_data(ttl=CURRENT_MONTH_TTL, show_spinner=False)
+def _get_current_month_data(year, month):
+    metrics.cache_miss('current_month')
+    cache_key = f"{year}-{month:02d}"
+    data = _empty_data(year, month)
+
+    # Las tres fuentes son independientes: se lanzan juntas y la página tarda
+    # lo que la más lenta (acotada por su timeout), no la suma.
+    meditation_future = _submit(_fetch_meditation, year, month)
+    garmin_future = _submit(_cached, 'garmin_current', _fetch_garmin_current, year, month)
+    whoop_future = _submit(_cached, 'whoop_current', _fetch_whoop_current, year, month)
+
+    # --- MEDITATION ---
     try:
-        import meditation_log as _mlog
-        _mstats = _mlog.monthly_stats(year, month)
-        data['meditation_sessions'] = _mstats['sessions_count']
-        data['meditation_minutes'] = _mstats['minutes_total']
+        _apply_meditation(data, _result(meditation_future, 'meditation', cache_key))
     except Exception as e:
         print(f"[MEDITATION] Failed to load monthly stats: {e}")
 
     # --- GARMIN ---
-    cache_key = f"{year}-{month:02d}"
+    try:
+        values, source = _result(garmin_future, 'garmin', cache_key)
+    except FuturesTimeout:
+        values, source = _garmin_fallback(cache_key)
+    except Exception as e:
+        print(f"[GARMIN] Fetch failed for {cache_key}: {e}")
+        values, source = None, 'NO DATA'
+    _apply_garmin(data, values, source)
+
+    # --- WHOOP ---
+    try:
+        whoop, source = _result(whoop_future, 'whoop', cache_key)
+    except FuturesTimeout:
+        from whoop_streamlit import get_whoop_cached
+        whoop, source = get_whoop_cached(year, month)
+    except Exception as e:
+        print(f"[WHOOP] Fetch failed for {cache_key}: {e}")
+        whoop, source = None, 'NO DATA'
+    _apply_whoop(data, whoop, source)
+
+    return data
+
+
+def get_monthly_data(year, month):
+    """Datos del mes (Garmin + WHOOP + meditacion).
+
+    Mes en curso: live primero, con fallback al cache. Meses cerrados: desde
+    los caches locales (ver get_year_data).
+    """
+    if _is_current_month(year, month):
+        return _cached('current_month', _get_current_month_data, year, month)
+    return get_year_data(year, (month,))[0]
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _closed_months_from_cache(year, months, cache_versions):
+    """Meses cerrados armados solo desde los archivos locales (sin red).
+
+    cache_versions (ver _cache_versions) solo entra en la key: cuando el cron
+    reescribe un cache cambia la versión y el resultado se recalcula.
+    Returns: ([data por mes], [(month, source_name) que faltan en su cache]).
+    """
+    metrics.cache_miss('closed_months')
+    with metrics.timer('fetch.closed_months'):
+        return _build_closed_months(year, months)
+
 
-    # Historical months: prefer cache (data won't change, avoids ~30 API calls per month)
-    # Current month: try live first, fall back to cache
-    if not is_current:
+def _build_closed_months(year, months):
+    import meditation_log as _mlog
+    from whoop_streamlit import load_whoop_cache, get_whoop_cached
+
+    try:
         garmin_cache = _load_garmin_cache()
-        if cache_key in garmin_cache:
-            cached = garmin_cache[cache_key]
-            data['steps_avg'] = cached.get('steps_avg', 0)
-            data['activities'] = cached.get('activities', 0)
-            data['strength'] = cached.get('strength', 0)
-            data['garmin_source'] = f"CACHE ({cached.get('synced_at', '?')})"
-            print(f"[GARMIN] {cache_key} loaded from CACHE (historical)")
+    except Exception as e:
+        print(f"[GARMIN] Cache load failed: {e}")
+        garmin_cache = {}
+    try:
+        whoop_cache = load_whoop_cache()
+    except Exception as e:
+        print(f"[WHOOP] Cache load failed: {e}")
+        whoop_cache = {}
+    try:
+        meditation = _mlog.yearly_stats(year)
+    except Exception as e:
+        print(f"[MEDITATION] Failed to load yearly stats: {e}")
+        meditation = None
+
+    results = []
+    gaps = []
+    for month in months:
+        cache_key = f"{year}-{month:02d}"
+        data = _empty_data(year, month)
+        if meditation is not None:
+            _apply_meditation(data, meditation.get(month, {'sessions_count': 0, 'minutes_total': 0}))
+
+        values, source = _garmin_from_cache(cache_key, garmin_cache)
+        if values is not None:
+            _apply_garmin(data, values, source)
+        else:
+            gaps.append((month, 'garmin'))
+
+        if cache_key in whoop_cache:
+            _apply_whoop(data, *get_whoop_cached(year, month, whoop_cache))
         else:
-            try:
-                steps_avg, activities, strength = _get_garmin_live(year, month, start_date, end_date)
-                data['steps_avg'] = steps_avg
-                data['activities'] = activities
-                data['strength'] = strength
-                data['garmin_source'] = 'LIVE'
-                print(f"[GARMIN] {cache_key} fetched LIVE (no cache)")
-            except Exception as e:
-                print(f"[GARMIN] No data for {cache_key}: {e}")
-    else:
+            gaps.append((month, 'whoop'))
+        results.append(data)
+    return results, gaps
+
+
+@st.cache_data(ttl=GAP_TTL, show_spinner=False)
+def _closed_month_live(source_name, year, month):
+    """Fetch live de un mes cerrado que no está en su cache; (None, 'NO DATA') si falla."""
+    metrics.cache_miss('closed_month_live')
+    cache_key = f"{year}-{month:02d}"
+    try:
+        with metrics.timer(f'fetch.{source_name}'):
+            if source_name == 'garmin':
+                start_date = datetime(year, month, 1)
+                end_date = datetime(year, month, monthrange(year, month)[1])
+                values, source = _garmin_live_values(year, month, start_date, end_date)
+            else:
+                values, source = _whoop_live_values(year, month)
+    except Exception as e:
+        print(f"[{source_name.upper()}] No data for {cache_key}: {e}")
+        return None, 'NO DATA'
+    print(f"[{source_name.upper()}] {cache_key} fetched LIVE (no cache)")
+    return values, source
+
+
+def get_year_data(year, months):
+    """get_monthly_data de varios meses del año en una sola pasada.
+
+    Los meses cerrados se arman leyendo garmin_cache.json, whoop_cache.json y
+    el meditation log una vez para todos (cacheado hasta que cambie alguno de
+    esos archivos). Solo los que faltan en un cache se piden live, todos en
+    paralelo. El mes en curso (si está en months) va por get_monthly_data.
+    Returns: lista de dicts (formato de get_monthly_data) en el orden de months.
+    """
+    months = list(months)
+    closed = tuple(month for month in months if not _is_current_month(year, month))
+
+    results = {}
+    if closed:
+        closed_data, gaps = _cached('closed_months', _closed_months_from_cache, year, closed, _cache_versions())
+        results.update(zip(closed, closed_data))
+
+        # Huecos del cache: se piden todos a la vez y se esperan contra un solo
+        # plazo por fuente (desde ahora), no un timeout nuevo por cada mes
+        futures = [
+            (month, source_name, _submit(_cached, 'closed_month_live', _closed_month_live, source_name, year, month))
+            for month, source_name in gaps
+        ]
+        started = time.monotonic()
+        for source_name in sorted({s for _, s, _ in futures}, key=SOURCE_TIMEOUTS.get):
+            remaining = started + SOURCE_TIMEOUTS[source_name] - time.monotonic()
+            wait([f for _, s, f in futures if s == source_name], timeout=max(remaining, 0))
+        for month, source_name, future in futures:
+            if future.done() and not future.cancelled():
+                values, source = future.result()
+            else:
+                # Los que siguen en cola se cancelan (liberan _EXECUTOR); los que
+                # ya corren terminan solos y quedan en el cache de _closed_month_live
+                future.cancel()
+                print(f"[{source_name.upper()}] Timeout ({SOURCE_TIMEOUTS[source_name]}s) for {year}-{month:02d}")
+                values, source = None, 'NO DATA'
+            apply = _apply_garmin if source_name == 'garmin' else _apply_whoop
+            apply(results[month], values, source)
+
+    for month in months:
+        if month not in results:
+            results[month] = get_monthly_data(year, month)
+    return [results[month] for month in months]
+
+
+def invalidate_current_month():
+    """ACTUALIZAR: descarta lo cacheado del mes en curso. Los meses cerrados
+    siguen en cache (se invalidan solos cuando cambia un archivo de cache)."""
+    _get_current_month_data.clear()
+    _fetch_garmin_current.clear()
+    _fetch_whoop_current.clear()
+    today = datetime.now()
+    reset_refresh(today.year, today.month)
+
+
+# ============ STALE-WHILE-REVALIDATE (mes actual) ============
+
+# Cada cuánto (segundos) se vuelve a lanzar el refresh live de un mes;
+# igual al ttl de get_monthly_data.
+SWR_REFRESH_AFTER = 60
+
+# cache_key -> {'future': refresh en curso o terminado, 'started': datetime, 'data': último live}
+_swr_state = {}
+_swr_lock = threading.Lock()
+
+
+def get_cached_monthly_data(year, month):
+    """Mismo formato que get_monthly_data pero solo desde los caches locales
+    (garmin_cache.json, whoop_cache.json, meditation log): sin red."""
+    from whoop_streamlit import get_whoop_cached
+
+    cache_key = f"{year}-{month:02d}"
+    data = _empty_data(year, month)
+    try:
+        _apply_meditation(data, _fetch_meditation(year, month))
+    except Exception as e:
+        print(f"[MEDITATION] Failed to load monthly stats: {e}")
+    _apply_garmin(data, *_garmin_fallback(cache_key))
+    _apply_whoop(data, *get_whoop_cached(year, month))
+    return data
+
+
+def get_monthly_data_swr(year, month):
+    """Stale-while-revalidate: devuelve datos al instante y refresca en background.
+
+    Returns (data, refreshing). Mientras no haya un resultado live se devuelve
+    get_cached_monthly_data; el refresh (get_monthly_data) corre en el executor
+    compartido. Con refreshing=True el caller debe volver a preguntar (p. ej.
+    con st.fragment(run_every=...)) hasta que refresh_pending sea False.
+    """
+    cache_key = f"{year}-{month:02d}"
+    now = datetime.now()
+    with _swr_lock:
+        state = _swr_state.get(cache_key)
+        if state is None or (
+            state['future'].done() and (now - state['started']).total_seconds() >= SWR_REFRESH_AFTER
+        ):
+            previous = state['data'] if state else None
+            future = _submit(get_monthly_data, year, month, executor=_REFRESH_EXECUTOR)
+            state = {'future': future, 'started': now, 'data': previous}
+            _swr_state[cache_key] = state
+        future = state['future']
+
+    if future.done():
         try:
-            steps_avg, activities, strength = _get_garmin_live(year, month, start_date, end_date)
-            data['steps_avg'] = steps_avg
-            data['activities'] = activities
-            data['strength'] = strength
-            data['garmin_source'] = 'LIVE'
-            print(f"[GARMIN] {cache_key} fetched LIVE")
+            state['data'] = future.result()
         except Exception as e:
-            print(f"[GARMIN] Live fetch failed for {cache_key}: {e}")
-            try:
-                garmin_cache = _load_garmin_cache()
-                if cache_key in garmin_cache:
-                    cached = garmin_cache[cache_key]
-                    data['steps_avg'] = cached.get('steps_avg', 0)
-                    data['activities'] = cached.get('activities', 0)
-                    data['strength'] = cached.get('strength', 0)
-                    data['garmin_source'] = f"CACHE ({cached.get('synced_at', '?')})"
-                    print(f"[GARMIN] {cache_key} loaded from CACHE")
-                else:
-                    print(f"[GARMIN] No cache data for {cache_key}")
-            except Exception as cache_err:
-                print(f"[GARMIN] Cache load failed: {cache_err}")
+            print(f"[SWR] Refresh failed for {cache_key}: {e}")
 
-    # --- WHOOP ---
-    from whoop_streamlit import get_whoop_data
-    whoop, source = get_whoop_data(year, month)
-    data['whoop_source'] = source
+    refreshing = not future.done()
+    if state['data'] is not None:
+        return state['data'], refreshing
+    return get_cached_monthly_data(year, month), refreshing
 
-    if whoop:
-        for raw_key, data_key in [('hr_zones_1_3_hours', 'hr_zone_1_3'), ('hr_zones_4_5_hours', 'hr_zone_4_5')]:
-            try:
-                raw = whoop.get(raw_key, 0)
-                data[data_key] = round(float(raw), 1) if raw is not None else 0
-            except (TypeError, ValueError):
-                data[data_key] = 0
-
-        data['sleep_hours_avg'] = round(whoop.get('sleep_hours_avg', 0), 1)
-        # Estos tres se muestran como enteros (sin decimales)
-        data['recovery_score'] = int(round(whoop.get('avg_recovery_score', 0) or 0))
-        data['resting_hr'] = int(round(whoop.get('avg_resting_hr', 0) or 0))
-        data['sleep_consistency'] = int(round(whoop.get('avg_sleep_consistency', 0) or 0))
-        data['meditation_days'] = int(whoop.get('meditation_days', 0) or 0)
-        data['sauna_days'] = int(whoop.get('sauna_days', 0) or 0)
 
-    return data
+def refresh_pending(year, month):
+    """True mientras el refresh en background del mes siga corriendo."""
+    with _swr_lock:
+        state = _swr_state.get(f"{year}-{month:02d}")
+    return state is not None and not state['future'].done()
+
+
+def reset_refresh(year, month):
+    """Marca el último refresh del mes como vencido: la próxima llamada relanza
+    uno (ACTUALIZAR) y mientras tanto sigue mostrando el último dato live."""
+    with _swr_lock:
+        state = _swr_state.get(f"{year}-{month:02d}")
+        if state is not None:
+            state['started'] = datetime.min
@@ -0,0 +1,551 @@
+"""
+Servidor local que imita las APIs de WHOOP v2 y Garmin Connect.
+
+Para load tests, regresiones y benchmarks sin gastar rate limit de las APIs
+reales. Los datos son sintéticos y deterministas: cada día se genera a partir
+de (seed, fecha), así que el mismo seed da los mismos records sin importar el
+rango o el orden en que se pidan.
+
+WHOOP (prefijo /developer/v2 y /oauth/oauth2):
+    activity/sleep, recovery, activity/workout, cycle  (start/end/limit/nextToken)
+    user/profile/basic, user/measurement/body
+    POST oauth/oauth2/token  (refresh_token rota en cada uso, como la API real)
+Garmin (prefijo /garmin, lo que usa garminconnect):
+    userprofile-service/socialProfile, userprofile-service/userprofile/user-settings
+    usersummary-service/stats/steps/daily/{start}/{end}
+    usersummary-service/usersummary/daily/{displayName}?calendarDate=
+    activitylist-service/activities/search/activities?startDate&endDate&start&limit
+GET /_stats devuelve requests por endpoint y errores inyectados.
+
+Uso:
+    python fake_api.py [--port 8765] [--seed 3] [--since 2024-01-01]
+                       [--latency 0.05] [--p429 0.02] [--p401 0.01]
+                       [--rate-limit 100]        # req/min por proveedor (429 real al pasarse)
+    # en otra terminal (imprime estas variables al arrancar):
+    WHOOP_API_BASE=http://127.0.0.1:8765/developer/v2 \\
+    WHOOP_OAUTH_BASE=http://127.0.0.1:8765/oauth/oauth2 \\
+    GARMIN_API_BASE=http://127.0.0.1:8765/garmin \\
+    python sync.py --all
+
+Desde Python (bench / tests):
+    server = fake_api.start(seed=3, latency=0.01)   # puerto libre, thread en background
+    os.environ.update(server.env())
+    ...
+    server.stop()
+
+Los 401 se inyectan solo en WHOOP: en Garmin, garminconnect reacciona a un
+401 refrescando el token contra diauth.garmin.com (no configurable).
+Tokens: el servidor acepta cualquier Bearer que haya emitido más los de
+FAKE_TOKENS; whoop_tokens.json / GARMIN_TOKENS_JSON pueden usar esos (con
+HOME apuntando a un directorio temporal para no pisar ~/.garmin_tokens).
+"""
+
+import json
+import random
+import socket
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_PORT = 8765
+DEFAULT_SEED = 3
+DEFAULT_SINCE = date(2024, 1, 1)
+
+WHOOP_PREFIX = '/developer/v2'
+OAUTH_PREFIX = '/oauth/oauth2'
+GARMIN_PREFIX = '/garmin'
+
+# Tokens aceptados desde el arranque (para armar whoop_tokens.json / GARMIN_TOKENS_JSON)
+FAKE_TOKENS = {
+    'whoop_access': 'fake-whoop-access',
+    'whoop_refresh': 'fake-whoop-refresh',
+    'garmin_di': 'fake-garmin-di',
+}
+
+# WHOOP pagina de a 25 como máximo; Garmin devuelve hasta `limit` actividades
+WHOOP_MAX_LIMIT = 25
+
+# Offsets de zona horaria (incluye minutos negativos, p. ej. Venezuela / Terranova)
+_TZ_OFFSETS = ['-06:00'] * 6 + ['-05:00', '+01:00', '-03:30', '+05:30']
+_WHOOP_SPORTS = [
+    ('running', 4), ('functional-fitness', 4), ('weightlifting', 3), ('meditation', 4),
+    ('sauna', 3), ('yoga', 1), ('cycling', 1),
+]
+_GARMIN_TYPES = [
+    ('running', 3), ('strength_training', 3), ('walking', 3), ('indoor_cardio', 1),
+    ('breathwork', 1), ('meditation', 1),
+]
+
+
+def _iso(dt):
+    return dt.strftime('%Y-%m-%dT%H:%M:%S.') + f"{dt.microsecond // 1000:03d}Z"
+
+
+def _parse_iso(value):
+    return datetime.strptime(value[:19], '%Y-%m-%dT%H:%M:%S')
+
+
+def _offset(tz):
+    sign = -1 if tz.startswith('-') else 1
+    hours, minutes = tz.lstrip('+-').split(':')
+    return timedelta(hours=sign * int(hours), minutes=sign * int(minutes))
+
+
+def _weighted(rng, choices):
+    return rng.choices([c for c, _ in choices], weights=[w for _, w in choices])[0]
+
+
+class FakeData:
+    """Records sintéticos por día, generados bajo demanda y memorizados."""
+
+    def __init__(self, seed=DEFAULT_SEED, since=DEFAULT_SINCE):
+        self.seed = seed
+        self.since = since
+        self._days = {}
+        self._lock = threading.Lock()
+
+    def day(self, d):
+        """{'sleep', 'recovery', 'cycle', 'workouts', 'steps', 'activities'} del día d."""
+        with self._lock:
+            if d not in self._days:
+                self._days[d] = self._generate(d)
+            return self._days[d]
+
+    def _generate(self, d):
+        rng = random.Random(f"{self.seed}-{d.isoformat()}")
+        tz = rng.choice(_TZ_OFFSETS)
+        midnight = datetime(d.year, d.month, d.day)
+        key = d.strftime('%Y%m%d')
+        cycle_id = d.toordinal()
+
+        # Sueño: se acuesta entre 20:30 y 00:30 hora local
+        bedtime_local = midnight + timedelta(minutes=20 * 60 + 30 + rng.randint(0, 240))
+        sleep_start = bedtime_local - _offset(tz)
+        light = rng.randint(12_000_000, 18_000_000)
+        sws = rng.randint(3_000_000, 6_000_000)
+        rem = rng.randint(4_000_000, 7_000_000)
+        awake = rng.randint(1_000_000, 3_000_000)
+        sleep_end = sleep_start + timedelta(milliseconds=light + sws + rem + awake)
+        scored = rng.random() > 0.03
+        sleep = {
+            'id': f"{self.seed:04x}0000-5e5e-4000-8000-{key}0000",
+            'cycle_id': cycle_id,
+            'user_id': 10129,
+            'created_at': _iso(sleep_end),
+            'updated_at': _iso(sleep_end + timedelta(minutes=rng.randint(1, 90))),
+            'start': _iso(sleep_start),
+            'end': _iso(sleep_end),
+            'timezone_offset': tz,
+            'nap': False,
+            'score_state': 'SCORED' if scored else 'PENDING_SCORE',
+            'score': {
+                'stage_summary': {
+                    'total_in_bed_time_milli': light + sws + rem + awake,
+                    'total_awake_time_milli': awake,
+                    'total_no_data_time_milli': 0,
+                    'total_light_sleep_time_milli': light,
+                    'total_slow_wave_sleep_time_milli': sws,
+                    'total_rem_sleep_time_milli': rem,
+                    'sleep_cycle_count': rng.randint(3, 6),
+                    'disturbance_count': rng.randint(2, 15),
+                },
+                'respiratory_rate': round(rng.uniform(13, 17), 2),
+                'sleep_performance_percentage': rng.randint(55, 100),
+                'sleep_consistency_percentage': rng.randint(40, 95),
+                'sleep_efficiency_percentage': round(rng.uniform(80, 97), 2),
+            } if scored else None,
+        }
+
+        recovery_score = rng.randint(15, 99)
+        recovery = {
+            'cycle_id': cycle_id,
+            'sleep_id': sleep['id'],
+            'user_id': 10129,
+            'created_at': _iso(sleep_end + timedelta(minutes=5)),
+            'updated_at': _iso(sleep_end + timedelta(minutes=rng.randint(5, 60))),
+            'score_state': 'SCORED' if scored else 'PENDING_SCORE',
+            'score': {
+                'user_calibrating': False,
+                'recovery_score': recovery_score,
+                'resting_heart_rate': rng.randint(46, 60),
+                'hrv_rmssd_milli': round(rng.uniform(40, 120), 3),
+                'spo2_percentage': round(rng.uniform(94, 99), 1),
+                'skin_temp_celsius': round(rng.uniform(33, 35), 2),
+            } if scored else None,
+        }
+
+        cycle = {
+            'id': cycle_id,
+            'user_id': 10129,
+            'created_at': _iso(sleep_start),
+            'updated_at': _iso(sleep_end),
+            'start': _iso(sleep_start),
+            'end': _iso(sleep_start + timedelta(days=1)),
+            'timezone_offset': tz,
+            'score_state': 'SCORED',
+            'score': {
+                'strain': round(rng.uniform(4, 18), 4),
+                'kilojoule': round(rng.uniform(6000, 14000), 1),
+                'average_heart_rate': rng.randint(60, 80),
+                'max_heart_rate': rng.randint(140, 190),
+            },
+        }
+
+        workouts = []
+        for i in range(rng.choice([0, 1, 1, 2, 2, 3])):
+            sport = _weighted(rng, _WHOOP_SPORTS)
+            start_local = midnight + timedelta(minutes=rng.randint(5 * 60, 20 * 60))
+            start = start_local - _offset(tz)
+            minutes = rng.randint(15, 30) if sport in ('meditation', 'sauna') else rng.randint(30, 90)
+            millis = minutes * 60000
+            zones = [rng.random() for _ in range(6)]
+            total = sum(zones)
+            workouts.append({
+                'id': f"{self.seed:04x}0000-3070-4000-8000-{key}{i:04d}",
+                'user_id': 10129,
+                'created_at': _iso(start + timedelta(minutes=minutes)),
+                'updated_at': _iso(start + timedelta(minutes=minutes + 5)),
+                'start': _iso(start),
+                'end': _iso(start + timedelta(minutes=minutes)),
+                'timezone_offset': tz,
+                'sport_name': sport,
+                'score_state': 'SCORED',
+                'score': {
+                    'strain': round(rng.uniform(2, 16), 4),
+                    'average_heart_rate': rng.randint(80, 160),
+                    'max_heart_rate': rng.randint(120, 190),
+                    'kilojoule': round(rng.uniform(200, 3000), 1),
+                    'zone_durations': {
+                        name: int(millis * z / total)
+                        for name, z in zip(
+                            ('zone_zero_milli', 'zone_one_milli', 'zone_two_milli',
+                             'zone_three_milli', 'zone_four_milli', 'zone_five_milli'),
+                            zones,
+                        )
+                    },
+                },
+            })
+
+        activities = []
+        for i in range(rng.choice([0, 1, 1, 1, 2])):
+            activity_type = _weighted(rng, _GARMIN_TYPES)
+            start_local = midnight + timedelta(minutes=rng.randint(5 * 60, 20 * 60))
+            activities.append({
+                'activityId': d.toordinal() * 10 + i,
+                'activityName': activity_type.replace('_', ' ').title(),
+                'startTimeLocal': start_local.strftime('%Y-%m-%d %H:%M:%S'),
+                'startTimeGMT': (start_local - _offset(tz)).strftime('%Y-%m-%d %H:%M:%S'),
+                'activityType': {'typeKey': activity_type},
+                'duration': float(rng.randint(900, 5400)),
+            })
+
+        return {
+            'sleep': sleep,
+            'recovery': recovery,
+            'cycle': cycle,
+            'workouts': workouts,
+            'steps': max(0, int(rng.gauss(10500, 3000))),
+            'activities': activities,
+        }
+
+    def days(self, start, end):
+        """Fechas con datos en [start, end], limitadas a [since, hoy]."""
+        d = max(start, self.since)
+        end = min(end, date.today())
+        while d <= end:
+            yield d
+            d += timedelta(days=1)
+
+    def whoop_records(self, kind, start, end):
+        """Records de WHOOP con start (el del sleep, para recovery) en [start, end], más nuevos primero."""
+        records = []
+        # Un sleep del día anterior puede empezar después de medianoche UTC
+        for d in self.days(start.date() - timedelta(days=1), end.date() + timedelta(days=1)):
+            day = self.day(d)
+            if kind == 'workouts':
+                candidates = [(w['start'], w) for w in day['workouts']]
+            else:
+                start_ts = day['sleep']['start'] if kind == 'recovery' else day[kind]['start']
+                candidates = [(start_ts, day[kind])]
+            for ts, record in candidates:
+                if start <= _parse_iso(ts) <= end:
+                    records.append((ts, record))
+        records.sort(key=lambda item: item[0], reverse=True)
+        return [record for _, record in records]
+
+
+_WHOOP_COLLECTIONS = {
+    'activity/sleep': 'sleep',
+    'recovery': 'recovery',
+    'activity/workout': 'workouts',
+    'cycle': 'cycle',
+}
+
+
+class FakeAPI:
+    """Estado del servidor: datos, tokens emitidos, fallas inyectadas y contadores."""
+
+    def __init__(self, seed=DEFAULT_SEED, since=DEFAULT_SINCE, latency=0.0,
+                 p429=0.0, p401=0.0, retry_after=1, rate_limit=None):
+        self.data = FakeData(seed, since)
+        self.latency = latency
+        self.p429 = p429
+        self.p401 = p401
+        self.retry_after = retry_after
+        self.rate_limit = rate_limit
+        self.rng = random.Random(seed)
+        self.access_tokens = {FAKE_TOKENS['whoop_access'], FAKE_TOKENS['garmin_di']}
+        self.refresh_token = FAKE_TOKENS['whoop_refresh']
+        self.counts = {}
+        self.injected = {'429': 0, '401': 0}
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'requests': dict(self.counts),
+                'total': sum(self.counts.values()),
+                'injected': dict(self.injected),
+            }
+
+    def _count(self, key):
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def _fault(self, provider):
+        """(status, headers) de una falla a inyectar, o None."""
+        with self._lock:
+            if self.rate_limit:
+                window_start, count = self._windows.get(provider, (0.0, 0))
+                now = time.monotonic()
+                if now - window_start >= 60:
+                    window_start, count = now, 0
+                count += 1
+                self._windows[provider] = (window_start, count)
+                if count > self.rate_limit:
+                    self.injected['429'] += 1
+                    return 429, {'Retry-After': str(int(60 - (now - window_start)) + 1)}
+            if self.p429 and self.rng.random() < self.p429:
+                self.injected['429'] += 1
+                return 429, {'Retry-After': str(self.retry_after)}
+            if provider == 'whoop' and self.p401 and self.rng.random() < self.p401:
+                self.injected['401'] += 1
+                return 401, {}
+        return None
+
+    def _authorized(self, headers):
+        auth = headers.get('Authorization', '')
+        return auth.startswith('Bearer ') and auth[len('Bearer '):] in self.access_tokens
+
+    # ---- WHOOP ----
+
+    def whoop(self, path, query):
+        if path == 'user/profile/basic':
+            return 200, {'user_id': 10129, 'email': 'fake@example.com', 'first_name': 'Fake', 'last_name': 'User'}
+        if path == 'user/measurement/body':
+            return 200, {'height_meter': 1.78, 'weight_kilogram': 78.5, 'max_heart_rate': 188}
+        kind = _WHOOP_COLLECTIONS.get(path)
+        if kind is None:
+            return 404, {'error': f"unknown endpoint {path}"}
+
+        start = _parse_iso(query['start']) if 'start' in query else datetime(2000, 1, 1)
+        end = _parse_iso(query['end']) if 'end' in query else datetime.now()
+        limit = min(int(query.get('limit', 10)), WHOOP_MAX_LIMIT)
+        offset = int(query.get('nextToken', 'p0')[1:] or 0)
+
+        records = self.data.whoop_records(kind, start, end)
+        page = records[offset:offset + limit]
+        next_token = f"p{offset + limit}" if offset + limit < len(records) else None
+        return 200, {'records': page, 'next_token': next_token}
+
+    def oauth_token(self, form):
+        grant = form.get('grant_type')
+        with self._lock:
+            if grant == 'refresh_token' and form.get('refresh_token') != self.refresh_token:
+                # WHOOP invalida el refresh token anterior en cada uso
+                return 400, {'error': 'invalid_grant', 'error_description': 'refresh token revoked'}
+            if grant not in ('refresh_token', 'authorization_code'):
+                return 400, {'error': 'unsupported_grant_type'}
+            suffix = f"{int(time.time() * 1000):x}{self.rng.randrange(16 ** 6):06x}"
+            access, self.refresh_token = f"access-{suffix}", f"refresh-{suffix}"
+            self.access_tokens.add(access)
+        return 200, {
+            'access_token': access,
+            'refresh_token': self.refresh_token,
+            'expires_in': 3600,
+            'scope': 'offline read:recovery read:sleep read:workout read:cycles read:profile',
+            'token_type': 'bearer',
+        }
+
+    # ---- Garmin ----
+
+    def garmin(self, path, query):
+        if path == 'userprofile-service/socialProfile':
+            return 200, {'displayName': 'fake-user', 'fullName': 'Fake User', 'userName': 'fake@example.com'}
+        if path == 'userprofile-service/userprofile/user-settings':
+            return 200, {'userData': {'measurementSystem': 'metric'}}
+        if path.startswith('usersummary-service/stats/steps/daily/'):
+            start, end = (date.fromisoformat(p) for p in path.rsplit('/', 2)[1:])
+            return 200, [
+                {'calendarDate': d.isoformat(), 'totalSteps': self.data.day(d)['steps'],
+                 'stepGoal': 10000, 'totalDistance': self.data.day(d)['steps'] * 0.75}
+                for d in self.data.days(start, end)
+            ]
+        if path.startswith('usersummary-service/usersummary/daily/'):
+            d = date.fromisoformat(query.get('calendarDate', date.today().isoformat()))
+            steps = self.data.day(d)['steps'] if self.data.since <= d <= date.today() else None
+            return 200, {'calendarDate': d.isoformat(), 'totalSteps': steps, 'dailyStepGoal': 10000}
+        if path == 'activitylist-service/activities/search/activities':
+            start = date.fromisoformat(query['startDate'])
+            end = date.fromisoformat(query.get('endDate', date.today().isoformat()))
+            activities = [a for d in self.data.days(start, end) for a in self.data.day(d)['activities']]
+            activities.sort(key=lambda a: a['startTimeLocal'], reverse=True)
+            offset, limit = int(query.get('start', 0)), int(query.get('limit', 20))
+            return 200, activities[offset:offset + limit]
+        return 404, {'message': f"unknown endpoint {path}"}
+
+
+def _handler(api):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self):
+            super().setup()
+            # Headers y body salen en writes separados: sin NODELAY, Nagle + delayed
+            # ACK agregan ~40 ms a cada request en una conexión keep-alive
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, headers=None):
+            raw = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(raw)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def _route(self, method):
+            parsed = urlparse(self.path)
+            path = parsed.path
+            query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+
+            if path == '/_stats':
+                return self._send(200, api.stats())
+
+            for prefix, provider in ((WHOOP_PREFIX, 'whoop'), (OAUTH_PREFIX, 'whoop'), (GARMIN_PREFIX, 'garmin')):
+                if path.startswith(prefix + '/'):
+                    break
+            else:
+                return self._send(404, {'error': 'not found'})
+            endpoint = path[len(prefix) + 1:]
+            api._count(f"{provider} {method} {endpoint if provider == 'whoop' else '/'.join(endpoint.split('/')[:3])}")
+
+            if api.latency:
+                time.sleep(api.latency * api.rng.uniform(0.5, 1.5))
+            fault = api._fault(provider)
+            if fault:
+                status, headers = fault
+                return self._send(status, {'error': 'injected', 'status': status}, headers)
+
+            if prefix == OAUTH_PREFIX:
+                if method != 'POST' or endpoint != 'token':
+                    return self._send(404, {'error': 'not found'})
+                length = int(self.headers.get('Content-Length', 0))
+                form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode()).items()}
+                return self._send(*api.oauth_token(form))
+
+            if not api._authorized(self.headers):
+                return self._send(401, {'error': 'unauthorized'})
+            handler = api.whoop if provider == 'whoop' else api.garmin
+            return self._send(*handler(endpoint, query))
+
+        def do_GET(self):
+            self._route('GET')
+
+        def do_POST(self):
+            self._route('POST')
+
+    return Handler
+
+
+class FakeAPIServer:
+    """FakeAPI servido en un thread de fondo (ver start)."""
+
+    def __init__(self, api, host='127.0.0.1', port=0):
+        self.api = api
+        self.httpd = ThreadingHTTPServer((host, port), _handler(api))
+        self.httpd.daemon_threads = True
+        self.host, self.port = self.httpd.server_address[:2]
+        self.url = f"http://{self.host}:{self.port}"
+        self._thread = None
+
+    def env(self):
+        """Variables de entorno que leen config / garmin_client para usar este servidor."""
+        return {
+            'WHOOP_API_BASE': self.url + WHOOP_PREFIX,
+            'WHOOP_OAUTH_BASE': self.url + OAUTH_PREFIX,
+            'GARMIN_API_BASE': self.url + GARMIN_PREFIX,
+        }
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='fake_api', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def start(host='127.0.0.1', port=0, **options):
+    """Arranca un FakeAPIServer en background (port=0: puerto libre). Opciones: ver FakeAPI."""
+    return FakeAPIServer(FakeAPI(**options), host, port).start()
+
+
+def _arg(args, name, default, cast=str):
+    if name in args:
+        idx = args.index(name)
+        if idx + 1 < len(args):
+            return cast(args[idx + 1])
+    return default
+
+
+def main():
+    args = sys.argv[1:]
+    server = FakeAPIServer(
+        FakeAPI(
+            seed=_arg(args, '--seed', DEFAULT_SEED, int),
+            since=_arg(args, '--since', DEFAULT_SINCE, date.fromisoformat),
+            latency=_arg(args, '--latency', 0.0, float),
+            p429=_arg(args, '--p429', 0.0, float),
+            p401=_arg(args, '--p401', 0.0, float),
+            retry_after=_arg(args, '--retry-after', 1, int),
+            rate_limit=_arg(args, '--rate-limit', None, int),
+        ),
+        host=_arg(args, '--host', '127.0.0.1'),
+        port=_arg(args, '--port', DEFAULT_PORT, int),
+    )
+    print(f"Fake WHOOP/Garmin API en {server.url}")
+    for key, value in server.env().items():
+        print(f"   export {key}={value}")
+    print(f"   whoop_tokens.json: {json.dumps({'access_token': FAKE_TOKENS['whoop_access'], 'refresh_token': FAKE_TOKENS['whoop_refresh']})}")
+    print(f"   GARMIN_TOKENS_JSON: {json.dumps({'garmin_tokens.json': {'di_token': FAKE_TOKENS['garmin_di']}})}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n{json.dumps(server.api.stats(), indent=2)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,11 +5,18 @@ Token persistence: una vez logueado, tokens se guardan en TOKENSTORE.
 Los refreshes no tocan SSO, así que no hay 429.
 Solo el primer login (o tokens completamente expirados) requiere SSO.
 
+En el dashboard usar get_client(): un solo cliente logueado por proceso,
+compartido entre reruns y sesiones de Streamlit.
+
 Uso:
     from garmin_client import GarminClient
     garmin = GarminClient()
     garmin.login()
+    garmin = get_client()                        # o: cliente compartido ya logueado
     stats = garmin.get_stats_for_date(datetime.now())
+    steps = garmin.get_daily_steps(start, end)   # {'YYYY-MM-DD': pasos}, 1 request/28 días
+
+Todas las llamadas a la API pasan por rate_limit (~1 req/s, reintentos en 429).
 """
 
 from garminconnect import Garmin
@@ -17,7 +24,13 @@ from datetime import datetime, timedelta
 import json
 import os
 import sys
+import tempfile
+import threading
+import time
 import config
+import metrics
+import rate_limit
+from rate_limit import RateLimitError
 
 TOKENSTORE = os.path.expanduser("~/.garmin_tokens")
 
@@ -39,15 +52,41 @@ def _restore_tokens_from_env():
         return
     if not isinstance(files, dict) or not files:
         return
+    files = {
+        filename: content if isinstance(content, str) else json.dumps(content)
+        for filename, content in files.items()
+    }
+    if _write_token_files(files):
+        print(f"[GARMIN] Tokens restaurados desde env a {TOKENSTORE}")
+
+
+def _read_token_files(directory):
+    """{filename: contenido} de los archivos de tokens en directory."""
+    if not os.path.isdir(directory):
+        return {}
+    files = {}
+    for filename in os.listdir(directory):
+        filepath = os.path.join(directory, filename)
+        if os.path.isfile(filepath):
+            with open(filepath) as f:
+                files[filename] = f.read()
+    return files
+
+
+def _write_token_files(files):
+    """Escribe los archivos a TOKENSTORE solo si alguno cambió. Returns: True si escribió."""
+    current = _read_token_files(TOKENSTORE)
+    changed = {name: content for name, content in files.items() if current.get(name) != content}
+    if not changed:
+        return False
     os.makedirs(TOKENSTORE, exist_ok=True)
-    for filename, content in files.items():
+    for filename, content in changed.items():
         filepath = os.path.join(TOKENSTORE, filename)
-        with open(filepath, "w") as f:
-            if isinstance(content, str):
-                f.write(content)
-            else:
-                json.dump(content, f)
-    print(f"[GARMIN] Tokens restaurados desde env a {TOKENSTORE}")
+        tmp_path = f"{filepath}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(content)
+        os.replace(tmp_path, filepath)
+    return True
 
 
 def _prompt_mfa():
@@ -64,6 +103,25 @@ def _prompt_mfa():
 class GarminClient:
     def __init__(self):
         self.client = None
+        self.scheduler = rate_limit.get_scheduler('garmin')
+        # Un mismo cliente se comparte entre threads (get_client): las llamadas
+        # se serializan, así un refresh de tokens no corre dos veces a la vez.
+        self._lock = threading.RLock()
+        # Tokens DI ya escritos a disco (garminconnect los reemplaza al refrescar)
+        self._saved_tokens = None
+
+    def _call(self, fn, *args):
+        with self._lock:
+            # Endpoint = método de garminconnect (get_stats, get_activities_by_date...)
+            result = self.scheduler.call(metrics.http_call, 'garmin', fn.__name__, fn, *args)
+            if self._token_state() != self._saved_tokens:
+                # La request refrescó los tokens: persistirlos
+                self.save_tokens()
+            return result
+
+    def _token_state(self):
+        inner = self.client.client
+        return getattr(inner, 'di_token', None), getattr(inner, 'di_refresh_token', None)
 
     def login(self):
         """Login con token persistence. Intenta tokens guardados primero."""
@@ -79,26 +137,77 @@ class GarminClient:
             password=password or None,
             prompt_mfa=_prompt_mfa,
         )
+        if config.GARMIN_API_BASE:
+            # Servidor local (fake_api.py): garminconnect arma las URLs con este prefijo
+            self.client.client._connectapi = config.GARMIN_API_BASE
 
         # login() intenta cargar tokens de TOKENSTORE primero.
         # Solo toca SSO si no hay tokens guardados.
         self.client.login(tokenstore=TOKENSTORE)
 
-        # Guardar tokens actualizados
-        os.makedirs(TOKENSTORE, exist_ok=True)
-        self.client.client.dump(TOKENSTORE)
+        # Guardar tokens actualizados (solo si cambiaron)
+        self.save_tokens()
+
+    def save_tokens(self):
+        """Escribe los tokens a TOKENSTORE solo si cambiaron (p. ej. tras un refresh).
+
+        Returns: True si escribió.
+        """
+        with self._lock, tempfile.TemporaryDirectory() as tmp_dir:
+            self._saved_tokens = self._token_state()
+            self.client.client.dump(tmp_dir)
+            return _write_token_files(_read_token_files(tmp_dir))
 
     def get_stats_for_date(self, date=None):
         if date is None:
             date = datetime.now()
-        return self.client.get_stats(date.strftime('%Y-%m-%d'))
+        return self._call(self.client.get_stats, date.strftime('%Y-%m-%d'))
+
+    def get_daily_steps(self, start_date, end_date):
+        """Pasos totales por día entre start_date y end_date (inclusive).
+
+        Returns: dict {'YYYY-MM-DD': totalSteps}. Usa el endpoint de rango
+        (1 request por cada 28 días) y solo si falla cae al loop día por día
+        con get_stats_for_date. Días sin dato no aparecen en el dict.
+        """
+        try:
+            rows = self._call(
+                self.client.get_daily_steps,
+                start_date.strftime('%Y-%m-%d'),
+                end_date.strftime('%Y-%m-%d'),
+            )
+            return {
+                row['calendarDate']: row['totalSteps']
+                for row in rows or []
+                if row.get('calendarDate') and row.get('totalSteps') is not None
+            }
+        except RateLimitError:
+            # El fallback día por día haría ~30x más requests contra un 429
+            raise
+        except Exception as e:
+            print(f"[GARMIN] Bulk steps falló ({e}), usando fallback día por día")
+
+        steps = {}
+        current_date = start_date
+        while current_date <= end_date:
+            try:
+                stats = self.get_stats_for_date(current_date)
+                if stats and stats.get('totalSteps') is not None:
+                    steps[current_date.strftime('%Y-%m-%d')] = stats['totalSteps']
+            except RateLimitError:
+                raise
+            except Exception as e:
+                print(f"[GARMIN] Error dia {current_date.strftime('%Y-%m-%d')}: {e}")
+            current_date += timedelta(days=1)
+        return steps
 
     def get_activities(self, start_date=None, end_date=None):
         if start_date is None:
             start_date = datetime.now() - timedelta(days=7)
         if end_date is None:
             end_date = datetime.now()
-        return self.client.get_activities_by_date(
+        return self._call(
+            self.client.get_activities_by_date,
             start_date.strftime('%Y-%m-%d'),
             end_date.strftime('%Y-%m-%d'),
         )
@@ -117,3 +226,48 @@ class GarminClient:
                 except (json.JSONDecodeError, UnicodeDecodeError):
                     pass
         return json.dumps(tokens) if tokens else None
+
+
+# ============ CLIENTE COMPARTIDO ============
+
+# Si el login falla, no reintentar SSO antes de esto (segundos): evita 429.
+LOGIN_RETRY_AFTER = 300
+
+_shared_client = None
+_shared_error = None      # (time.monotonic(), excepción) del último login fallido
+_shared_lock = threading.Lock()
+
+
+def get_client():
+    """GarminClient logueado, único por proceso y thread-safe.
+
+    El login (leer TOKENSTORE, cargar perfil) se hace una sola vez; después se
+    reusa el mismo cliente. Los tokens se refrescan solos cerca de expirar al
+    hacer requests, y solo entonces se re-escriben a disco (ver _call). Un login
+    fallido se recuerda LOGIN_RETRY_AFTER segundos. Raises si no hay login.
+    """
+    global _shared_client, _shared_error
+    with _shared_lock:
+        if _shared_client is not None:
+            return _shared_client
+
+        if _shared_error is not None and time.monotonic() - _shared_error[0] < LOGIN_RETRY_AFTER:
+            raise _shared_error[1]
+
+        client = GarminClient()
+        try:
+            client.login()
+        except Exception as e:
+            _shared_error = (time.monotonic(), e)
+            raise
+        _shared_client = client
+        _shared_error = None
+        return client
+
+
+def reset_client():
+    """Descarta el cliente compartido (el próximo get_client vuelve a loguear)."""
+    global _shared_client, _shared_error
+    with _shared_lock:
+        _shared_client = None
+        _shared_error = None
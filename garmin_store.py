@@ -0,0 +1,172 @@
+"""
+Store diario de Garmin (garmin_days.json).
+
+Un registro por fecha ('YYYY-MM-DD') con los pasos del día y el conteo de
+actividades / strength de ese día. Los días pasados no cambian, así que un
+refresh solo pide a Garmin los días que faltan (más hoy y ayer) y los
+agregados mensuales se arman desde el store.
+
+Uso:
+    store = garmin_store.load_store()
+    garmin_store.update_store(store, garmin, start_date, end_date)
+    garmin_store.save_store(store)
+    steps_avg, activities, strength, days = garmin_store.month_summary(store, year, month)
+"""
+
+import json
+import os
+import threading
+
+import json_cache
+import metrics
+from datetime import datetime, timedelta
+from calendar import monthrange
+
+STORE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'garmin_days.json')
+
+# Días recientes que siempre se vuelven a pedir: el reloj sincroniza tarde y
+# los pasos de ayer pueden seguir subiendo hasta la mañana siguiente.
+REFRESH_RECENT_DAYS = 2
+
+STRENGTH_KEYWORDS = ['strength', 'training', 'gym', 'weight']
+
+_lock = threading.Lock()
+
+
+def load_store():
+    if os.path.exists(STORE_FILE):
+        with open(STORE_FILE, 'r') as f:
+            return json.load(f)
+    return {}
+
+
+def save_store(store):
+    with _lock:
+        json_cache.write_json_atomic(STORE_FILE, store, indent=2, sort_keys=True)
+
+
+def _is_counted_activity(activity_type):
+    return 'breath' not in activity_type and 'meditation' not in activity_type
+
+
+def _is_strength(activity_type):
+    return any(kw in activity_type for kw in STRENGTH_KEYWORDS)
+
+
+def days_to_fetch(store, start_date, end_date, now=None):
+    """Fechas (datetime) del rango que hay que pedir a Garmin.
+
+    Un día se pide si falta en el store, si es hoy/ayer o si se guardó antes
+    de que el día terminara (dato parcial). Un día sin pasos (steps 0) ya
+    pedido después de terminar no se vuelve a pedir.
+    """
+    now = now or datetime.now()
+    recent_cutoff = (now - timedelta(days=REFRESH_RECENT_DAYS - 1)).date()
+    pending = []
+    current_date = datetime(start_date.year, start_date.month, start_date.day)
+    while current_date <= end_date:
+        day = store.get(current_date.strftime('%Y-%m-%d'))
+        if (
+            day is None
+            or current_date.date() >= recent_cutoff
+            or day.get('fetched_at', '') < (current_date + timedelta(days=1)).isoformat()
+        ):
+            pending.append(current_date)
+        current_date += timedelta(days=1)
+    return pending
+
+
+def _runs(dates):
+    """Agrupa fechas consecutivas: [(desde, hasta), ...]."""
+    runs = []
+    for date in dates:
+        if runs and date - runs[-1][1] == timedelta(days=1):
+            runs[-1][1] = date
+        else:
+            runs.append([date, date])
+    return [tuple(run) for run in runs]
+
+
+def update_store(store, garmin, start_date, end_date, now=None):
+    """Pide a Garmin solo los días pendientes del rango y los guarda en store.
+
+    Cada tramo de días pendientes consecutivos se pide con un rango (pasos +
+    actividades), así que refrescar hoy y ayer cuesta 2 requests y un hueco
+    viejo no arrastra los días ya guardados entre medio. Un día que no vino en
+    la respuesta de pasos no se guarda: sigue pendiente para el próximo sync.
+    Returns: nº de días guardados.
+    Raises si falla la descarga de algún tramo (el store queda intacto).
+    """
+    now = now or datetime.now()
+    pending = days_to_fetch(store, start_date, end_date, now)
+    total_days = (end_date.date() - start_date.date()).days + 1
+    metrics.cache_hit('garmin_days', max(total_days - len(pending), 0))
+    metrics.cache_miss('garmin_days', len(pending))
+    if not pending:
+        return 0
+
+    steps = {}
+    counts = {}
+    for lo, hi in _runs(pending):
+        steps.update(garmin.get_daily_steps(lo, hi))
+        for activity in garmin.get_activities(lo, hi):
+            date_str = (activity.get('startTimeLocal') or '')[:10]
+            if not date_str:
+                continue
+            activity_type = activity.get('activityType', {}).get('typeKey', '').lower()
+            if not _is_counted_activity(activity_type):
+                continue
+            day_counts = counts.setdefault(date_str, [0, 0])
+            day_counts[0] += 1
+            if _is_strength(activity_type):
+                day_counts[1] += 1
+
+    fetched_at = now.isoformat()
+    stored = 0
+    with _lock:
+        for date in pending:
+            date_str = date.strftime('%Y-%m-%d')
+            if date_str not in steps:
+                # Sin fila en la respuesta (fallo puntual): se vuelve a pedir
+                continue
+            n_activities, n_strength = counts.get(date_str, (0, 0))
+            store[date_str] = {
+                # Un día con 0 pasos ya cerrado no se re-pide (ver days_to_fetch)
+                'steps': steps[date_str] or 0,
+                'activities': n_activities,
+                'strength': n_strength,
+                'fetched_at': fetched_at,
+            }
+            stored += 1
+
+    return stored
+
+
+def month_summary(store, year, month, end_date=None):
+    """Agregados del mes desde el store.
+
+    Returns: (steps_avg, activities, strength, days_with_steps).
+    end_date limita el mes en curso (por defecto, fin de mes).
+    """
+    last_day = monthrange(year, month)[1]
+    if end_date is None:
+        end_date = datetime(year, month, last_day)
+    total_steps = 0
+    days_with_steps = 0
+    activities = 0
+    strength = 0
+    for day in range(1, last_day + 1):
+        date = datetime(year, month, day)
+        if date > end_date:
+            break
+        entry = store.get(date.strftime('%Y-%m-%d'))
+        if not entry:
+            continue
+        if entry.get('steps'):
+            total_steps += entry['steps']
+            days_with_steps += 1
+        activities += entry.get('activities', 0)
+        strength += entry.get('strength', 0)
+
+    steps_avg = round(total_steps / days_with_steps) if days_with_steps > 0 else 0
+    return steps_avg, activities, strength, days_with_steps
@@ -3,32 +3,37 @@ Garmin Local Sync - Corre este script en tu computadora local para bajar datos d
 
 Uso:
     python3 garmin_sync.py              # Sincroniza mes actual
-    python3 garmin_sync.py --all        # Sincroniza todos los meses del año
+    python3 garmin_sync.py --all        # Sincroniza los meses del año no asentados
+    python3 garmin_sync.py --all --force   # Igual, incluyendo los meses ya asentados (ver settlement)
     python3 garmin_sync.py --month 1    # Sincroniza enero
+    python3 garmin_sync.py --all --metrics json [--metrics-file garmin.json]   # Vuelca métricas (json | prom)
 
 Los datos se guardan en garmin_cache.json y el dashboard los lee de ahi.
+Los datos por día quedan en garmin_days.json (ver garmin_store): cada sync solo
+pide los días que faltan más hoy y ayer.
 Requiere tokens en ~/.garmin_tokens/ o credenciales en variables de entorno.
 """
 
-import json
 import sys
 import os
-from datetime import datetime, timedelta
+from datetime import datetime
 from calendar import monthrange
 
+import garmin_store
+import json_cache
+import metrics
+import settlement
+
 CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'garmin_cache.json')
 
 
 def load_cache():
-    if os.path.exists(CACHE_FILE):
-        with open(CACHE_FILE, 'r') as f:
-            return json.load(f)
-    return {}
+    # Copia editable: el sync agrega / reemplaza entradas
+    return json_cache.thaw(json_cache.read_json(CACHE_FILE))
 
 
 def save_cache(cache):
-    with open(CACHE_FILE, 'w') as f:
-        json.dump(cache, f, indent=2)
+    json_cache.write_json_atomic(CACHE_FILE, cache, indent=2)
     print(f"\n>> Cache guardado en: {CACHE_FILE}")
 
 
@@ -44,41 +49,23 @@ def sync_month(garmin, year, month, cache):
     start_date = datetime(year, month, 1)
     end_date = today if is_current else datetime(year, month, last_day)
 
-    # --- Steps ---
-    print(f"      👣 Obteniendo pasos diarios...")
-    total_steps = 0
-    days_with_steps = 0
-    current_date = start_date
-    while current_date <= end_date:
-        try:
-            stats = garmin.get_stats_for_date(current_date)
-            if stats and stats.get('totalSteps'):
-                total_steps += stats['totalSteps']
-                days_with_steps += 1
-        except Exception as e:
-            print(f"         Error dia {current_date.strftime('%d')}: {e}")
-        current_date += timedelta(days=1)
-
-    steps_avg = round(total_steps / days_with_steps) if days_with_steps > 0 else 0
-
-    # --- Activities ---
-    print(f"      🏃 Obteniendo actividades...")
-    activities_count = 0
-    strength_count = 0
+    # --- Steps + Activities (solo días que faltan en el store diario) ---
+    print(f"      👣 Actualizando store diario (pasos + actividades)...")
+    store = garmin_store.load_store()
     try:
-        all_activities = garmin.get_activities(start_date, end_date)
-        for activity in all_activities:
-            activity_date_str = activity.get('startTimeLocal', '')
-            if activity_date_str:
-                activity_date = datetime.strptime(activity_date_str[:10], '%Y-%m-%d')
-                if activity_date.year == year and activity_date.month == month:
-                    activity_type = activity.get('activityType', {}).get('typeKey', '').lower()
-                    if 'breath' not in activity_type and 'meditation' not in activity_type:
-                        activities_count += 1
-                        if any(kw in activity_type for kw in ['strength', 'training', 'gym', 'weight']):
-                            strength_count += 1
+        fetched = garmin_store.update_store(store, garmin, start_date, end_date)
+        print(f"         {fetched} dias actualizados desde Garmin")
+        if fetched:
+            garmin_store.save_store(store)
     except Exception as e:
-        print(f"         Error obteniendo actividades: {e}")
+        # Un resumen desde un store a medio actualizar pisaría una entrada buena
+        print(f"         Error actualizando store: {e}")
+        print(f"   ⚠️  {key} queda como estaba en el cache (se reintenta en el próximo sync).")
+        return cache
+
+    steps_avg, activities_count, strength_count, days_with_steps = garmin_store.month_summary(
+        store, year, month, end_date
+    )
 
     new_data = {
         'year': year,
@@ -96,12 +83,16 @@ def sync_month(garmin, year, month, cache):
         print(f"   (Cache actual: {cache[key].get('steps_avg', 0)} steps avg, synced {cache[key].get('synced_at', '?')})")
         return cache
 
-    cache[key] = new_data
+    previous = cache.get(key)
+    cache[key] = settlement.mark(new_data, previous, 'days_with_data')
 
     d = cache[key]
     print(f"   Steps avg:     {d['steps_avg']:,} ({d['days_with_data']} dias)")
     print(f"   Activities:    {d['activities']}")
     print(f"   Strength:      {d['strength']}")
+    change = settlement.report_change(previous, d)
+    if change:
+        print(change)
 
     return cache
 
@@ -126,7 +117,8 @@ def main():
     cache = load_cache()
 
     if '--all' in args:
-        for month in range(1, now.month + 1):
+        months = settlement.pending_months(cache, now.year, range(1, now.month + 1), force='--force' in args)
+        for month in months:
             cache = sync_month(garmin, now.year, month, cache)
     elif '--month' in args:
         idx = args.index('--month')
@@ -145,6 +137,10 @@ def main():
         cache = sync_month(garmin, now.year, now.month, cache)
 
     save_cache(cache)
+
+    import rate_limit
+    print(f"\n{rate_limit.format_stats()}")
+    metrics.dump_from_args(args)
     print("\nListo! El dashboard usara estos datos automaticamente.")
 
 
@@ -0,0 +1,109 @@
+"""
+Sesión HTTP compartida por todo el proceso (keep-alive + pool por host).
+
+Cada requests.get/post suelto abre una conexión TCP+TLS nueva; con la sesión
+compartida las páginas de una paginación reusan la misma conexión.
+
+Uso:
+    import http_pool
+    session = http_pool.get_session()
+    response = session.get(url, params=params)   # timeout por defecto incluido
+    print(http_pool.format_stats())
+"""
+
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+# (connect, read) en segundos, para llamadas que no pasan timeout explícito
+DEFAULT_TIMEOUT = (5, 20)
+
+# Hosts distintos con pool propio / conexiones keep-alive máximas por host
+POOL_HOSTS = 4
+POOL_MAXSIZE_PER_HOST = 8
+
+
+class _CountingAdapter(HTTPAdapter):
+    """HTTPAdapter que avisa (on_new_connection) cada vez que un pool abre una
+    conexión TCP. Se cuenta al abrirla, así que el total no depende de que el
+    pool del host siga vivo (el PoolManager descarta pools pasados POOL_HOSTS)."""
+
+    def __init__(self, on_new_connection, **kwargs):
+        # HTTPAdapter.__init__ llama a init_poolmanager
+        self._on_new_connection = on_new_connection
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        on_new_connection = self._on_new_connection
+
+        def counting(pool_cls):
+            def _new_conn(pool):
+                on_new_connection()
+                return pool_cls._new_conn(pool)
+            return type(pool_cls.__name__, (pool_cls,), {'_new_conn': _new_conn})
+
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: counting(pool_cls) for scheme, pool_cls in self.poolmanager.pool_classes_by_scheme.items()
+        }
+
+
+class PooledSession(requests.Session):
+    """requests.Session con pool acotado por host, timeout por defecto y conteo de requests."""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, pool_hosts=POOL_HOSTS, pool_maxsize=POOL_MAXSIZE_PER_HOST):
+        super().__init__()
+        self.default_timeout = timeout
+        # pool_block: con más threads que conexiones se espera una libre en vez de abrir extras
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._connections = 0
+        adapter = _CountingAdapter(
+            self._count_connection, pool_connections=pool_hosts, pool_maxsize=pool_maxsize, pool_block=True
+        )
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def _count_connection(self):
+        with self._stats_lock:
+            self._connections += 1
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.default_timeout
+        with self._stats_lock:
+            self._requests += 1
+        return super().request(method, url, **kwargs)
+
+    def stats(self):
+        """{'requests', 'connections', 'reused'}: connections = conexiones TCP abiertas."""
+        with self._stats_lock:
+            total, connections = self._requests, self._connections
+        return {
+            'requests': total,
+            'connections': connections,
+            'reused': max(total - connections, 0),
+        }
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Sesión única del proceso (se crea la primera vez)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = PooledSession()
+    return _session
+
+
+def stats():
+    return get_session().stats()
+
+
+def format_stats():
+    s = stats()
+    return f"[HTTP] {s['requests']} requests, {s['connections']} conexiones nuevas, {s['reused']} reusadas"
@@ -0,0 +1,108 @@
+"""
+Lector compartido de archivos JSON de cache (garmin_cache.json, whoop_cache.json).
+
+Cada archivo se parsea una sola vez por versión (path, mtime_ns, size): mientras
+el archivo no cambie, read_json devuelve el mismo objeto ya parseado. Como ese
+objeto lo comparten todos los callers, se devuelve congelado (FrozenDict /
+tuplas); quien necesite modificarlo usa thaw() para obtener una copia normal.
+
+Uso:
+    import json_cache
+    cache = json_cache.read_json(CACHE_FILE)          # FrozenDict, solo lectura
+    cache = json_cache.thaw(json_cache.read_json(CACHE_FILE))   # dict editable
+    json_cache.write_json_atomic(CACHE_FILE, cache, indent=2)
+"""
+
+import json
+import os
+import threading
+
+import metrics
+
+
+class FrozenDict(dict):
+    """dict de solo lectura. Sigue siendo un dict: json.dump, ==, .get, etc. funcionan."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("FrozenDict es de solo lectura (usar json_cache.thaw para una copia editable)")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+    __ior__ = _readonly
+
+    def __reduce__(self):
+        # pickle / copy (st.cache_data) sin pasar por __setitem__
+        return (FrozenDict, (dict(self),))
+
+
+def freeze(value):
+    """Copia congelada de un valor JSON (dict -> FrozenDict, list -> tuple)."""
+    if isinstance(value, dict):
+        return FrozenDict((k, freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def thaw(value):
+    """Copia editable de un valor congelado (FrozenDict -> dict, tuple -> list)."""
+    if isinstance(value, dict):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(v) for v in value]
+    return value
+
+
+def file_version(path):
+    """(mtime_ns, size) del archivo, o None si no existe."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+# path -> (version, datos congelados): solo la última versión de cada archivo
+_parsed = {}
+_lock = threading.Lock()
+
+
+def read_json(path, default=None):
+    """Contenido parseado y congelado de path; default (congelado, {} si None)
+    si el archivo no existe. Solo re-parsea cuando cambia mtime_ns o size."""
+    path = os.fspath(path)
+    version = file_version(path)
+    if version is None:
+        return freeze({} if default is None else default)
+
+    with _lock:
+        cached = _parsed.get(path)
+        if cached is not None and cached[0] == version:
+            metrics.cache_hit('json_cache')
+            return cached[1]
+
+    metrics.cache_miss('json_cache')
+    with open(path, 'r') as f:
+        data = freeze(json.load(f))
+
+    with _lock:
+        _parsed[path] = (version, data)
+    return data
+
+
+def invalidate(path=None):
+    """Olvida lo parseado de path (o de todos los archivos)."""
+    with _lock:
+        if path is None:
+            _parsed.clear()
+        else:
+            _parsed.pop(os.fspath(path), None)
+
+
+def write_json_atomic(path, data, **dump_kwargs):
+    """json.dump a un .tmp y os.replace: quien lee nunca ve un archivo a medias."""
+    path = os.fspath(path)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, **dump_kwargs)
+    os.replace(tmp_path, path)
@@ -1,24 +1,144 @@
 """
 Log de sesiones de meditacion. Persistencia local en meditation_log.json.
 Esquema: lista de sesiones con date (YYYY-MM-DD), day_number (1-28), duration_min, completed (bool), notes.
+
+Escrituras: cada cambio se agrega como una línea a meditation_log.jsonl
+(journal append-only, O(1)); cada COMPACT_EVERY eventos el journal se
+compacta en meditation_log.json. Lecturas: el log (base + journal) se carga
+una vez en un índice por (año, mes) y por fecha, que se invalida cuando
+cambia el mtime de alguno de los dos archivos.
 """
 import json
+import os
+import threading
 from pathlib import Path
 from datetime import datetime, date, timedelta
 
+import metrics
+
 LOG_FILE = Path(__file__).parent / "meditation_log.json"
+JOURNAL_FILE = Path(__file__).parent / "meditation_log.jsonl"
 
+# Eventos en el journal antes de reescribir meditation_log.json
+COMPACT_EVERY = 50
 
-def _load():
+
+class _Index:
+    """Estado del log + sesiones completadas indexadas por (año, mes) y por fecha."""
+
+    def __init__(self, data):
+        self.sessions = []
+        self.current_day = data.get("current_day", 1)
+        # seq del último evento del journal ya incluido en meditation_log.json
+        self.last_seq = data.get("last_seq", 0)
+        self.journal_events = 0
+        self.by_month = {}
+        self.by_date = {}
+        for s in data.get("sessions", []):
+            self._add_session(s)
+
+    def _add_session(self, s):
+        self.sessions.append(s)
+        if not s.get("completed"):
+            return
+        try:
+            d = datetime.strptime(s["date"], "%Y-%m-%d").date()
+        except (ValueError, KeyError):
+            return
+        self.by_month.setdefault((d.year, d.month), []).append(s)
+        self.by_date.setdefault(d, []).append(s)
+
+    def apply(self, event):
+        """Aplica un evento del journal (los ya compactados se ignoran por seq)."""
+        if event.get("seq", 0) <= self.last_seq:
+            return
+        self.last_seq = event["seq"]
+        self.journal_events += 1
+        if "session" in event:
+            self._add_session(event["session"])
+        if "current_day" in event:
+            self.current_day = event["current_day"]
+
+    def to_dict(self):
+        return {"sessions": self.sessions, "current_day": self.current_day, "last_seq": self.last_seq}
+
+
+def _file_version(path):
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def version():
+    """Versión (mtime_ns, size) de meditation_log.json y del journal: cambia con cada escritura."""
+    return _file_version(LOG_FILE), _file_version(JOURNAL_FILE)
+
+
+_lock = threading.RLock()
+_cached = None   # (version(), _Index)
+
+
+def _read_index():
+    data = {"sessions": [], "current_day": 1}
     if LOG_FILE.exists():
         with open(LOG_FILE) as f:
-            return json.load(f)
-    return {"sessions": [], "current_day": 1}
+            data = json.load(f)
+    index = _Index(data)
+    if JOURNAL_FILE.exists():
+        with open(JOURNAL_FILE) as f:
+            for line in f:
+                try:
+                    index.apply(json.loads(line))
+                except (ValueError, KeyError):
+                    # Línea cortada por un crash a mitad de escritura
+                    continue
+    return index
+
+
+def _index():
+    global _cached
+    with _lock:
+        current = version()
+        if _cached is None or _cached[0] != current:
+            metrics.cache_miss('meditation_index')
+            _cached = (current, _read_index())
+        else:
+            metrics.cache_hit('meditation_index')
+        return _cached[1]
+
+
+def _compact(index):
+    """Reescribe meditation_log.json con el estado completo y vacía el journal."""
+    tmp_path = LOG_FILE.with_name(LOG_FILE.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(index.to_dict(), f, indent=2)
+    os.replace(tmp_path, LOG_FILE)
+    # Si se corta aquí, el journal se re-aplica pero sus seq ya están en last_seq
+    JOURNAL_FILE.unlink(missing_ok=True)
+    index.journal_events = 0
+
+
+def _append(event):
+    """Agrega un evento al journal y al índice en memoria."""
+    global _cached
+    with _lock:
+        index = _index()
+        event["seq"] = index.last_seq + 1
+        with open(JOURNAL_FILE, "a") as f:
+            f.write(json.dumps(event) + "\n")
+        index.apply(event)
+        if index.journal_events >= COMPACT_EVERY:
+            _compact(index)
+        _cached = (version(), index)
+        return index
 
 
-def _save(data):
-    with open(LOG_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+def _load():
+    """Estado completo del log como dict (copia)."""
+    index = _index()
+    return {"sessions": [dict(s) for s in index.sessions], "current_day": index.current_day}
 
 
 def get_state():
@@ -28,53 +148,51 @@ def get_state():
 
 def get_current_day():
     """Devuelve el numero de dia actual del programa (1-28). Avanza con cada sesion completada."""
-    data = _load()
-    return min(data.get("current_day", 1), 28)
-
+    return min(_index().current_day, 28)
 
-def log_session(day_number, duration_min, completed=True, notes=""):
-    """Registra una sesion completada y avanza el contador del programa."""
-    data = _load()
-    today = date.today().isoformat()
 
-    data["sessions"].append({
-        "date": today,
+def _session(day_number, duration_min, completed, notes):
+    return {
+        "date": date.today().isoformat(),
         "timestamp": datetime.now().isoformat(),
         "day_number": day_number,
         "duration_min": duration_min,
         "completed": completed,
         "notes": notes,
-    })
+    }
 
-    if completed:
-        data["current_day"] = min(data.get("current_day", 1) + 1, 29)
 
-    _save(data)
-    return data
+def log_session(day_number, duration_min, completed=True, notes=""):
+    """Registra una sesion completada y avanza el contador del programa.
+    Returns: el evento agregado al journal (get_state() para el log completo)."""
+    event = {"session": _session(day_number, duration_min, completed, notes)}
+    with _lock:
+        if completed:
+            event["current_day"] = min(_index().current_day + 1, 29)
+        _append(event)
+    return event
+
+
+def skip_day(day_number, notes=""):
+    """Registra el dia como omitido (no completado) y avanza al siguiente. Returns: el evento."""
+    event = {
+        "session": _session(day_number, 0, False, notes),
+        "current_day": min(day_number + 1, 29),
+    }
+    _append(event)
+    return event
 
 
 def reset_program():
-    """Reinicia el programa al dia 1 sin borrar el historial."""
-    data = _load()
-    data["current_day"] = 1
-    _save(data)
-    return data
+    """Reinicia el programa al dia 1 sin borrar el historial. Returns: el evento."""
+    event = {"current_day": 1}
+    _append(event)
+    return event
 
 
 def sessions_in_month(year, month):
     """Devuelve lista de sesiones completadas en un mes."""
-    data = _load()
-    result = []
-    for s in data["sessions"]:
-        if not s.get("completed"):
-            continue
-        try:
-            d = datetime.strptime(s["date"], "%Y-%m-%d").date()
-            if d.year == year and d.month == month:
-                result.append(s)
-        except (ValueError, KeyError):
-            continue
-    return result
+    return list(_index().by_month.get((year, month), []))
 
 
 def monthly_stats(year, month):
@@ -86,18 +204,24 @@ def monthly_stats(year, month):
     }
 
 
+def yearly_stats(year):
+    """monthly_stats de todos los meses del año (solo meses con sesiones).
+    Returns: {month: {sessions_count, minutes_total}}."""
+    result = {}
+    for (y, month), sessions in _index().by_month.items():
+        if y == year:
+            result[month] = {
+                "sessions_count": len(sessions),
+                "minutes_total": sum(s.get("duration_min", 0) for s in sessions),
+            }
+    return result
+
+
 def get_meditation_dates(days_back=90):
     """Devuelve set de fechas (YYYY-MM-DD) con al menos una sesion completada en los ultimos N dias."""
-    data = _load()
     cutoff = date.today() - timedelta(days=days_back)
     result = set()
-    for s in data["sessions"]:
-        if not s.get("completed"):
-            continue
-        try:
-            d = datetime.strptime(s["date"], "%Y-%m-%d").date()
-            if d >= cutoff:
-                result.add(s["date"])
-        except (ValueError, KeyError):
-            continue
+    for d, sessions in _index().by_date.items():
+        if d >= cutoff:
+            result.update(s["date"] for s in sessions)
     return result
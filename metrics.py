@@ -0,0 +1,254 @@
+"""
+Métricas livianas del proceso: tiempos, llamadas HTTP y hits/misses de cache.
+
+Todo queda en memoria, en un registro único por proceso y thread-safe (en el
+dashboard lo comparten todas las sesiones). Nada se manda a ningún lado: el
+dashboard lo muestra en el panel de debug y los scripts de sync lo vuelcan
+con --metrics json|prom.
+
+    timers  nombre -> llamadas, segundos totales y máximo (fetch por fuente, render del PDF)
+    http    (proveedor, endpoint) -> llamadas, bytes de respuesta, segundos y
+            llamadas sin tamaño conocido (garminconnect no expone la respuesta)
+    cache   capa -> hits / misses
+
+Uso:
+    import metrics
+    with metrics.timer('source.garmin'):
+        ...
+    response = scheduler.call(metrics.http_call, 'whoop', 'activity/sleep', session.get, url)
+    metrics.cache_hit('json_cache') / metrics.cache_miss('json_cache')
+    with metrics.cache_lookup('closed_months'):   # capas que no avisan del hit (st.cache_data)
+        result = cached_fn(...)                   # su cuerpo llama a cache_miss('closed_months')
+    print(metrics.format_stats())
+    metrics.dump_from_args(sys.argv[1:])          # --metrics json|prom [--metrics-file PATH]
+"""
+
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# Prefijo de los nombres de métrica en el formato de texto de Prometheus
+PROM_PREFIX = 'fitness'
+
+DUMP_FORMATS = ('json', 'prom')
+
+_lock = threading.Lock()
+_timers = {}     # nombre -> [llamadas, segundos totales, máximo]
+_http = {}       # (proveedor, endpoint) -> [llamadas, bytes, segundos, sin tamaño]
+_cache = {}      # capa -> [hits, misses]
+
+# Misses marcados por el thread actual (ver cache_lookup)
+_local = threading.local()
+
+
+def record_time(name, seconds):
+    with _lock:
+        entry = _timers.setdefault(name, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+
+
+@contextmanager
+def timer(name):
+    """Suma el wall time del bloque a `name` (también si el bloque lanza)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_time(name, time.perf_counter() - start)
+
+
+def timed(name):
+    """Decorador: cada llamada a la función cuenta en el timer `name`."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timer(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_http(provider, endpoint, nbytes, seconds):
+    """nbytes None: tamaño desconocido (la llamada cuenta, los bytes no)."""
+    with _lock:
+        entry = _http.setdefault((provider, endpoint), [0, 0, 0.0, 0])
+        entry[0] += 1
+        if nbytes is None:
+            entry[3] += 1
+        else:
+            entry[1] += nbytes
+        entry[2] += seconds
+
+
+def _response_size(result):
+    """Bytes del cuerpo de un requests.Response (Content-Length, o el cuerpo ya
+    leído). None si no es una respuesta HTTP: garminconnect devuelve el JSON ya
+    parseado, y re-serializarlo solo para medirlo costaría más que la métrica."""
+    headers = getattr(result, 'headers', None)
+    if headers is None:
+        return None
+    length = headers.get('Content-Length')
+    if length and length.isdigit():
+        return int(length)
+    content = getattr(result, 'content', None)
+    return len(content) if isinstance(content, bytes) else None
+
+
+def http_call(provider, endpoint, fn, *args, **kwargs):
+    """fn(*args, **kwargs) contando la llamada, los bytes de respuesta y su
+    tiempo en (provider, endpoint). Pensado para ir dentro del scheduler de
+    rate_limit, así cada reintento cuenta y la espera del bucket no."""
+    start = time.perf_counter()
+    result = None
+    try:
+        result = fn(*args, **kwargs)
+        return result
+    finally:
+        record_http(provider, endpoint, _response_size(result), time.perf_counter() - start)
+
+
+def cache_hit(layer, n=1):
+    with _lock:
+        _cache.setdefault(layer, [0, 0])[0] += n
+
+
+def cache_miss(layer, n=1):
+    with _lock:
+        _cache.setdefault(layer, [0, 0])[1] += n
+    misses = getattr(_local, 'misses', None)
+    if misses is not None:
+        misses[layer] = misses.get(layer, 0) + n
+
+
+@contextmanager
+def cache_lookup(layer):
+    """Para capas que solo se enteran del miss (el cuerpo de una función
+    st.cache_data corre únicamente cuando no está cacheada): si dentro del
+    bloque este thread no llamó a cache_miss(layer), cuenta como hit."""
+    if getattr(_local, 'misses', None) is None:
+        _local.misses = {}
+    before = _local.misses.get(layer, 0)
+    yield
+    if _local.misses.get(layer, 0) == before:
+        cache_hit(layer)
+
+
+def snapshot():
+    """Copia de todas las métricas como dicts/números (serializable a JSON)."""
+    with _lock:
+        timers = {
+            name: {'count': count, 'total_s': round(total, 4), 'max_s': round(peak, 4)}
+            for name, (count, total, peak) in sorted(_timers.items())
+        }
+        http = {}
+        for (provider, endpoint), (calls, nbytes, seconds, unsized) in sorted(_http.items()):
+            http.setdefault(provider, {})[endpoint] = {
+                'calls': calls, 'bytes': nbytes, 'seconds': round(seconds, 4), 'unsized': unsized,
+            }
+        cache = {
+            layer: {'hits': hits, 'misses': misses}
+            for layer, (hits, misses) in sorted(_cache.items())
+        }
+    return {'timers': timers, 'http': http, 'cache': cache}
+
+
+def reset():
+    with _lock:
+        _timers.clear()
+        _http.clear()
+        _cache.clear()
+
+
+def to_json(indent=2):
+    return json.dumps(snapshot(), indent=indent)
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def to_prometheus():
+    """Formato de texto de Prometheus (p. ej. para el textfile collector de node_exporter)."""
+    s = snapshot()
+    p = PROM_PREFIX
+    lines = []
+
+    def family(name, kind, help_text, samples):
+        lines.append(f"# HELP {p}_{name} {help_text}")
+        lines.append(f"# TYPE {p}_{name} {kind}")
+        for labels, value in samples:
+            label_str = ','.join(f'{k}="{_label(v)}"' for k, v in labels.items())
+            lines.append(f"{p}_{name}{{{label_str}}} {value}")
+
+    family('timer_calls_total', 'counter', 'Llamadas cronometradas',
+           [({'name': n}, t['count']) for n, t in s['timers'].items()])
+    family('timer_seconds_total', 'counter', 'Segundos acumulados',
+           [({'name': n}, t['total_s']) for n, t in s['timers'].items()])
+    family('timer_seconds_max', 'gauge', 'Llamada más lenta (segundos)',
+           [({'name': n}, t['max_s']) for n, t in s['timers'].items()])
+
+    http = [
+        ({'provider': provider, 'endpoint': endpoint}, e)
+        for provider, endpoints in s['http'].items()
+        for endpoint, e in endpoints.items()
+    ]
+    family('http_requests_total', 'counter', 'Requests HTTP por endpoint',
+           [(labels, e['calls']) for labels, e in http])
+    family('http_response_bytes_total', 'counter', 'Bytes de respuesta por endpoint',
+           [(labels, e['bytes']) for labels, e in http])
+    family('http_seconds_total', 'counter', 'Segundos en requests por endpoint',
+           [(labels, e['seconds']) for labels, e in http])
+    family('http_unsized_responses_total', 'counter', 'Respuestas sin tamaño conocido (no suman bytes)',
+           [(labels, e['unsized']) for labels, e in http])
+
+    family('cache_hits_total', 'counter', 'Hits por capa de cache',
+           [({'layer': layer}, c['hits']) for layer, c in s['cache'].items()])
+    family('cache_misses_total', 'counter', 'Misses por capa de cache',
+           [({'layer': layer}, c['misses']) for layer, c in s['cache'].items()])
+    return '\n'.join(lines) + '\n'
+
+
+def format_stats():
+    """Resumen legible (mismo estilo que http_pool / rate_limit.format_stats)."""
+    s = snapshot()
+    lines = []
+    for name, t in s['timers'].items():
+        lines.append(f"[METRICS] {name}: {t['count']} llamadas, {t['total_s']:.2f}s total, máx {t['max_s']:.2f}s")
+    for provider, endpoints in s['http'].items():
+        for endpoint, e in endpoints.items():
+            size = f"{e['bytes'] / 1024:.1f} KiB" if e['unsized'] < e['calls'] else "tamaño desconocido"
+            lines.append(f"[METRICS] {provider} {endpoint}: {e['calls']} requests, {size}, {e['seconds']:.2f}s")
+    for layer, c in s['cache'].items():
+        lines.append(f"[METRICS] cache {layer}: {c['hits']} hits, {c['misses']} misses")
+    return '\n'.join(lines) or "[METRICS] sin datos"
+
+
+def dump(fmt, path=None):
+    """Vuelca las métricas en `fmt` ('json' o 'prom') a path, o a stdout si no hay path."""
+    if fmt not in DUMP_FORMATS:
+        raise ValueError(f"Formato de métricas desconocido: {fmt} (usar {' | '.join(DUMP_FORMATS)})")
+    text = to_json() + '\n' if fmt == 'json' else to_prometheus()
+    if path:
+        with open(path, 'w') as f:
+            f.write(text)
+        print(f"[METRICS] Guardadas en {path}")
+    else:
+        print(text, end='')
+
+
+def dump_from_args(args):
+    """--metrics json|prom [--metrics-file PATH] de los scripts de sync (no hace nada sin --metrics)."""
+    if '--metrics' not in args:
+        return
+    idx = args.index('--metrics')
+    fmt = args[idx + 1] if idx + 1 < len(args) else 'json'
+    path = None
+    if '--metrics-file' in args:
+        f_idx = args.index('--metrics-file')
+        if f_idx + 1 < len(args):
+            path = args[f_idx + 1]
+    dump(fmt, path)
@@ -1,12 +1,20 @@
 """
 Generador de PDF para reporte histórico del Fitness Tracker.
 Usa fpdf2 (Python puro, sin binarios externos). Tema Dark Neon.
+
+get_historico_pdf cachea los bytes por hash del contenido del reporte:
+descargar otra vez un reporte que no cambió no vuelve a maquetar el PDF.
 """
 
+import hashlib
+import json
+import threading
+from collections import OrderedDict
 from fpdf import FPDF
 from datetime import datetime
 from constants import DASHBOARD_METRICS, MESES_NOMBRES, MESES_CORTOS
 from helpers import fmt, get_pct, get_status_class, calculate_averages, is_metric_met
+import metrics
 
 
 # Colores del tema Dark Neon
@@ -154,6 +162,43 @@ def _pct_status_color(pct):
     return RED
 
 
+# PDFs ya generados: sha256 del contenido -> bytes (LRU)
+PDF_CACHE_SIZE = 8
+_pdf_cache = OrderedDict()
+_pdf_cache_lock = threading.Lock()
+
+
+def report_key(all_data, metas, meses_cerrados, current_year):
+    """sha256 de todo lo que entra al PDF. Incluye la fecha porque el pie de
+    página dice "Generado dd/mm/yyyy"."""
+    payload = json.dumps(
+        [all_data, metas, list(meses_cerrados), current_year, datetime.now().strftime('%Y-%m-%d')],
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def get_historico_pdf(all_data, metas, meses_cerrados, current_year):
+    """generate_historico_pdf con cache LRU por contenido. Returns: bytes."""
+    key = report_key(all_data, metas, meses_cerrados, current_year)
+    with _pdf_cache_lock:
+        if key in _pdf_cache:
+            _pdf_cache.move_to_end(key)
+            metrics.cache_hit('pdf')
+            return _pdf_cache[key]
+
+    metrics.cache_miss('pdf')
+    pdf_bytes = generate_historico_pdf(all_data, metas, meses_cerrados, current_year)
+
+    with _pdf_cache_lock:
+        _pdf_cache[key] = pdf_bytes
+        _pdf_cache.move_to_end(key)
+        while len(_pdf_cache) > PDF_CACHE_SIZE:
+            _pdf_cache.popitem(last=False)
+    return pdf_bytes
+
+
+@metrics.timed('pdf.render')
 def generate_historico_pdf(all_data, metas, meses_cerrados, current_year):
     """Genera el PDF del reporte histórico. Returns: bytes."""
     pdf = FitnessReport()
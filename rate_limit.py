@@ -0,0 +1,232 @@
+"""
+Scheduler de requests por proveedor (WHOOP / Garmin) con rate limit.
+
+Cada proveedor tiene un token bucket compartido por todo el proceso: los
+threads del sync y del dashboard esperan turno en vez de disparar ráfagas que
+terminan en 429. Si igual llega un 429, se respeta Retry-After (o backoff
+exponencial con jitter), se pausa el bucket entero y se reintenta; agotados
+los reintentos se lanza RateLimitError en vez de devolver datos parciales.
+Además hay un presupuesto de llamadas por ventana (por corrida, en la
+práctica) para que un --all desbocado no se coma la cuota diaria.
+
+Uso:
+    import rate_limit
+    scheduler = rate_limit.get_scheduler('whoop')
+    response = scheduler.call(session.get, url, params=params)   # requests.Response
+    stats = scheduler.call(garmin.get_stats, '2026-03-01')        # Garmin: excepción 429
+    print(rate_limit.format_stats())
+"""
+
+import random
+import threading
+import time
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+
+# rate: requests/segundo sostenidos, burst: ráfaga máxima, budget: llamadas
+# por budget_window segundos (None = sin límite).
+# WHOOP documenta 100 req/min y 10.000 req/día; Garmin no publica límites,
+# ~1 req/s es lo que aguanta sin 429.
+PROVIDER_LIMITS = {
+    'whoop': {'rate': 100 / 60, 'burst': 10, 'budget': 2000, 'budget_window': 24 * 3600},
+    'garmin': {'rate': 1.0, 'burst': 3, 'budget': 500, 'budget_window': 24 * 3600},
+}
+
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0    # segundos, se duplica en cada reintento
+BACKOFF_MAX = 60.0
+
+
+class RateLimitError(Exception):
+    """429 persistente: se agotaron los reintentos."""
+
+
+class BudgetExceededError(RateLimitError):
+    """Se gastó el presupuesto de llamadas del proveedor en esta ventana."""
+
+
+def _retry_after_seconds(value):
+    """Retry-After en segundos ('120' o fecha HTTP). None si no se puede leer."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+        return max((when - datetime.now(when.tzinfo)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _rate_limited_response(response):
+    """Para respuestas 429 devuelve (True, retry_after); si no, (False, None)."""
+    if getattr(response, 'status_code', None) != 429:
+        return False, None
+    return True, _retry_after_seconds(response.headers.get('Retry-After'))
+
+
+def _rate_limited_exception(error):
+    """Detecta 429 en excepciones (requests.HTTPError, GarminConnectTooManyRequestsError)."""
+    response = getattr(error, 'response', None)
+    if response is None and error.__cause__ is not None:
+        response = getattr(error.__cause__, 'response', None)
+    if getattr(response, 'status_code', None) == 429:
+        return True, _retry_after_seconds(response.headers.get('Retry-After'))
+    if 'TooManyRequests' in type(error).__name__:
+        return True, None
+    # garminconnect >= 0.3.2 no adjunta la respuesta: "API Error 429 - ..."
+    if 'Error 429' in str(error):
+        return True, None
+    return False, None
+
+
+class TokenBucket:
+    """Token bucket thread-safe: acquire() bloquea hasta que haya un token."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def pause(self, seconds):
+        """Nadie saca tokens por `seconds` (tras un 429 el límite es del proveedor, no del thread)."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+
+    def acquire(self):
+        """Toma un token. Returns: segundos que hubo que esperar."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self.paused_until:
+                    self._refill(max(now, self.updated))
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return waited
+                    delay = (1 - self.tokens) / self.rate
+                else:
+                    delay = self.paused_until - now
+            time.sleep(delay)
+            waited += delay
+
+
+class RequestScheduler:
+    """Rate limit + reintentos en 429 + presupuesto de llamadas de un proveedor."""
+
+    def __init__(self, name, rate, burst, budget=None, budget_window=None,
+                 max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.budget = budget
+        self.budget_window = budget_window
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._calls = 0
+        self._total_calls = 0
+        self._retries = 0
+        self._waited = 0.0
+
+    def _spend(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.budget_window and now - self._window_start >= self.budget_window:
+                self._window_start = now
+                self._calls = 0
+            if self.budget is not None and self._calls >= self.budget:
+                raise BudgetExceededError(
+                    f"{self.name}: presupuesto de {self.budget} llamadas agotado"
+                )
+            self._calls += 1
+            self._total_calls += 1
+
+    def _backoff(self, attempt, retry_after):
+        """Retry-After si vino; si no, base * 2^attempt con full jitter."""
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def call(self, fn, *args, **kwargs):
+        """Ejecuta fn(*args, **kwargs) respetando el rate limit del proveedor.
+
+        Un 429 (respuesta con status 429 o excepción que lo envuelve) pausa el
+        bucket y reintenta hasta max_retries veces. Otros errores se propagan
+        sin reintentar. Raises RateLimitError / BudgetExceededError.
+        """
+        for attempt in range(self.max_retries + 1):
+            self._spend()
+            waited = self.bucket.acquire()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                limited, retry_after = _rate_limited_exception(e)
+                if not limited:
+                    raise
+                last_error = e
+            else:
+                limited, retry_after = _rate_limited_response(result)
+                if not limited:
+                    with self._lock:
+                        self._waited += waited
+                    return result
+                last_error = f"HTTP 429 ({getattr(result, 'url', '')})"
+
+            if attempt == self.max_retries:
+                break
+            delay = self._backoff(attempt, retry_after)
+            print(f"[{self.name.upper()}] 429, reintento {attempt + 1}/{self.max_retries} en {delay:.1f}s")
+            with self._lock:
+                self._retries += 1
+                self._waited += waited
+            self.bucket.pause(delay)
+
+        raise RateLimitError(
+            f"{self.name}: 429 persistente tras {self.max_retries} reintentos: {last_error}"
+        )
+
+    def stats(self):
+        """{'calls', 'retries', 'waited', 'budget_left'}"""
+        with self._lock:
+            return {
+                'calls': self._total_calls,
+                'retries': self._retries,
+                'waited': round(self._waited, 1),
+                'budget_left': None if self.budget is None else self.budget - self._calls,
+            }
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(provider):
+    """Scheduler único del proceso para 'whoop' o 'garmin'."""
+    with _schedulers_lock:
+        if provider not in _schedulers:
+            _schedulers[provider] = RequestScheduler(provider, **PROVIDER_LIMITS[provider])
+        return _schedulers[provider]
+
+
+def format_stats():
+    with _schedulers_lock:
+        schedulers = list(_schedulers.values())
+    return '\n'.join(
+        f"[RATE] {s.name}: {st['calls']} llamadas, {st['retries']} reintentos 429, "
+        f"{st['waited']}s esperando"
+        + (f", quedan {st['budget_left']} del presupuesto" if st['budget_left'] is not None else '')
+        for s in schedulers
+        for st in [s.stats()]
+    )
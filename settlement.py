@@ -0,0 +1,99 @@
+"""
+Política de meses "asentados" para los syncs --all.
+
+Un mes cerrado deja de cambiar unas semanas después de terminar (WHOOP puede
+re-scorear un par de días, Garmin sube actividades tarde). Una entrada del
+cache queda congelada (settled) cuando:
+    - se sincronizó al menos SETTLE_DAYS días después del fin del mes, y
+    - su conteo está completo (num_sleeps / days_with_data >= días del mes),
+      o el contenido no cambió respecto del sync anterior ya fuera de plazo
+      (meses con días sin reloj nunca llegan al conteo completo).
+Una entrada marcada incomplete (paginación cortada) nunca queda congelada.
+
+Los meses congelados se saltan en --all; --force los vuelve a pedir. Cada
+entrada guarda content_hash (hash de las métricas, sin synced_at) para
+saber si un resync forzado cambió algo.
+
+Uso:
+    import settlement
+    months = settlement.pending_months(cache, year, months, force='--force' in args)
+    new_data = settlement.mark(new_data, cache.get(key), 'num_sleeps')
+"""
+
+import hashlib
+import json
+from calendar import monthrange
+from datetime import datetime, timedelta
+
+# Días después del fin de mes a partir de los cuales un sync cuenta como definitivo
+SETTLE_DAYS = 7
+
+# Campos que no son datos del mes (no entran en el hash)
+_META_FIELDS = ('synced_at', 'content_hash', 'settled')
+
+
+def content_hash(entry):
+    """Hash corto de las métricas de una entrada (ignora synced_at y metadatos)."""
+    data = {k: v for k, v in entry.items() if k not in _META_FIELDS}
+    raw = json.dumps(data, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+def settle_date(year, month):
+    """Primer momento en que un sync del mes cuenta como definitivo."""
+    last_day = monthrange(year, month)[1]
+    return datetime(year, month, last_day) + timedelta(days=1 + SETTLE_DAYS)
+
+
+def _synced_after_settle(entry, year, month):
+    try:
+        synced_at = datetime.fromisoformat(entry.get('synced_at', ''))
+    except (TypeError, ValueError):
+        return False
+    return synced_at >= settle_date(year, month)
+
+
+def mark(new_data, previous, count_field):
+    """Agrega content_hash y settled a una entrada recién sincronizada.
+
+    - previous: entrada anterior del mismo mes en el cache (o None).
+    - count_field: 'num_sleeps' (WHOOP) o 'days_with_data' (Garmin).
+    """
+    year, month = new_data['year'], new_data['month']
+    new_data['content_hash'] = content_hash(new_data)
+
+    settled = False
+    if _synced_after_settle(new_data, year, month) and not new_data.get('incomplete'):
+        complete = new_data.get(count_field, 0) >= monthrange(year, month)[1]
+        stable = (
+            previous is not None
+            and previous.get('content_hash') == new_data['content_hash']
+            and _synced_after_settle(previous, year, month)
+        )
+        settled = complete or stable
+    new_data['settled'] = settled
+    return new_data
+
+
+def is_settled(entry):
+    return bool(entry and entry.get('settled'))
+
+
+def pending_months(cache, year, months, force=False):
+    """Meses de `months` que hay que pedir a la API (los no congelados, o todos con force)."""
+    if force:
+        return list(months)
+    pending = [m for m in months if not is_settled(cache.get(f"{year}-{m:02d}"))]
+    skipped = len(months) - len(pending)
+    if skipped:
+        print(f"   ⏭️  {skipped} meses asentados sin cambios (usar --force para re-sincronizarlos)")
+    return pending
+
+
+def report_change(previous, new_data):
+    """Línea de log tras re-sincronizar un mes que ya estaba congelado."""
+    if not is_settled(previous):
+        return None
+    if previous.get('content_hash') == new_data.get('content_hash'):
+        return "   = Sin cambios respecto del mes asentado"
+    return "   ⚠️  El mes asentado cambió en la API (cache actualizado)"
@@ -0,0 +1,228 @@
+"""
+Sync diario unificado - WHOOP y Garmin en paralelo, en un solo proceso.
+
+Uso:
+    python sync.py                  # Mes actual de ambos proveedores
+    python sync.py --all            # Todos los meses del año no asentados
+    python sync.py --all --force    # Incluye los meses ya asentados (ver settlement)
+    python sync.py --month 3 [--year 2026]
+    python sync.py --all --only garmin    # Solo un proveedor (whoop | garmin)
+    python sync.py --all --metrics prom --metrics-file sync.prom   # Vuelca métricas (json | prom, ver metrics)
+
+Cada proveedor corre en su propio thread con su propio timeout; si uno falla
+(o se pasa del timeout) el otro sigue y su cache se guarda igual. Los caches
+se escriben al final, de forma atómica, para los proveedores que terminaron
+bien; si uno se cortó por rate limit o timeout se guardan igual los meses que
+alcanzó a completar (como whoop_sync --per-month). El cron tarda lo que el
+proveedor más lento, no la suma.
+
+En GitHub Actions escribe en $GITHUB_OUTPUT:
+    whoop / garmin            = success | failure
+    whoop_auth / garmin_auth  = ok | failed   (tokens válidos: se pueden guardar como secret)
+Exit code 1 si algún proveedor falló.
+"""
+
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import garmin_sync
+import metrics
+import rate_limit
+import settlement
+import whoop_sync
+
+PROVIDERS = ('whoop', 'garmin')
+
+# Timeout (segundos) por proveedor para el sync completo
+PROVIDER_TIMEOUTS = {
+    'whoop': 600,
+    'garmin': 600,
+}
+
+
+class StepTimer:
+    """Tiempos por (proveedor, paso), thread-safe."""
+
+    def __init__(self):
+        self.steps = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def step(self, provider, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.steps.append((provider, name, elapsed))
+            metrics.record_time(f"sync.{provider}.{name}", elapsed)
+
+    def report(self):
+        lines = ["[TIMING]"]
+        for provider, name, elapsed in self.steps:
+            lines.append(f"   {provider:<7} {name:<8} {elapsed:7.1f}s")
+        return '\n'.join(lines)
+
+
+def _pending(cache, months, skip_settled):
+    """Filtra los meses asentados del cache del proveedor (solo en --all sin --force)."""
+    if not skip_settled:
+        return months
+    by_year = {}
+    for year, month in months:
+        by_year.setdefault(year, []).append(month)
+    return [
+        (year, month)
+        for year, year_months in by_year.items()
+        for month in settlement.pending_months(cache, year, year_months)
+    ]
+
+
+def _sync_whoop(months, timer, status, skip_settled, partial):
+    from whoop_client_v2_corrected import WhoopClientV2
+
+    with timer.step('whoop', 'login'):
+        whoop = WhoopClientV2()
+        if not whoop.auth.is_authenticated():
+            raise Exception("No hay tokens de WHOOP. Ejecuta: python whoop_sync.py --auth")
+        whoop.get_profile()
+    status['whoop_auth'] = 'ok'
+    print("   ✅ Conectado a WHOOP")
+
+    cache = whoop_sync.load_cache()
+    # sync_month / store_entry completan el mismo dict mes a mes
+    partial['cache'] = cache
+    months = _pending(cache, months, skip_settled)
+    with timer.step('whoop', 'fetch'):
+        by_year = {}
+        for year, month in months:
+            by_year.setdefault(year, []).append(month)
+        for year, year_months in by_year.items():
+            cache = whoop_sync.sync_months(whoop, year, year_months, cache)
+    return cache
+
+
+def _sync_garmin(months, timer, status, skip_settled, partial):
+    from garmin_client import GarminClient
+
+    with timer.step('garmin', 'login'):
+        garmin = GarminClient()
+        garmin.login()
+    status['garmin_auth'] = 'ok'
+    print("   ✅ Conectado a Garmin")
+
+    cache = garmin_sync.load_cache()
+    partial['cache'] = cache
+    months = _pending(cache, months, skip_settled)
+    with timer.step('garmin', 'fetch'):
+        for year, month in months:
+            cache = garmin_sync.sync_month(garmin, year, month, cache)
+    return cache
+
+
+_JOBS = {
+    'whoop': (_sync_whoop, whoop_sync.save_cache),
+    'garmin': (_sync_garmin, garmin_sync.save_cache),
+}
+
+
+def _start(provider, months, timer, status, skip_settled):
+    """Corre el sync del proveedor en un thread daemon (un timeout no bloquea la salida).
+    Returns: (thread, result) con result['cache'] o result['error'] al terminar;
+    result['partial']['cache'] es el cache con los meses completados hasta ahora."""
+    job = _JOBS[provider][0]
+    result = {'partial': {}}
+
+    def run():
+        try:
+            with timer.step(provider, 'total'):
+                result['cache'] = job(months, timer, status, skip_settled, result['partial'])
+        except BaseException as e:
+            result['error'] = e
+
+    thread = threading.Thread(target=run, name=f"sync_{provider}", daemon=True)
+    thread.start()
+    return thread, result
+
+
+def _write_github_outputs(outputs):
+    path = os.environ.get('GITHUB_OUTPUT')
+    if not path:
+        return
+    with open(path, 'a') as f:
+        for key, value in outputs.items():
+            f.write(f"{key}={value}\n")
+
+
+def main():
+    args = sys.argv[1:]
+    now = datetime.now()
+    months = whoop_sync.months_from_args(args, now)
+
+    providers = PROVIDERS
+    if '--only' in args:
+        idx = args.index('--only')
+        if idx + 1 >= len(args) or args[idx + 1] not in PROVIDERS:
+            print(f"Uso: python sync.py --only {' | '.join(PROVIDERS)}")
+            sys.exit(1)
+        providers = (args[idx + 1],)
+
+    skip_settled = '--all' in args and '--force' not in args
+
+    timer = StepTimer()
+    status = {f"{provider}_auth": 'failed' for provider in providers}
+    print(f"Sincronizando {', '.join(providers)}: "
+          f"{months[0][0]}-{months[0][1]:02d} a {months[-1][0]}-{months[-1][1]:02d}")
+
+    started = time.perf_counter()
+    running = {provider: _start(provider, months, timer, status, skip_settled) for provider in providers}
+
+    caches = {}
+    for provider, (thread, result) in running.items():
+        remaining = PROVIDER_TIMEOUTS[provider] - (time.perf_counter() - started)
+        thread.join(max(remaining, 0))
+        if thread.is_alive():
+            print(f"\n❌ {provider}: timeout ({PROVIDER_TIMEOUTS[provider]}s)")
+            status[provider] = 'failure'
+            keep_partial = True
+        elif 'error' in result:
+            print(f"\n❌ {provider}: {result['error']}")
+            status[provider] = 'failure'
+            keep_partial = isinstance(result['error'], rate_limit.RateLimitError)
+        else:
+            caches[provider] = result['cache']
+            status[provider] = 'success'
+            continue
+        if keep_partial and 'cache' in result['partial']:
+            # Copia: tras un timeout el thread puede seguir escribiendo meses
+            caches[provider] = dict(result['partial']['cache'])
+            print(f"   {provider}: se guardan los meses ya completados")
+
+    # Escritura al final y atómica: un proveedor que falló por otra causa
+    # (auth, error de la API) no toca su cache
+    for provider, cache in caches.items():
+        _JOBS[provider][1](cache)
+
+    import http_pool
+    print(f"\n{timer.report()}")
+    print(f"   total            {time.perf_counter() - started:7.1f}s")
+    print(http_pool.format_stats())
+    print(rate_limit.format_stats())
+    # También si algún proveedor falló: es cuando más interesa ver dónde se fue el tiempo
+    metrics.dump_from_args(args)
+
+    _write_github_outputs(status)
+    failed = [provider for provider in providers if status[provider] != 'success']
+    if failed:
+        print(f"\nFallaron: {', '.join(failed)}")
+        sys.exit(1)
+    print("\nListo! El dashboard usara estos datos automaticamente.")
+
+
+if __name__ == '__main__':
+    main()
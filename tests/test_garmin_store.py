@@ -0,0 +1,71 @@
+from datetime import datetime
+
+import garmin_store
+
+
+class FakeGarmin:
+    """get_daily_steps / get_activities con pasos fijos; anota los rangos pedidos."""
+
+    def __init__(self, steps, activities=()):
+        self.steps = steps
+        self.activities = list(activities)
+        self.ranges = []
+
+    def get_daily_steps(self, lo, hi):
+        self.ranges.append((lo.strftime('%Y-%m-%d'), hi.strftime('%Y-%m-%d')))
+        return {d: s for d, s in self.steps.items() if lo.strftime('%Y-%m-%d') <= d <= hi.strftime('%Y-%m-%d')}
+
+    def get_activities(self, lo, hi):
+        return [a for a in self.activities
+                if lo.strftime('%Y-%m-%d') <= a['startTimeLocal'][:10] <= hi.strftime('%Y-%m-%d')]
+
+
+NOW = datetime(2025, 3, 20, 12)
+
+
+def _day(steps, fetched_at='2025-03-19T00:00:00'):
+    return {'steps': steps, 'activities': 0, 'strength': 0, 'fetched_at': fetched_at}
+
+
+def test_closed_day_with_zero_steps_is_not_refetched():
+    store = {'2025-03-01': _day(0, '2025-03-05T08:00:00')}
+    pending = garmin_store.days_to_fetch(store, datetime(2025, 3, 1), datetime(2025, 3, 1), NOW)
+    assert pending == []
+
+
+def test_day_saved_before_it_ended_is_refetched():
+    store = {'2025-03-01': _day(4000, '2025-03-01T18:00:00')}
+    pending = garmin_store.days_to_fetch(store, datetime(2025, 3, 1), datetime(2025, 3, 1), NOW)
+    assert pending == [datetime(2025, 3, 1)]
+
+
+def test_today_and_yesterday_are_always_refetched():
+    store = {d: _day(5000, '2025-03-20T11:00:00') for d in ('2025-03-18', '2025-03-19', '2025-03-20')}
+    pending = garmin_store.days_to_fetch(store, datetime(2025, 3, 18), datetime(2025, 3, 20), NOW)
+    assert pending == [datetime(2025, 3, 19), datetime(2025, 3, 20)]
+
+
+def test_day_missing_from_response_stays_pending():
+    garmin = FakeGarmin({'2025-03-01': 8000, '2025-03-03': 0})
+    store = {}
+    stored = garmin_store.update_store(store, garmin, datetime(2025, 3, 1), datetime(2025, 3, 3), NOW)
+
+    assert stored == 2
+    assert '2025-03-02' not in store
+    assert store['2025-03-03']['steps'] == 0
+    pending = garmin_store.days_to_fetch(store, datetime(2025, 3, 1), datetime(2025, 3, 3), NOW)
+    assert pending == [datetime(2025, 3, 2)]
+
+
+def test_pending_days_are_fetched_in_contiguous_runs():
+    store = {f"2025-03-{d:02d}": _day(6000) for d in range(2, 17)}
+    garmin = FakeGarmin(
+        {'2025-03-01': 100, '2025-03-19': 200, '2025-03-20': 300},
+        [{'startTimeLocal': '2025-03-19 07:00:00', 'activityType': {'typeKey': 'strength_training'}}],
+    )
+    garmin_store.update_store(store, garmin, datetime(2025, 3, 1), datetime(2025, 3, 20), NOW)
+
+    # 17 y 18 faltan en el store y en la respuesta: quedan pendientes
+    assert garmin.ranges == [('2025-03-01', '2025-03-01'), ('2025-03-17', '2025-03-20')]
+    assert store['2025-03-19']['strength'] == 1
+    assert store['2025-03-05']['steps'] == 6000
@@ -0,0 +1,75 @@
+import sys
+from datetime import datetime
+
+import rate_limit
+import settlement
+import whoop_client_v2_corrected
+import whoop_sync
+
+
+def _entry(year, month, synced_at, num_sleeps, **extra):
+    return {'year': year, 'month': month, 'synced_at': synced_at.isoformat(),
+            'num_sleeps': num_sleeps, 'sleep_hours_avg': 7.5, **extra}
+
+
+def test_complete_month_synced_after_settle_date_is_settled():
+    entry = settlement.mark(_entry(2025, 1, datetime(2025, 2, 10), 31), None, 'num_sleeps')
+    assert entry['settled']
+
+
+def test_month_synced_before_settle_date_stays_open():
+    entry = settlement.mark(_entry(2025, 1, datetime(2025, 2, 3), 31), None, 'num_sleeps')
+    assert not entry['settled']
+
+
+def test_incomplete_count_settles_only_when_unchanged():
+    first = settlement.mark(_entry(2025, 1, datetime(2025, 2, 10), 28), None, 'num_sleeps')
+    assert not first['settled']
+    second = settlement.mark(_entry(2025, 1, datetime(2025, 2, 11), 28), first, 'num_sleeps')
+    assert second['settled']
+    changed = settlement.mark(_entry(2025, 1, datetime(2025, 2, 12), 29), second, 'num_sleeps')
+    assert not changed['settled']
+
+
+def test_incomplete_pagination_never_settles():
+    entry = _entry(2025, 1, datetime(2025, 2, 10), 31, incomplete=['sleep'])
+    assert not settlement.mark(entry, None, 'num_sleeps')['settled']
+
+
+def test_pending_months_skips_settled_unless_forced():
+    cache = {'2025-01': {'settled': True}, '2025-02': {'settled': False}}
+    assert settlement.pending_months(cache, 2025, [1, 2, 3]) == [2, 3]
+    assert settlement.pending_months(cache, 2025, [1, 2, 3], force=True) == [1, 2, 3]
+
+
+class FakeWhoop:
+    """WhoopClientV2 (y su auth) con tokens válidos, sin red."""
+
+    tokens = {'refresh_token': 'r'}
+
+    def __init__(self, max_concurrency=None):
+        self.auth = self
+
+    def is_authenticated(self):
+        return True
+
+    def get_profile(self):
+        return {}
+
+
+def test_sync_all_saves_completed_months_on_rate_limit(monkeypatch):
+    saved = []
+    monkeypatch.setattr(whoop_client_v2_corrected, 'WhoopClientV2', FakeWhoop)
+    monkeypatch.setattr(whoop_sync, 'load_cache', dict)
+    monkeypatch.setattr(whoop_sync, 'save_cache', lambda cache: saved.append(dict(cache)))
+
+    def sync_months(whoop, year, months, cache):
+        cache[f"{year}-01"] = {'num_sleeps': 31}
+        raise rate_limit.RateLimitError('429')
+
+    monkeypatch.setattr(whoop_sync, 'sync_months', sync_months)
+    monkeypatch.setattr(sys, 'argv', ['whoop_sync.py', '--all'])
+
+    whoop_sync.main()
+
+    assert saved == [{f"{datetime.now().year}-01": {'num_sleeps': 31}}]
@@ -0,0 +1,41 @@
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+import whoop_aggregates
+from whoop_records import Workout
+
+
+def _workout(start, tz, sport_name='meditation'):
+    return Workout(None, start, None, tz, None, sport_name, None, 0, 0, 0)
+
+
+def test_negative_offset_with_minutes_keeps_the_sign():
+    assert whoop_aggregates._parse_tz_offset('-03:30') == -timedelta(hours=3, minutes=30)
+    assert whoop_aggregates._parse_tz_offset('+05:45') == timedelta(hours=5, minutes=45)
+    assert whoop_aggregates._parse_tz_offset('-06:00') == timedelta(hours=-6)
+
+
+def test_to_local_applies_each_record_offset():
+    local = whoop_aggregates.to_local(
+        ['2025-03-10T02:00:00.000Z', '2025-03-10T02:00:00.000Z', None],
+        ['-03:30', '+05:30', '-03:30'],
+    )
+    assert local[0] == np.datetime64(datetime(2025, 3, 9, 22, 30), 'ms')
+    assert local[1] == np.datetime64(datetime(2025, 3, 10, 7, 30), 'ms')
+    assert np.isnat(local[2])
+
+
+def test_workout_local_date_crosses_midnight_backwards():
+    # 02:15 UTC con -03:30 es 22:45 del día anterior (con +03:30 sería el mismo día)
+    assert whoop_aggregates.workout_local_date(_workout('2025-03-10T02:15:00.000Z', '-03:30')) == date(2025, 3, 9)
+
+
+def test_count_activity_days_uses_local_dates():
+    workouts = [
+        _workout('2025-04-01T02:00:00.000Z', '-03:30'),   # 31/03 local: fuera de abril
+        _workout('2025-04-02T12:00:00.000Z', '-03:30'),
+        _workout('2025-04-02T20:00:00.000Z', '-03:30'),   # mismo día local
+        _workout('2025-04-03T12:00:00.000Z', '-03:30', sport_name='running'),
+    ]
+    assert whoop_aggregates.count_activity_days(workouts, 'meditation', 2025, 4) == 1
@@ -0,0 +1,79 @@
+from datetime import datetime
+
+import pytest
+
+import whoop_checkpoint
+import whoop_sync
+from whoop_client_v2_corrected import PaginationError, WhoopClientV2
+
+
+class FakeApi:
+    """_make_request de WHOOP con páginas de 2 records; falla en fail_at (1-based)."""
+
+    def __init__(self, pages, fail_at=None):
+        self.pages = pages
+        self.fail_at = fail_at
+        self.tokens = []
+
+    def __call__(self, endpoint, params=None):
+        token = params.get('nextToken')
+        self.tokens.append(token)
+        index = int(token) if token else 0
+        if self.fail_at is not None and index + 1 == self.fail_at:
+            raise Exception('timeout')
+        next_token = str(index + 1) if index + 1 < self.pages else None
+        return {'records': [{'id': index * 2}, {'id': index * 2 + 1}], 'next_token': next_token}
+
+
+def _client(api):
+    client = WhoopClientV2.__new__(WhoopClientV2)
+    client._make_request = api
+    return client
+
+
+@pytest.fixture(autouse=True)
+def checkpoint_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(whoop_checkpoint, 'CHECKPOINT_DIR', str(tmp_path))
+    return tmp_path
+
+
+def test_closed_range_resumes_from_saved_next_token():
+    start, end = datetime(2025, 1, 1), datetime(2025, 3, 31, 23, 59, 59)
+
+    api = FakeApi(pages=5, fail_at=4)
+    with pytest.raises(PaginationError):
+        list(_client(api).iter_records('activity/sleep', start, end))
+
+    api = FakeApi(pages=5)
+    records = list(_client(api).iter_records('activity/sleep', start, end))
+
+    assert [r['id'] for r in records] == list(range(10))
+    # Las 3 páginas guardadas no se vuelven a pedir
+    assert api.tokens == ['3', '4']
+
+
+def test_finished_range_clears_checkpoint(checkpoint_dir):
+    start, end = datetime(2025, 1, 1), datetime(2025, 1, 31, 23, 59, 59)
+    list(_client(FakeApi(pages=3)).iter_records('recovery', start, end))
+    assert list(checkpoint_dir.iterdir()) == []
+
+
+def test_open_range_is_not_checkpointed(checkpoint_dir):
+    now = datetime.now()
+    start, end = datetime(now.year, now.month, 1), datetime(now.year + 1, 1, 1)
+    with pytest.raises(PaginationError):
+        list(_client(FakeApi(pages=5, fail_at=2)).iter_records('activity/sleep', start, end))
+    assert list(checkpoint_dir.iterdir()) == []
+
+
+def test_sync_months_pages_current_month_apart(monkeypatch):
+    calls = []
+    monkeypatch.setattr(whoop_sync, 'sync_year', lambda w, y, months, c: calls.append(list(months)) or c)
+    monkeypatch.setattr(whoop_sync, 'sync_month', lambda w, y, month, c: calls.append([month]) or c)
+    now = datetime.now()
+    months = list(range(1, now.month + 1))
+
+    whoop_sync.sync_months(None, now.year, months, {})
+
+    assert calls[-1] == [now.month]
+    assert [m for run in calls for m in run] == months
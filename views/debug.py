@@ -0,0 +1,62 @@
+"""
+Panel de debug: métricas del proceso (ver metrics.py), colapsado al pie del
+dashboard. Solo se muestra con config.DEBUG_PANEL (FITNESS_DEBUG=1 o secrets).
+"""
+import streamlit as st
+import http_pool
+import metrics
+import rate_limit
+
+
+def _section(text):
+    st.markdown(f'<div class="dn-section">{text}</div>', unsafe_allow_html=True)
+
+
+def show():
+    """Contenido del expander DEBUG. Las métricas son del proceso: incluyen
+    todas las sesiones abiertas desde el último reinicio."""
+    snap = metrics.snapshot()
+
+    _section("TIEMPOS")
+    if snap['timers']:
+        st.dataframe([
+            {'nombre': name, 'llamadas': t['count'], 'total (s)': t['total_s'],
+             'prom (ms)': round(t['total_s'] / t['count'] * 1000, 1), 'máx (s)': t['max_s']}
+            for name, t in snap['timers'].items()
+        ], hide_index=True, use_container_width=True)
+    else:
+        st.caption("Sin datos todavía")
+
+    _section("HTTP POR ENDPOINT")
+    rows = [
+        {'proveedor': provider, 'endpoint': endpoint, 'requests': e['calls'],
+         'KiB': round(e['bytes'] / 1024, 1) if e['unsized'] < e['calls'] else None,
+         'total (s)': e['seconds']}
+        for provider, endpoints in snap['http'].items()
+        for endpoint, e in endpoints.items()
+    ]
+    if rows:
+        st.dataframe(rows, hide_index=True, use_container_width=True)
+    else:
+        st.caption("Sin requests todavía (todo salió de cache)")
+
+    _section("CACHES")
+    if snap['cache']:
+        st.dataframe([
+            {'capa': layer, 'hits': c['hits'], 'misses': c['misses'],
+             'hit rate': f"{c['hits'] / (c['hits'] + c['misses']):.0%}" if c['hits'] + c['misses'] else '-'}
+            for layer, c in snap['cache'].items()
+        ], hide_index=True, use_container_width=True)
+    else:
+        st.caption("Sin datos todavía")
+
+    st.code('\n'.join(line for line in (http_pool.format_stats(), rate_limit.format_stats()) if line))
+
+    # Sin RESET: las métricas son de todo el proceso (reiniciar la app las limpia)
+    col_json, col_prom = st.columns(2)
+    with col_json:
+        st.download_button("JSON", metrics.to_json(), file_name="metrics.json",
+                           mime="application/json", use_container_width=True)
+    with col_prom:
+        st.download_button("PROMETHEUS", metrics.to_prometheus(), file_name="metrics.prom",
+                           mime="text/plain", use_container_width=True)
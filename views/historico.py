@@ -5,8 +5,8 @@ import streamlit as st
 from datetime import datetime
 from constants import MESES_NOMBRES, MESES_CORTOS, DASHBOARD_METRICS, ALL_METRIC_KEYS
 from helpers import fmt, get_pct, get_status, get_status_class, is_metric_met, calculate_score, calculate_averages
-from data_loader import get_monthly_data
-from pdf_export import generate_historico_pdf
+from data_loader import get_year_data
+from pdf_export import get_historico_pdf, report_key
 
 
 def _html_table(headers, rows):
@@ -41,23 +41,32 @@ def show(metas, current_month, current_year):
         st.info("No hay meses cerrados aun.")
         return
 
-    all_data = []
     with st.spinner('Cargando historico...'):
-        for mes in meses_cerrados:
-            all_data.append(get_monthly_data(current_year, mes))
+        all_data = get_year_data(current_year, tuple(meses_cerrados))
 
     avg_data = calculate_averages(all_data)
     n = len(all_data)
     avg_score = sum(is_metric_met(key, avg_data[key], metas[key]) for key in historico_keys)
 
     # ---- EXPORTAR PDF ----
-    pdf_bytes = generate_historico_pdf(all_data, metas, meses_cerrados, current_year)
-    st.download_button(
-        "EXPORTAR PDF",
-        data=pdf_bytes,
-        file_name=f"fitness_tracker_{current_year}.pdf",
-        mime="application/pdf",
-    )
+    # El PDF se genera recién con GENERAR PDF, no en cada rerun. download_button
+    # necesita los bytes ya armados (streamlit 1.50 no acepta data callable),
+    # así que quedan en session_state para los reruns siguientes, bajo la misma
+    # clave de contenido que usa el cache de pdf_export: si cambian datos o metas
+    # se vuelve a pedir GENERAR PDF.
+    pdf_id = report_key(all_data, metas, meses_cerrados, current_year)
+    pdf = st.session_state.get('historico_pdf')
+    if pdf is None or pdf[0] != pdf_id:
+        if st.button("GENERAR PDF"):
+            pdf = (pdf_id, get_historico_pdf(all_data, metas, meses_cerrados, current_year))
+            st.session_state.historico_pdf = pdf
+    if pdf is not None and pdf[0] == pdf_id:
+        st.download_button(
+            "EXPORTAR PDF",
+            data=pdf[1],
+            file_name=f"fitness_tracker_{current_year}.pdf",
+            mime="application/pdf",
+        )
 
     # ---- PROMEDIO GENERAL ----
     st.markdown(
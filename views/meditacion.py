@@ -15,6 +15,7 @@ from constants import MIND_METRICS, MESES_NOMBRES, MESES_CORTOS
 from helpers import render_metric_row
 import meditation_log as mlog
 import meditation_program as mprog
+import whoop_aggregates
 
 
 # ============ TIMER + VOZ + CAMPANAS ============
@@ -482,10 +483,7 @@ def _show_programa():
             st.rerun()
     with col_b:
         if st.button("OMITIR DIA", use_container_width=True, key="skip_day"):
-            mlog.log_session(current_day, 0, completed=False, notes=f"OMITIDO: {notes}")
-            data = mlog._load()
-            data["current_day"] = min(current_day + 1, 29)
-            mlog._save(data)
+            mlog.skip_day(current_day, notes=f"OMITIDO: {notes}")
             st.info("Dia omitido. Avanzas al siguiente.")
             st.rerun()
 
@@ -643,52 +641,41 @@ def _show_correlacion():
     start_date = end_date - timedelta(days=60)
 
     try:
-        from whoop_streamlit import _get_all_records
-        recoveries = _get_all_records('recovery', start_date, end_date)
-        sleeps = _get_all_records('activity/sleep', start_date, end_date)
+        from whoop_streamlit import _get_records
+        recoveries = _get_records('recovery', start_date, end_date)
+        sleeps = _get_records('activity/sleep', start_date, end_date)
     except Exception as e:
         st.warning(f"No se pudo obtener datos de WHOOP en vivo: {e}")
         st.info("La correlacion requiere acceso a la API de WHOOP (no usa cache mensual).")
         return
 
-    # Mapear por fecha (YYYY-MM-DD): cada cycle/sleep tiene 'created_at' o 'start'
+    # Mapear por fecha local (YYYY-MM-DD) del despertar: cada sleep por su 'end'
+    # (o 'start') con su timezone_offset, convertidos en lote; cada recovery por
+    # el dia de su sleep (sleep_id) o, si no esta, por su created_at
+    sleeps = [s for s in sleeps if not s.nap]
+    wake_days = whoop_aggregates.to_local(
+        [s.end or s.start for s in sleeps],
+        [s.timezone_offset for s in sleeps],
+    ).astype('datetime64[D]').astype(str)
+    sleep_days = {s.id: day for s, day in zip(sleeps, wake_days) if day != 'NaT'}
+
     daily = {}  # date_str -> {'recovery': X, 'rhr': Y, 'sleep_consistency': Z, 'sleep_h': W}
     for r in recoveries:
-        try:
-            cstr = r.get('created_at', '')[:10] or r.get('updated_at', '')[:10]
-            if not cstr:
-                continue
-            score = r.get('score') or {}
-            rs = score.get('recovery_score')
-            rhr = score.get('resting_heart_rate')
-            if rs and rs > 0:
-                daily.setdefault(cstr, {})['recovery'] = rs
-            if rhr and rhr > 0:
-                daily.setdefault(cstr, {})['rhr'] = rhr
-        except Exception:
+        cstr = sleep_days.get(r.sleep_id) or (r.created_at or r.updated_at or '')[:10]
+        if not cstr:
             continue
+        if r.recovery_score > 0:
+            daily.setdefault(cstr, {})['recovery'] = r.recovery_score
+        if r.resting_hr > 0:
+            daily.setdefault(cstr, {})['rhr'] = r.resting_hr
 
-    for s in sleeps:
-        if s.get('nap'):
-            continue
-        try:
-            cstr = s.get('start', '')[:10]
-            if not cstr:
-                continue
-            score = s.get('score') or {}
-            sc = score.get('sleep_consistency_percentage')
-            stages = score.get('stage_summary') or {}
-            actual_ms = (
-                stages.get('total_light_sleep_time_milli', 0) +
-                stages.get('total_slow_wave_sleep_time_milli', 0) +
-                stages.get('total_rem_sleep_time_milli', 0)
-            )
-            if sc:
-                daily.setdefault(cstr, {})['sleep_consistency'] = sc
-            if actual_ms > 0:
-                daily.setdefault(cstr, {})['sleep_h'] = round(actual_ms / 3600000, 2)
-        except Exception:
+    for s, cstr in zip(sleeps, wake_days):
+        if cstr == 'NaT':
             continue
+        if s.consistency:
+            daily.setdefault(cstr, {})['sleep_consistency'] = s.consistency
+        if s.sleep_ms > 0:
+            daily.setdefault(cstr, {})['sleep_h'] = round(s.sleep_ms / 3600000, 2)
 
     if not daily:
         st.warning("Sin datos de WHOOP en los ultimos 60 dias.")
@@ -5,10 +5,10 @@ import streamlit as st
 from datetime import datetime
 from constants import MESES_NOMBRES, MESES_CORTOS, FITNESS_METRICS, SLEEP_METRICS, RECOVERY_METRICS, DASHBOARD_METRICS, ALL_METRIC_KEYS
 from helpers import fmt, get_pct, get_status, get_status_class, render_metric_row
-from data_loader import get_monthly_data
+from data_loader import get_year_data
 
 
-def show(data, metas, days_elapsed, days_in_month, progress_pct, current_month, current_year):
+def show(data, metas, days_elapsed, days_in_month, progress_pct, current_month, current_year, refreshing=False):
     # ---- HEADER ----
     st.markdown('<div class="dn-header">FITNESS TRACKER</div>', unsafe_allow_html=True)
     st.markdown(
@@ -61,7 +61,7 @@ def show(data, metas, days_elapsed, days_in_month, progress_pct, current_month,
     # ---- VS MES ANTERIOR ----
     if current_month > 1:
         prev_month = current_month - 1
-        prev_data = get_monthly_data(current_year, prev_month)
+        prev_data = get_year_data(current_year, (prev_month,))[0]
 
         st.markdown(
             f'<div class="dn-section">// VS {MESES_NOMBRES[prev_month]} {current_year}</div>',
@@ -108,8 +108,9 @@ def show(data, metas, days_elapsed, days_in_month, progress_pct, current_month,
 
     whoop_src = data.get('whoop_source', '?')
     garmin_src = data.get('garmin_source', '?')
+    refreshing_note = ' &middot; ACTUALIZANDO...' if refreshing else ''
     st.markdown(
         f'<div class="dn-footer">GARMIN: {garmin_src} &middot; WHOOP: {whoop_src} &middot; '
-        f'Last update: {datetime.now().strftime("%d/%m/%Y %H:%M")}</div>',
+        f'Last update: {datetime.now().strftime("%d/%m/%Y %H:%M")}{refreshing_note}</div>',
         unsafe_allow_html=True
     )
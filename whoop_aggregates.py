@@ -0,0 +1,436 @@
+"""
+Motor columnar de agregados de WHOOP (NumPy).
+
+Los records (whoop_records.Sleep / Recovery / Workout) se normalizan a
+columnas a medida que llegan las páginas: de cada uno se guardan solo los
+números que usan los agregados (sueño real, scores, millis por zona, start
+y timezone_offset), no el record. Los agregados de un mes, de varios meses o
+de ventanas arbitrarias salen de una sola pasada vectorizada (bincount por
+ventana) sobre esas columnas. Lo usan WhoopClientV2 (sync), whoop_streamlit
+(dashboard) y whoop_store (recalcular sin red).
+
+Uso:
+    columns = monthly_columns()                      # {'sleep', 'recovery', 'workouts'}
+    for record in client.iter_records('activity/sleep', start, end):
+        columns['sleep'].add(whoop_records.Sleep.from_api(record))
+    summarize_month(columns, 2026, 3)                # todos los records de las columnas
+    summarize_months(columns, [(2026, 1), (2026, 2)])   # {(year, month): resumen}, por mes UTC
+    summarize_windows(columns, [(start, end), ...])  # ventanas [start, end) UTC arbitrarias
+
+La hora local sale de to_local / local_dates, que convierten una página o
+columna entera de start + timezone_offset con datetime64 (cada offset
+distinto se parsea una sola vez). Los usan los agregados (9:30 PM, días de
+Meditacion / Sauna), count_activity_days, whoop_store y la vista de correlación.
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+DEFAULT_TZ = '-06:00'
+
+# 21:30 local en minutos desde medianoche (noches "antes de 9:30 PM")
+BEDTIME_CUTOFF_MINUTES = 21 * 60 + 30
+
+_MS_PER_MINUTE = 60_000
+_MS_PER_DAY = 86_400_000
+_MS_PER_HOUR = 3_600_000
+_EPOCH = datetime(1970, 1, 1)
+
+
+# ============ HORA LOCAL (EN LOTE) ============
+
+def _parse_tz_offset(tz):
+    """Convierte '-06:00' a timedelta, con signo correcto también en los minutos."""
+    sign = -1 if tz.startswith('-') else 1
+    parts = tz.lstrip('+-').split(':')
+    hours = int(parts[0])
+    minutes = int(parts[1]) if len(parts) > 1 else 0
+    return timedelta(hours=sign * hours, minutes=sign * minutes)
+
+
+# timezone_offset -> ms; en años de records hay un puñado de offsets distintos,
+# así que cada string se parsea una sola vez por proceso.
+_offset_ms_cache = {}
+
+
+def _offset_ms(tz):
+    offset = _offset_ms_cache.get(tz)
+    if offset is None:
+        offset = int(_parse_tz_offset(tz) // timedelta(milliseconds=1))
+        _offset_ms_cache[tz] = offset
+    return offset
+
+
+def _naive_utc(ts):
+    """Timestamp sin la 'Z' de WHOOP: vacío -> 'NaT'; con offset explícito (numpy no
+    los acepta) se pasa a UTC naive."""
+    if not ts:
+        return 'NaT'
+    if len(ts) > 19 and ts[-6] in '+-' and ts[-3] == ':':
+        dt = datetime.fromisoformat(ts)
+        return (dt - dt.utcoffset()).replace(tzinfo=None).isoformat()
+    return ts
+
+
+def _utc_ms(timestamps):
+    """Timestamps ISO UTC de WHOOP ('2026-03-01T03:00:00.000Z') -> (int64 ms desde
+    epoch, máscara de los que existen). ''/None quedan fuera de la máscara."""
+    times = np.array(
+        [ts[:-1] if ts and ts[-1] == 'Z' else _naive_utc(ts) for ts in timestamps],
+        dtype='datetime64[ms]',
+    )
+    return times.astype(np.int64), ~np.isnat(times)
+
+
+def _offsets_ms(offsets, default_tz=DEFAULT_TZ):
+    """timezone_offset de cada record (None -> default_tz) -> int64 ms."""
+    parsed = {tz: _offset_ms(tz or default_tz) for tz in set(offsets)}
+    return np.fromiter(map(parsed.__getitem__, offsets), dtype=np.int64, count=len(offsets))
+
+
+def _local_ms(utc_ms, present, offsets, default_tz=DEFAULT_TZ):
+    local = utc_ms + _offsets_ms(offsets, default_tz)
+    local[~present] = np.iinfo(np.int64).min   # NaT
+    return local
+
+
+def to_local(timestamps, offsets, default_tz=DEFAULT_TZ):
+    """Hora local de una página o columna entera de records, en una pasada.
+
+    timestamps: 'start' (o 'end') UTC de WHOOP; offsets: el timezone_offset de
+    cada record ('-06:00', '+05:30'; None -> default_tz, Costa Rica).
+    Returns: numpy datetime64[ms] local (NaT donde no hay timestamp).
+    """
+    utc_ms, present = _utc_ms(timestamps)
+    return _local_ms(utc_ms, present, offsets, default_tz).view('datetime64[ms]')
+
+
+def local_dates(records, field='start', default_tz=DEFAULT_TZ):
+    """Fecha local (datetime64[D], NaT si falta) del atributo field de cada
+    record (whoop_records.Sleep / Workout / Cycle) con su timezone_offset."""
+    return to_local(
+        [getattr(r, field) for r in records],
+        [r.timezone_offset for r in records],
+        default_tz,
+    ).astype('datetime64[D]')
+
+
+def workout_local_date(workout, default_tz=DEFAULT_TZ):
+    """Fecha local (date) de un solo record; para páginas enteras usar local_dates."""
+    day = local_dates([workout], default_tz=default_tz)[0]
+    return None if np.isnat(day) else day.item()
+
+
+def count_activity_days(workouts, keyword, year, month):
+    """Dias distintos del mes con >=1 workout (whoop_records.Workout) cuyo sport_name contiene keyword."""
+    matching = [w for w in workouts if w.is_sport(keyword)]
+    if not matching:
+        return 0
+    days = local_dates(matching)
+    in_month = days.astype('datetime64[M]') == np.datetime64(f"{year:04d}-{month:02d}", 'M')
+    return len(np.unique(days[in_month]))
+
+
+# ============ NORMALIZACIÓN A COLUMNAS ============
+
+class _StartColumns:
+    """Columnas con start / timezone_offset por record."""
+
+    def __init__(self):
+        self.start = []
+        self.tz = []
+        self._times = None
+
+    def __len__(self):
+        return len(self.start)
+
+    def times(self):
+        """(utc_ms, local_ms, present) de start, calculados una sola vez mientras
+        no lleguen records nuevos (ver to_local)."""
+        if self._times is None or len(self._times[0]) != len(self.start):
+            utc_ms, present = _utc_ms(self.start)
+            self._times = (utc_ms, _local_ms(utc_ms, present, self.tz), present)
+        return self._times
+
+
+class SleepColumns(_StartColumns):
+    """Sueño real (light + SWS + REM), performance y consistency por noche. Los naps
+    y los sleeps sin score cuentan en num_sleeps pero no en los promedios."""
+
+    def __init__(self):
+        super().__init__()
+        self.ids = []
+        self.valid = []
+        self.sleep_ms = []
+        self.performance = []
+        self.consistency = []
+
+    def add(self, sleep):
+        valid = sleep.scored and not sleep.nap
+        self.ids.append(sleep.id)
+        self.start.append(sleep.start or '')
+        self.tz.append(sleep.timezone_offset)
+        self.valid.append(valid)
+        if valid:
+            # sleep_ms = tiempo REAL dormido (no in bed)
+            self.sleep_ms.append(sleep.sleep_ms)
+            self.performance.append(sleep.performance)
+            self.consistency.append(sleep.consistency)
+        else:
+            self.sleep_ms.append(0)
+            self.performance.append(0)
+            self.consistency.append(0)
+
+    def starts_by_id(self):
+        return {sleep_id: start for sleep_id, start in zip(self.ids, self.start) if start}
+
+
+class RecoveryColumns:
+    """Recovery score, HRV y resting HR (los promedios solo con recovery_score > 0)."""
+
+    def __init__(self):
+        self.sleep_ids = []
+        self.created_at = []
+        self.valid = []
+        self.recovery = []
+        self.hrv = []
+        self.resting_hr = []
+
+    def add(self, rec):
+        valid = rec.recovery_score > 0
+        self.sleep_ids.append(rec.sleep_id)
+        self.created_at.append(rec.created_at or '')
+        self.valid.append(valid)
+        self.recovery.append(rec.recovery_score if valid else 0)
+        self.hrv.append(rec.hrv if valid else 0)
+        self.resting_hr.append(rec.resting_hr if valid else 0)
+
+    def __len__(self):
+        return len(self.valid)
+
+
+class WorkoutColumns(_StartColumns):
+    """HR zones (zone_durations vive en workouts, no en cycles) y si es Meditacion / Sauna."""
+
+    def __init__(self):
+        super().__init__()
+        self.zone_1_3_ms = []
+        self.zone_4_5_ms = []
+        self.meditation = []
+        self.sauna = []
+
+    def add(self, workout):
+        self.start.append(workout.start or '')
+        self.tz.append(workout.timezone_offset)
+        self.zone_1_3_ms.append(workout.zone_1_3_ms)
+        self.zone_4_5_ms.append(workout.zone_4_5_ms)
+        self.meditation.append(workout.is_sport('meditation'))
+        self.sauna.append(workout.is_sport('sauna'))
+
+
+def monthly_columns():
+    """Una columna por stream del resumen mensual: {'sleep', 'recovery', 'workouts'}."""
+    return {
+        'sleep': SleepColumns(),
+        'recovery': RecoveryColumns(),
+        'workouts': WorkoutColumns(),
+    }
+
+
+def columns_from_records(records):
+    """monthly_columns() cargadas con records ya parseados
+    ({'sleep': [Sleep, ...], 'recovery': [...], 'workouts': [...]}, ver whoop_records)."""
+    columns = monthly_columns()
+    for name, column in columns.items():
+        for record in records.get(name, ()):
+            column.add(record)
+    return columns
+
+
+# ============ AGREGADOS VECTORIZADOS ============
+
+def _to_ms(dt):
+    return int((dt - _EPOCH) // timedelta(milliseconds=1))
+
+
+def _month_window(year, month):
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return datetime(year, month, 1), end
+
+
+def _window_ids(times, present, bounds):
+    """Índice de la ventana [start, end) de cada timestamp (-1 si no cae en ninguna)."""
+    idx = np.searchsorted(bounds[:, 0], times, side='right') - 1
+    inside = present & (idx >= 0)
+    inside[inside] &= times[inside] < bounds[idx[inside], 1]
+    return np.where(inside, idx, -1)
+
+
+def _counts(ids, n, mask=None, weights=None):
+    selected = ids >= 0 if mask is None else (ids >= 0) & mask
+    w = None if weights is None else weights[selected]
+    return np.bincount(ids[selected], weights=w, minlength=n)
+
+
+def _mean(total, count):
+    return np.divide(total, count, out=np.zeros(len(total)), where=count > 0)
+
+
+def _sleep_summary(col, ids, n, bounds):
+    _, local, present = col.times()
+    valid = np.array(col.valid, dtype=bool)
+    sleep_ms = np.array(col.sleep_ms, dtype=np.int64)
+    performance = np.array(col.performance, dtype=np.float64)
+    consistency = np.array(col.consistency, dtype=np.float64)
+
+    # Antes de 9:30 PM en hora local (solo noches válidas con start)
+    minute_of_day = (local // _MS_PER_MINUTE) % (24 * 60)
+    before_930 = valid & present & (minute_of_day < BEDTIME_CUTOFF_MINUTES)
+
+    num_sleeps = _counts(ids, n)
+    valid_sleeps = _counts(ids, n, valid)
+    return [
+        {
+            'num_sleeps': int(num_sleeps[i]),
+            'valid_sleeps': int(valid_sleeps[i]),
+            'avg_sleep_hours': float(hours),
+            'avg_sleep_performance': float(perf),
+            'avg_sleep_consistency': float(cons),
+            'days_sleep_before_930pm': int(before),
+        }
+        for i, (hours, perf, cons, before) in enumerate(zip(
+            _mean(_counts(ids, n, valid, sleep_ms), valid_sleeps) / _MS_PER_HOUR,
+            _mean(_counts(ids, n, valid, performance), valid_sleeps),
+            _mean(_counts(ids, n, valid, consistency), valid_sleeps),
+            _counts(ids, n, before_930),
+        ))
+    ]
+
+
+def _recovery_summary(col, ids, n, bounds):
+    valid = np.array(col.valid, dtype=bool)
+    recovery = np.array(col.recovery, dtype=np.float64)
+    hrv = np.array(col.hrv, dtype=np.float64)
+    resting_hr = np.array(col.resting_hr, dtype=np.float64)
+    has_rhr = resting_hr > 0
+
+    num_recovery = _counts(ids, n)
+    valid_recovery = _counts(ids, n, valid)
+    rhr_count = _counts(ids, n, has_rhr)
+    avg_rhr = _mean(_counts(ids, n, has_rhr, resting_hr), rhr_count)
+    return [
+        {
+            'num_recovery': int(num_recovery[i]),
+            'avg_hrv': float(avg_hrv),
+            'avg_recovery_score': float(avg_recovery),
+            'avg_resting_hr': round(float(avg_rhr[i]), 1) if rhr_count[i] > 0 else 0,
+        }
+        for i, (avg_hrv, avg_recovery) in enumerate(zip(
+            _mean(_counts(ids, n, valid, hrv), valid_recovery),
+            _mean(_counts(ids, n, valid, recovery), valid_recovery),
+        ))
+    ]
+
+
+def _distinct_days(ids, days, mask, n):
+    """Días locales distintos por ventana entre los records de mask."""
+    selected = (ids >= 0) & mask
+    if not selected.any():
+        return np.zeros(n, dtype=np.int64)
+    pairs = np.unique(np.stack([ids[selected], days[selected]], axis=1), axis=0)
+    return np.bincount(pairs[:, 0], minlength=n)
+
+
+def _workout_summary(col, ids, n, bounds):
+    _, local, present = col.times()
+    zone_1_3 = np.array(col.zone_1_3_ms, dtype=np.int64)
+    zone_4_5 = np.array(col.zone_4_5_ms, dtype=np.int64)
+    meditation = np.array(col.meditation, dtype=bool)
+    sauna = np.array(col.sauna, dtype=bool)
+
+    # Dias con Meditacion / Sauna: fecha local dentro de las fechas de la ventana
+    days = local // _MS_PER_DAY
+    first_day, end_day = bounds[:, 0] // _MS_PER_DAY, bounds[:, 1] // _MS_PER_DAY
+    safe_ids = np.maximum(ids, 0)
+    in_window = present & (days >= first_day[safe_ids]) & (days < end_day[safe_ids])
+
+    num_workouts = _counts(ids, n)
+    meditation_days = _distinct_days(ids, days, meditation & in_window, n)
+    sauna_days = _distinct_days(ids, days, sauna & in_window, n)
+    return [
+        {
+            'num_workouts': int(num_workouts[i]),
+            'hr_zones_1_3_hours': float(z13),
+            'hr_zones_4_5_hours': float(z45),
+            'meditation_days': int(meditation_days[i]),
+            'sauna_days': int(sauna_days[i]),
+        }
+        for i, (z13, z45) in enumerate(zip(
+            _counts(ids, n, weights=zone_1_3) / _MS_PER_HOUR,
+            _counts(ids, n, weights=zone_4_5) / _MS_PER_HOUR,
+        ))
+    ]
+
+
+_SUMMARIES = {
+    'sleep': _sleep_summary,
+    'recovery': _recovery_summary,
+    'workouts': _workout_summary,
+}
+
+
+def _summarize(columns, bounds, assign):
+    """Resúmenes por ventana. assign=False: todos los records van a la única
+    ventana (el mes que ya filtró la API); si no, cada uno va a la ventana de
+    su start UTC (recovery: el start de su sleep, o created_at)."""
+    n = len(bounds)
+    summaries = [{} for _ in range(n)]
+    for name, col in columns.items():
+        if assign:
+            if name == 'recovery':
+                sleep_starts = columns['sleep'].starts_by_id() if 'sleep' in columns else {}
+                timestamps = [
+                    sleep_starts.get(sleep_id) or created_at
+                    for sleep_id, created_at in zip(col.sleep_ids, col.created_at)
+                ]
+                ids = _window_ids(*_utc_ms(timestamps), bounds)
+            else:
+                utc_ms, _, present = col.times()
+                ids = _window_ids(utc_ms, present, bounds)
+        else:
+            ids = np.zeros(len(col), dtype=np.int64)
+
+        for summary, result in zip(summaries, _SUMMARIES[name](col, ids, n, bounds)):
+            summary.update(result)
+    return summaries
+
+
+def _bounds(windows):
+    bounds = np.array([(_to_ms(start), _to_ms(end)) for start, end in windows], dtype=np.int64).reshape(-1, 2)
+    if np.any(bounds[1:, 0] < bounds[:-1, 1]):
+        raise ValueError("Las ventanas tienen que estar ordenadas y sin solaparse")
+    return bounds
+
+
+def summarize_month(columns, year, month):
+    """Resumen del mes con todos los records de columns (la API ya filtró la
+    ventana UTC del mes). Solo trae las claves de los streams presentes."""
+    return _summarize(columns, _bounds([_month_window(year, month)]), assign=False)[0]
+
+
+def summarize_windows(columns, windows):
+    """Resúmenes de ventanas [start, end) UTC (datetimes naive, ordenadas y sin
+    solaparse) en una sola pasada. Los días de Meditacion / Sauna cuentan por
+    fecha local dentro de las fechas de la ventana. Returns: lista en el orden
+    de windows."""
+    return _summarize(columns, _bounds(windows), assign=True)
+
+
+def summarize_months(columns, months):
+    """summarize_windows por mes calendario. months: [(year, month)].
+    Returns: dict {(year, month): resumen}; cada resumen es igual al de pedir
+    ese mes por separado."""
+    months = sorted(months)
+    summaries = summarize_windows(columns, [_month_window(year, month) for year, month in months])
+    return dict(zip(months, summaries))
@@ -2,15 +2,18 @@
 Autenticación WHOOP con OAuth2 - Con refresh preventivo
 """
 
-import requests
 import secrets
 import webbrowser
 from http.server import HTTPServer, BaseHTTPRequestHandler
 import json
 import os
+import threading
 import time
 from urllib.parse import urlencode, parse_qs
 import config
+import http_pool
+import metrics
+import rate_limit
 
 WHOOP_TOKENS_FILE = 'whoop_tokens.json'
 
@@ -43,6 +46,9 @@ class WhoopAuth:
         self.redirect_uri = config.WHOOP_REDIRECT_URI
         self.scopes = 'offline read:recovery read:sleep read:workout read:cycles read:profile'
         self.tokens = self._load_tokens()
+        # WHOOP rota el refresh token en cada uso: dos refresh concurrentes
+        # invalidarían el token, así que se serializan.
+        self._refresh_lock = threading.Lock()
     
     def _load_tokens(self):
         # En CI (GitHub Actions), cargar tokens desde env var
@@ -79,7 +85,7 @@ class WhoopAuth:
             'scope': self.scopes,
             'state': state
         }
-        return f"https://api.prod.whoop.com/oauth/oauth2/auth?{urlencode(params)}"
+        return f"{config.WHOOP_OAUTH_BASE}/auth?{urlencode(params)}"
     
     def authorize(self):
         auth_url = self.get_authorization_url()
@@ -109,7 +115,7 @@ class WhoopAuth:
             raise Exception("No se recibió código de autorización")
     
     def _exchange_code_for_tokens(self, code):
-        url = "https://api.prod.whoop.com/oauth/oauth2/token"
+        url = f"{config.WHOOP_OAUTH_BASE}/token"
         headers = {"Content-Type": "application/x-www-form-urlencoded"}
         data = {
             "grant_type": "authorization_code",
@@ -119,15 +125,25 @@ class WhoopAuth:
             "redirect_uri": self.redirect_uri
         }
         
-        response = requests.post(url, headers=headers, data=data)
+        response = rate_limit.get_scheduler('whoop').call(
+            metrics.http_call, 'whoop', 'oauth/token', http_pool.get_session().post, url, headers=headers, data=data
+        )
         response.raise_for_status()
         return response.json()
     
-    def refresh_access_token(self):
+    def refresh_access_token(self, stale_access_token=None):
+        """Renueva los tokens. Con stale_access_token, no hace nada si otro
+        thread ya reemplazó ese access token mientras se esperaba el lock."""
+        with self._refresh_lock:
+            if stale_access_token and self.tokens and self.tokens.get('access_token') != stale_access_token:
+                return self.tokens
+            return self._refresh_access_token()
+
+    def _refresh_access_token(self):
         if not self.tokens or 'refresh_token' not in self.tokens:
             raise Exception("No hay refresh token disponible. Ejecuta authorize() primero.")
         
-        url = 'https://api.prod.whoop.com/oauth/oauth2/token'
+        url = f"{config.WHOOP_OAUTH_BASE}/token"
         headers = {"Content-Type": "application/x-www-form-urlencoded"}
         data = {
             'grant_type': 'refresh_token',
@@ -136,7 +152,9 @@ class WhoopAuth:
             'client_secret': self.client_secret
         }
         
-        response = requests.post(url, headers=headers, data=data)
+        response = rate_limit.get_scheduler('whoop').call(
+            metrics.http_call, 'whoop', 'oauth/token', http_pool.get_session().post, url, headers=headers, data=data
+        )
         response.raise_for_status()
         
         new_tokens = response.json()
@@ -148,11 +166,12 @@ class WhoopAuth:
             raise Exception("No hay tokens. Ejecuta authorize() primero.")
 
         # Preventive refresh: if token expires in < 10 minutes, refresh now
-        expires_at = self.tokens.get('expires_at', 0)
+        tokens = self.tokens
+        expires_at = tokens.get('expires_at', 0)
         if expires_at and time.time() > (expires_at - 600):
             print("   [WHOOP] Token a punto de expirar, renovando preventivamente...")
             try:
-                self.refresh_access_token()
+                self.refresh_access_token(stale_access_token=tokens.get('access_token'))
             except Exception as e:
                 print(f"   [WHOOP] Error en refresh preventivo: {e}")
 
@@ -0,0 +1,144 @@
+"""
+Checkpoints de paginación de WHOOP para syncs largos (backfills de años).
+
+Cada (endpoint, rango) que se pagina con checkpoint escribe un archivo JSONL
+en whoop_checkpoints/: una línea de cabecera con endpoint y rango, y una
+línea por página con sus records y el next_token para pedir la siguiente.
+Si el run falla o se corta (timeout, 429 agotado, error de red), el próximo
+run con el mismo endpoint y rango re-entrega las páginas guardadas y sigue
+desde el último next_token en vez de volver a la página 1. Al terminar la
+paginación el archivo se borra.
+
+Solo se guardan y retoman rangos cerrados (end anterior a la primera página
+guardada): WHOOP pagina del más nuevo al más viejo, así que retomar un rango
+abierto (el mes en curso) desde un next_token viejo nunca vería los records
+creados o re-scoreados desde entonces; esos rangos se piden enteros en cada
+run. Tampoco se retoman checkpoints más viejos que CHECKPOINT_MAX_AGE_HOURS.
+
+Uso:
+    import whoop_checkpoint
+    checkpoint = whoop_checkpoint.Checkpoint('activity/sleep', params['start'], params['end'])
+    if checkpoint.closed():                           # si no, paginar sin checkpoint
+    records, next_token, pages = checkpoint.load()    # ([], None, 0) si no hay
+    checkpoint.append(page_records, next_token)       # después de cada página
+    checkpoint.clear()                                # paginación completa
+"""
+
+import json
+import os
+import re
+import time
+from datetime import datetime, timezone
+
+CHECKPOINT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'whoop_checkpoints')
+
+# Un cron diario que se cortó tiene que poder retomar en la corrida siguiente
+CHECKPOINT_MAX_AGE_HOURS = 36
+
+
+def _filename(endpoint, start, end):
+    raw = f"{endpoint}_{start}_{end}"
+    return re.sub(r'[^A-Za-z0-9]+', '_', raw).strip('_') + '.jsonl'
+
+
+def prune(directory=None):
+    """Borra los checkpoints vencidos (rangos que ya nadie va a retomar)."""
+    directory = directory or CHECKPOINT_DIR
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    cutoff = time.time() - CHECKPOINT_MAX_AGE_HOURS * 3600
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            if name.endswith('.jsonl') and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+class Checkpoint:
+    """Páginas ya bajadas de un endpoint en un rango (start / end como los manda la API)."""
+
+    def __init__(self, endpoint, start, end, directory=None):
+        self.endpoint = endpoint
+        self.start = start
+        self.end = end
+        self.path = os.path.join(directory or CHECKPOINT_DIR, _filename(endpoint, start, end))
+
+    def _closed_at(self, timestamp):
+        """True si el rango ya había terminado en timestamp (epoch)."""
+        try:
+            end = datetime.strptime(self.end[:19], '%Y-%m-%dT%H:%M:%S')
+        except ValueError:
+            return False
+        return end < datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+    def closed(self):
+        """True si el rango ya terminó: solo esos se pueden retomar."""
+        return self._closed_at(time.time())
+
+    def _header(self):
+        return {'endpoint': self.endpoint, 'start': self.start, 'end': self.end}
+
+    def load(self):
+        """(records, next_token, páginas) guardados; ([], None, 0) si no hay
+        checkpoint, está vencido o el rango seguía abierto cuando se empezó.
+        Una última línea cortada (el proceso murió escribiéndola) se descarta:
+        esa página se vuelve a pedir."""
+        try:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path) as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return [], None, 0
+        age_hours = (time.time() - mtime) / 3600
+        if age_hours > CHECKPOINT_MAX_AGE_HOURS:
+            print(f"         Checkpoint de {self.endpoint} vencido ({age_hours:.0f}h), se descarta")
+            self.clear()
+            return [], None, 0
+
+        try:
+            header = json.loads(lines[0]) if lines else {}
+            valid = {k: header.get(k) for k in ('endpoint', 'start', 'end')} == self._header()
+            created_at = header.get('created_at', mtime)
+        except (ValueError, AttributeError):
+            valid = False
+        if not valid:
+            self.clear()
+            return [], None, 0
+        if not self._closed_at(created_at):
+            print(f"         Checkpoint de {self.endpoint} empezado con el rango abierto, se descarta")
+            self.clear()
+            return [], None, 0
+
+        records, next_token, pages = [], None, 0
+        try:
+            for line in lines[1:]:
+                page = json.loads(line)
+                records.extend(page['records'])
+                next_token = page['next_token']
+                pages += 1
+        except (ValueError, KeyError):
+            # Dejar solo las páginas enteras: las siguientes se agregan detrás
+            with open(self.path, 'w') as f:
+                f.write('\n'.join(lines[:1 + pages]) + '\n')
+        return records, next_token, pages
+
+    def append(self, records, next_token):
+        """Guarda una página ya recibida (y el token de la siguiente; None si fue la última)."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        new_file = not os.path.exists(self.path)
+        with open(self.path, 'a') as f:
+            if new_file:
+                f.write(json.dumps({**self._header(), 'created_at': time.time()}) + '\n')
+            f.write(json.dumps({'next_token': next_token, 'records': records}, separators=(',', ':')) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -3,45 +3,47 @@ Cliente WHOOP API v2 - CORREGIDO con zona horaria y sleep real
 """
 
 import requests
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+import config
+import http_pool
+import metrics
+import rate_limit
 from whoop_auth import WhoopAuth
+import whoop_aggregates
+import whoop_checkpoint
+import whoop_records
 
 
-def _parse_tz_offset(tz):
-    """Convierte '-06:00' a timedelta, con signo correcto también en los minutos."""
-    sign = -1 if tz.startswith('-') else 1
-    parts = tz.lstrip('+-').split(':')
-    hours = int(parts[0])
-    minutes = int(parts[1]) if len(parts) > 1 else 0
-    return timedelta(hours=sign * hours, minutes=sign * minutes)
+# Endpoints que arma un resumen mensual: nombre en el summary -> endpoint
+MONTHLY_ENDPOINTS = {
+    'sleep': 'activity/sleep',
+    'recovery': 'recovery',
+    'workouts': 'activity/workout',
+}
 
+# Endpoints paginados en paralelo por defecto (WHOOP limita a 100 req/min)
+MAX_CONCURRENCY = 3
 
-def workout_local_date(workout, default_tz='-06:00'):
-    """Fecha local del workout usando su timezone_offset (default Costa Rica)."""
-    start = workout.get('start', '')
-    if not start:
-        return None
-    utc_time = datetime.fromisoformat(start.replace('Z', '+00:00'))
-    local_time = utc_time + _parse_tz_offset(workout.get('timezone_offset') or default_tz)
-    return local_time.date()
 
+class PaginationError(Exception):
+    """Un endpoint dejó de paginar a mitad de rango: lo recibido está incompleto.
+    Las páginas ya bajadas quedan en el checkpoint para el próximo run."""
 
-def count_activity_days(workouts, keyword, year, month):
-    """Dias distintos del mes con >=1 workout cuyo sport_name contiene keyword."""
-    dates = set()
-    for w in workouts:
-        name = (w.get('sport_name') or '').lower()
-        if keyword in name:
-            d = workout_local_date(w)
-            if d and d.year == year and d.month == month:
-                dates.add(d)
-    return len(dates)
+    def __init__(self, endpoint, page, cause):
+        super().__init__(f"Paginación de {endpoint} cortada en la página {page}: {cause}")
+        self.endpoint = endpoint
+        self.page = page
 
 
 class WhoopClientV2:
-    def __init__(self):
+    def __init__(self, max_concurrency=MAX_CONCURRENCY):
         self.auth = WhoopAuth()
-        self.base_url = 'https://api.prod.whoop.com/developer/v2'
+        self.max_concurrency = max_concurrency
+        self.base_url = config.WHOOP_API_BASE
+        self.session = http_pool.get_session()
+        self.scheduler = rate_limit.get_scheduler('whoop')
+        whoop_checkpoint.prune()
     
     def _get_headers(self):
         token = self.auth.get_access_token()
@@ -52,12 +54,18 @@ class WhoopClientV2:
         headers = self._get_headers()
         
         try:
-            response = requests.get(url, headers=headers, params=params)
+            response = self.scheduler.call(
+                metrics.http_call, 'whoop', endpoint, self.session.get, url, headers=headers, params=params
+            )
             
             if response.status_code == 401:
-                self.auth.refresh_access_token()
+                # Con endpoints en paralelo varios threads pueden ver el 401:
+                # solo refresca el primero, los demás reusan el token nuevo.
+                self.auth.refresh_access_token(stale_access_token=headers['Authorization'][len('Bearer '):])
                 headers = self._get_headers()
-                response = requests.get(url, headers=headers, params=params)
+                response = self.scheduler.call(
+                    metrics.http_call, 'whoop', endpoint, self.session.get, url, headers=headers, params=params
+                )
             
             response.raise_for_status()
             return response.json()
@@ -73,8 +81,16 @@ class WhoopClientV2:
     def get_body_measurements(self):
         return self._make_request('user/measurement/body')
     
-    def get_all_records(self, endpoint, start_date, end_date):
-        all_records = []
+    def iter_records(self, endpoint, start_date, end_date, checkpoint=True):
+        """Yields records página por página, sin juntar todo en memoria.
+
+        Con checkpoint y un rango ya cerrado, cada página se persiste
+        (whoop_checkpoint) antes de entregarla: si un run anterior con el mismo
+        endpoint y rango se cortó, se re-entregan sus páginas y se sigue desde
+        su next_token. Un rango que incluye hoy siempre se pide entero. Si una
+        página falla, lanza PaginationError (o RateLimitError) en vez de
+        terminar como si el rango estuviera completo.
+        """
         next_token = None
         page = 1
         
@@ -83,6 +99,21 @@ class WhoopClientV2:
             'end': end_date.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
             'limit': 25
         }
+
+        saved = whoop_checkpoint.Checkpoint(endpoint, params['start'], params['end']) if checkpoint else None
+        if saved and not saved.closed():
+            # Rango abierto (incluye hoy): páginas viejas no verían records nuevos
+            saved = None
+        if saved:
+            records, next_token, pages = saved.load()
+            if pages:
+                print(f"         ↻ {endpoint}: retomando desde el checkpoint ({pages} páginas, {len(records)} registros)")
+                page = pages + 1
+                yield from records
+                if not next_token:
+                    # La última página ya estaba guardada
+                    saved.clear()
+                    return
         
         while True:
             if next_token:
@@ -90,23 +121,85 @@ class WhoopClientV2:
             
             try:
                 data = self._make_request(endpoint, params=params)
-                
-                if 'records' in data and data['records']:
-                    all_records.extend(data['records'])
-                    print(f"         Página {page}: {len(data['records'])} registros")
-                    page += 1
-                
-                if 'next_token' in data and data['next_token']:
-                    next_token = data['next_token']
-                else:
-                    break
-                    
+            except rate_limit.RateLimitError:
+                # Cortar aquí dejaría el mes a medias como si estuviera completo
+                raise
             except Exception as e:
                 print(f"         Error en paginación: {e}")
-                break
-        
-        return all_records
+                raise PaginationError(endpoint, page, e) from e
+            
+            records = data.get('records') or []
+            next_token = data.get('next_token') or None
+            if saved:
+                saved.append(records, next_token)
+
+            if records:
+                print(f"         Página {page}: {len(records)} registros")
+                page += 1
+                yield from records
+            
+            if not next_token:
+                if saved:
+                    saved.clear()
+                return
+    
+    def get_all_records(self, endpoint, start_date, end_date, checkpoint=True):
+        return list(self.iter_records(endpoint, start_date, end_date, checkpoint))
+
+    def get_records(self, endpoint, start_date, end_date, checkpoint=True):
+        """Como get_all_records, pero cada página se pasa a records compactos
+        (whoop_records) apenas llega; los dicts de la API no se juntan."""
+        return list(map(whoop_records.parser(endpoint), self.iter_records(endpoint, start_date, end_date, checkpoint)))
     
+    def _fold_endpoint(self, endpoint, start_date, end_date, aggregator):
+        parse = whoop_records.parser(endpoint)
+        for record in self.iter_records(endpoint, start_date, end_date):
+            aggregator.add(parse(record))
+        return aggregator
+
+    def stream_endpoints(self, start_date, end_date, aggregators, endpoints=None):
+        """Como fetch_endpoints, pero cada endpoint se agrega en streaming
+        (aggregators[name].add por record ya parseado con whoop_records, p. ej.
+        las columnas de whoop_aggregates.monthly_columns) sin guardar las páginas.
+
+        Yields (name, error) a medida que cada endpoint termina.
+        """
+        endpoints = endpoints or MONTHLY_ENDPOINTS
+        workers = max(1, min(self.max_concurrency, len(endpoints)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='whoop') as executor:
+            futures = {
+                executor.submit(self._fold_endpoint, endpoint, start_date, end_date, aggregators[name]): name
+                for name, endpoint in endpoints.items()
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    future.result()
+                    yield name, None
+                except Exception as e:
+                    yield name, e
+
+    def fetch_endpoints(self, start_date, end_date, endpoints=None, checkpoint=True):
+        """Pagina varios endpoints en paralelo (máx. self.max_concurrency a la vez).
+
+        Yields (name, records, error) a medida que cada endpoint termina, para
+        que el caller agregue sin esperar a los demás. Con error, records viene
+        vacío (nunca una lista a medias).
+        """
+        endpoints = endpoints or MONTHLY_ENDPOINTS
+        workers = max(1, min(self.max_concurrency, len(endpoints)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='whoop') as executor:
+            futures = {
+                executor.submit(self.get_all_records, endpoint, start_date, end_date, checkpoint): name
+                for name, endpoint in endpoints.items()
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    yield name, future.result(), None
+                except Exception as e:
+                    yield name, [], e
+
     def get_monthly_summary(self, year, month):
         from calendar import monthrange
         
@@ -114,162 +207,114 @@ class WhoopClientV2:
         last_day = monthrange(year, month)[1]
         end_date = datetime(year, month, last_day, 23, 59, 59)
         
-        summary = {
-            'sleep': [],
-            'recovery': [],
-            'workouts': [],
-            'avg_sleep_hours': 0,
-            'avg_sleep_performance': 0,
-            'avg_sleep_consistency': 0,
-            'avg_hrv': 0,
-            'avg_recovery_score': 0,
-            'days_sleep_before_930pm': 0,
-            'avg_resting_hr': 0,
-            'avg_time_hr_zone_1_3': 0,
-            'avg_time_hr_zone_4_5': 0,
-            'hr_zones_1_3_hours': 0,
-            'hr_zones_4_5_hours': 0,
-            'meditation_days': 0,
-            'sauna_days': 0
-        }
-        
-        # Sleep
-        print("      🛌 Obteniendo datos de sueño...")
-        try:
-            summary['sleep'] = self.get_all_records('activity/sleep', start_date, end_date)
-            
-            if summary['sleep']:
-                total_sleep_ms = 0
-                total_performance = 0
-                total_consistency = 0
-                days_before_930 = 0
-                valid_sleeps = 0
-
-                for sleep in summary['sleep']:
-                    # Skip naps - only count primary sleep
-                    if sleep.get('nap', False):
-                        continue
-
-                    if sleep.get('score') and sleep['score'].get('stage_summary'):
-                        stages = sleep['score']['stage_summary']
-                        valid_sleeps += 1
-
-                        # Usar tiempo REAL dormido (no in bed)
-                        actual_sleep_ms = (
-                            stages.get('total_light_sleep_time_milli', 0) +
-                            stages.get('total_slow_wave_sleep_time_milli', 0) +
-                            stages.get('total_rem_sleep_time_milli', 0)
-                        )
-                        total_sleep_ms += actual_sleep_ms
-
-                        # Sleep performance y consistency
-                        total_performance += sleep['score'].get('sleep_performance_percentage', 0)
-                        total_consistency += sleep['score'].get('sleep_consistency_percentage', 0)
-
-                        # Convertir a hora local correctamente
-                        start_time_str = sleep.get('start', '')
-                        timezone_offset = sleep.get('timezone_offset', '-06:00')
-
-                        if start_time_str:
-                            # Parse UTC time
-                            utc_time = datetime.fromisoformat(start_time_str.replace('Z', '+00:00'))
-
-                            # Aplicar offset (ej: -06:00)
-                            offset_hours = int(timezone_offset.split(':')[0])
-                            offset_minutes = int(timezone_offset.split(':')[1]) if ':' in timezone_offset else 0
-                            offset = timedelta(hours=offset_hours, minutes=offset_minutes)
-
-                            local_time = utc_time + offset
-
-                            # Verificar si es antes de 9:30 PM (21:30)
-                            if local_time.hour < 21 or (local_time.hour == 21 and local_time.minute < 30):
-                                days_before_930 += 1
-
-                if valid_sleeps > 0:
-                    summary['avg_sleep_hours'] = (total_sleep_ms / valid_sleeps) / 3600000
-                    summary['avg_sleep_performance'] = total_performance / valid_sleeps
-                    summary['avg_sleep_consistency'] = total_consistency / valid_sleeps
-                summary['days_sleep_before_930pm'] = days_before_930
-
-                print(f"         ✅ {valid_sleeps} noches procesadas (excl. naps)")
-        
-        except Exception as e:
-            print(f"         ⚠️  Error: {e}")
-        
-        # Recovery
-        print("      💪 Obteniendo datos de recovery...")
-        try:
-            summary['recovery'] = self.get_all_records('recovery', start_date, end_date)
-            
-            if summary['recovery']:
-                total_hrv = 0
-                total_recovery = 0
-                total_resting_hr = 0
-                rhr_count = 0
-                valid_recovery = 0
-
-                for rec in summary['recovery']:
-                    if rec.get('score') and rec['score'].get('recovery_score', 0) > 0:
-                        valid_recovery += 1
-                        total_hrv += rec['score'].get('hrv_rmssd_milli', 0)
-                        total_recovery += rec['score'].get('recovery_score', 0)
-                        rhr = rec['score'].get('resting_heart_rate', 0)
-                        if rhr > 0:
-                            total_resting_hr += rhr
-                            rhr_count += 1
-
-                if valid_recovery > 0:
-                    summary['avg_hrv'] = total_hrv / valid_recovery
-                    summary['avg_recovery_score'] = total_recovery / valid_recovery
-                summary['avg_resting_hr'] = round(total_resting_hr / rhr_count, 1) if rhr_count > 0 else 0
-                
-            print(f"         ✅ {len(summary['recovery'])} registros")
-        except Exception as e:
-            print(f"         ⚠️  Error: {e}")
-        
-        # Workouts (count only)
-        print("      🏃 Obteniendo workouts...")
-        try:
-            summary['workouts'] = self.get_all_records('activity/workout', start_date, end_date)
-            print(f"         ✅ {len(summary['workouts'])} workouts")
-        except Exception as e:
-            print(f"         ⚠️  Error: {e}")
+        summary = _empty_summary()
+        columns = whoop_aggregates.monthly_columns()
 
-        # HR zones from workouts (zone_durations is in workouts, not cycles)
-        print("      ❤️  Calculando HR zones desde workouts...")
-        try:
-            total_zone_1_3 = 0
-            total_zone_4_5 = 0
+        # Sleep, recovery y workouts no dependen entre sí: se paginan en paralelo
+        # y cada página se pasa a columnas apenas llega (sin guardar los records).
+        print("      ⚡ Obteniendo sleep, recovery y workouts en paralelo...")
+        incomplete = []
+        for name, error in self.stream_endpoints(start_date, end_date, columns):
+            if isinstance(error, rate_limit.RateLimitError):
+                raise error
+            if error is not None:
+                print(f"         ⚠️  Error en {name}: {error}")
+                incomplete.append(name)
+                continue
+            summary.update(whoop_aggregates.summarize_month({name: columns[name]}, year, month))
+            _print_stream_result(name, summary)
 
-            for workout in summary['workouts']:
-                if workout.get('score') and workout['score'].get('zone_durations'):
-                    zones = workout['score']['zone_durations']
+        # Endpoints que fallaron: el resumen no sirve para pisar una entrada buena
+        if incomplete:
+            summary['incomplete'] = sorted(incomplete)
+        return summary
 
-                    total_zone_1_3 += (
-                        zones.get('zone_one_milli', 0) +
-                        zones.get('zone_two_milli', 0) +
-                        zones.get('zone_three_milli', 0)
-                    )
+    def get_range_summaries(self, year, months):
+        """Resúmenes de varios meses del año paginando cada endpoint UNA vez.
 
-                    total_zone_4_5 += (
-                        zones.get('zone_four_milli', 0) +
-                        zones.get('zone_five_milli', 0)
-                    )
+        Los records del rango completo van a columnas (whoop_aggregates) y se
+        reparten por mes con la misma ventana UTC que usa get_monthly_summary
+        (start/end de la API), así que cada resumen es idéntico al de pedir el
+        mes por separado; la fecha local (9:30 PM, días de Meditacion/Sauna) se
+        resuelve dentro de cada mes. Returns: dict {month: summary}; si algún
+        endpoint no terminó de paginar, cada summary trae 'incomplete' con sus
+        nombres (igual que get_monthly_summary).
+        """
+        from calendar import monthrange
 
-            summary['hr_zones_1_3_hours'] = total_zone_1_3 / 3600000
-            summary['hr_zones_4_5_hours'] = total_zone_4_5 / 3600000
+        months = sorted(months)
+        start_date = datetime(year, months[0], 1)
+        end_date = datetime(year, months[-1], monthrange(year, months[-1])[1], 23, 59, 59)
 
-            print(f"         ✅ HR zones calculadas de {len(summary['workouts'])} workouts")
-        except Exception as e:
-            print(f"         ⚠️  Error: {e}")
+        print(f"      ⚡ Obteniendo {year}-{months[0]:02d}..{year}-{months[-1]:02d} en una sola paginación por endpoint...")
+        columns = whoop_aggregates.monthly_columns()
+        fetched = {}
+        incomplete = []
+        for name, error in self.stream_endpoints(start_date, end_date, columns):
+            if isinstance(error, rate_limit.RateLimitError):
+                raise error
+            if error is not None:
+                print(f"         ⚠️  Error en {name}: {error}")
+                incomplete.append(name)
+                continue
+            fetched[name] = columns[name]
+            print(f"         ✅ {name}: {len(columns[name])} registros")
 
-        # Dias con Meditacion / Sauna (por sport_name del workout)
-        print("      🧘 Contando dias de Meditacion y Sauna...")
-        try:
-            summary['meditation_days'] = count_activity_days(summary['workouts'], 'meditation', year, month)
-            summary['sauna_days'] = count_activity_days(summary['workouts'], 'sauna', year, month)
-            print(f"         ✅ Meditacion: {summary['meditation_days']} dias | Sauna: {summary['sauna_days']} dias")
-        except Exception as e:
-            print(f"         ⚠️  Error: {e}")
+        by_month = whoop_aggregates.summarize_months(fetched, [(year, month) for month in months])
 
-        return summary
+        summaries = {}
+        for month in months:
+            print(f"\n   {year}-{month:02d}")
+            summary = _empty_summary()
+            summary.update(by_month[(year, month)])
+            for name in MONTHLY_ENDPOINTS:
+                _print_stream_result(name, summary)
+            if incomplete:
+                summary['incomplete'] = sorted(incomplete)
+            summaries[month] = summary
+        return summaries
+
+
+def summarize_month(records, year, month):
+    """Resumen mensual (formato de get_monthly_summary) desde records ya bajados.
+
+    records: {'sleep': [...], 'recovery': [...], 'workouts': [...]} de la ventana UTC del mes,
+    como records de whoop_records (Sleep / Recovery / Workout).
+    """
+    summary = _empty_summary()
+    summary.update(whoop_aggregates.summarize_month(whoop_aggregates.columns_from_records(records), year, month))
+    for name in MONTHLY_ENDPOINTS:
+        _print_stream_result(name, summary)
+    return summary
+
+
+def _print_stream_result(name, summary):
+    if name == 'sleep':
+        print(f"      🛌 ✅ {summary['valid_sleeps']} noches procesadas (excl. naps)")
+    elif name == 'recovery':
+        print(f"      💪 ✅ {summary['num_recovery']} registros de recovery")
+    else:
+        print(f"      🏃 ✅ {summary['num_workouts']} workouts | HR zones calculadas | "
+              f"Meditacion: {summary['meditation_days']} dias | Sauna: {summary['sauna_days']} dias")
+
+
+def _empty_summary():
+    return {
+        'num_sleeps': 0,
+        'valid_sleeps': 0,
+        'num_recovery': 0,
+        'num_workouts': 0,
+        'avg_sleep_hours': 0,
+        'avg_sleep_performance': 0,
+        'avg_sleep_consistency': 0,
+        'avg_hrv': 0,
+        'avg_recovery_score': 0,
+        'days_sleep_before_930pm': 0,
+        'avg_resting_hr': 0,
+        'avg_time_hr_zone_1_3': 0,
+        'avg_time_hr_zone_4_5': 0,
+        'hr_zones_1_3_hours': 0,
+        'hr_zones_4_5_hours': 0,
+        'meditation_days': 0,
+        'sauna_days': 0
+    }
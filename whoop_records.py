@@ -0,0 +1,198 @@
+"""
+Records compactos de WHOOP (sleep, recovery, workout, cycle).
+
+La API devuelve dicts anidados (sleep['score']['stage_summary'][...]) de los
+que solo se leen unos pocos números. Estas clases con __slots__ guardan esos
+campos ya aplanados: un año de records ocupa una fracción de los dicts
+originales y el código que los consume lee atributos en vez de repetir las
+cadenas de .get(). Los campos que faltan en la API quedan en None (strings)
+o 0 (números), igual que los `or 0` que hacían los agregados.
+
+Uso:
+    import whoop_records
+    sleep = whoop_records.Sleep.from_api(record)       # dict de /activity/sleep
+    parse = whoop_records.parser('activity/workout')   # from_api del endpoint
+    workouts = [parse(r) for r in client.iter_records('activity/workout', start, end)]
+"""
+
+
+def _score(data):
+    return data.get('score') or {}
+
+
+class _Record:
+    __slots__ = ()
+
+    def _values(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={value!r}" for name, value in zip(self.__slots__, self._values()))
+        return f"{type(self).__name__}({fields})"
+
+    # Valores: iguales si coinciden todos los campos, y hasheables (sets, claves
+    # de dict). No se modifican después de from_api.
+    def __eq__(self, other):
+        return type(self) is type(other) and self._values() == other._values()
+
+    def __hash__(self):
+        return hash((type(self),) + self._values())
+
+
+class Sleep(_Record):
+    """Sueño real = light + SWS + REM (no in bed). scored: trae stage_summary."""
+
+    __slots__ = ('id', 'start', 'end', 'timezone_offset', 'updated_at', 'nap', 'scored',
+                 'sleep_ms', 'performance', 'consistency')
+
+    def __init__(self, id, start, end, timezone_offset, updated_at, nap, scored,
+                 sleep_ms, performance, consistency):
+        self.id = id
+        self.start = start
+        self.end = end
+        self.timezone_offset = timezone_offset
+        self.updated_at = updated_at
+        self.nap = nap
+        self.scored = scored
+        self.sleep_ms = sleep_ms
+        self.performance = performance
+        self.consistency = consistency
+
+    @classmethod
+    def from_api(cls, data):
+        score = _score(data)
+        stages = score.get('stage_summary') or {}
+        return cls(
+            data.get('id'),
+            data.get('start'),
+            data.get('end'),
+            data.get('timezone_offset'),
+            data.get('updated_at'),
+            bool(data.get('nap', False)),
+            bool(stages),
+            (stages.get('total_light_sleep_time_milli') or 0) +
+            (stages.get('total_slow_wave_sleep_time_milli') or 0) +
+            (stages.get('total_rem_sleep_time_milli') or 0),
+            score.get('sleep_performance_percentage') or 0,
+            score.get('sleep_consistency_percentage') or 0,
+        )
+
+
+class Recovery(_Record):
+    """Uno por cycle (no tiene id propio); se ubica en el tiempo por su sleep."""
+
+    __slots__ = ('cycle_id', 'sleep_id', 'created_at', 'updated_at',
+                 'recovery_score', 'hrv', 'resting_hr')
+
+    def __init__(self, cycle_id, sleep_id, created_at, updated_at, recovery_score, hrv, resting_hr):
+        self.cycle_id = cycle_id
+        self.sleep_id = sleep_id
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.recovery_score = recovery_score
+        self.hrv = hrv
+        self.resting_hr = resting_hr
+
+    @classmethod
+    def from_api(cls, data):
+        score = _score(data)
+        return cls(
+            data.get('cycle_id'),
+            data.get('sleep_id'),
+            data.get('created_at'),
+            data.get('updated_at'),
+            score.get('recovery_score') or 0,
+            score.get('hrv_rmssd_milli') or 0,
+            score.get('resting_heart_rate') or 0,
+        )
+
+
+class Workout(_Record):
+    """HR zones sumadas (1-3 y 4-5, en ms); zone_durations vive aquí, no en cycles."""
+
+    __slots__ = ('id', 'start', 'end', 'timezone_offset', 'updated_at', 'sport_name',
+                 'sport_id', 'strain', 'zone_1_3_ms', 'zone_4_5_ms')
+
+    def __init__(self, id, start, end, timezone_offset, updated_at, sport_name, sport_id,
+                 strain, zone_1_3_ms, zone_4_5_ms):
+        self.id = id
+        self.start = start
+        self.end = end
+        self.timezone_offset = timezone_offset
+        self.updated_at = updated_at
+        self.sport_name = sport_name
+        self.sport_id = sport_id
+        self.strain = strain
+        self.zone_1_3_ms = zone_1_3_ms
+        self.zone_4_5_ms = zone_4_5_ms
+
+    @classmethod
+    def from_api(cls, data):
+        score = _score(data)
+        zones = score.get('zone_durations') or {}
+        return cls(
+            data.get('id'),
+            data.get('start'),
+            data.get('end'),
+            data.get('timezone_offset'),
+            data.get('updated_at'),
+            data.get('sport_name'),
+            data.get('sport_id'),
+            score.get('strain') or 0,
+            (zones.get('zone_one_milli') or 0) +
+            (zones.get('zone_two_milli') or 0) +
+            (zones.get('zone_three_milli') or 0),
+            (zones.get('zone_four_milli') or 0) + (zones.get('zone_five_milli') or 0),
+        )
+
+    def is_sport(self, keyword):
+        """keyword ('meditation', 'sauna') dentro del sport_name, sin mayúsculas."""
+        return keyword in (self.sport_name or '').lower()
+
+
+class Cycle(_Record):
+    """Día fisiológico de WHOOP: strain, energía y HR del cycle."""
+
+    __slots__ = ('id', 'start', 'end', 'timezone_offset', 'updated_at',
+                 'strain', 'kilojoule', 'average_heart_rate', 'max_heart_rate')
+
+    def __init__(self, id, start, end, timezone_offset, updated_at, strain, kilojoule,
+                 average_heart_rate, max_heart_rate):
+        self.id = id
+        self.start = start
+        self.end = end
+        self.timezone_offset = timezone_offset
+        self.updated_at = updated_at
+        self.strain = strain
+        self.kilojoule = kilojoule
+        self.average_heart_rate = average_heart_rate
+        self.max_heart_rate = max_heart_rate
+
+    @classmethod
+    def from_api(cls, data):
+        score = _score(data)
+        return cls(
+            data.get('id'),
+            data.get('start'),
+            data.get('end'),
+            data.get('timezone_offset'),
+            data.get('updated_at'),
+            score.get('strain') or 0,
+            score.get('kilojoule') or 0,
+            score.get('average_heart_rate') or 0,
+            score.get('max_heart_rate') or 0,
+        )
+
+
+# Endpoint de la API -> clase de sus records
+TYPES = {
+    'activity/sleep': Sleep,
+    'recovery': Recovery,
+    'activity/workout': Workout,
+    'cycle': Cycle,
+}
+
+
+def parser(endpoint):
+    """from_api de la clase del endpoint ('activity/sleep', 'recovery', ...)."""
+    return TYPES[endpoint].from_api
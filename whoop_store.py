@@ -0,0 +1,232 @@
+"""
+Store local de records crudos de WHOOP (SQLite, whoop_records.db).
+
+Guarda cada sleep / recovery / workout / cycle tal cual llega de la API,
+indexado por id, fecha local y updated_at; al leer se devuelven como records
+compactos de whoop_records (Sleep / Recovery / Workout / Cycle). Un sync solo pide lo que cambió
+desde el último watermark, y los resúmenes mensuales se recalculan desde el
+store sin red (nuevas métricas o bug fixes no requieren re-bajar el año).
+
+Uso:
+    import whoop_store
+    whoop_store.sync(whoop)                      # incremental (red)
+    summary = whoop_store.month_summary(2026, 3)  # sin red, mismo formato que get_monthly_summary
+    summaries = whoop_store.range_summaries([(2025, 1), ..., (2026, 3)])   # {(year, month): summary}
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+
+import rate_limit
+import whoop_aggregates
+import whoop_records
+from whoop_client_v2_corrected import MONTHLY_ENDPOINTS, summarize_month
+
+DB_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'whoop_records.db')
+
+# Lo que guarda el store: los endpoints del resumen mensual + cycles.
+# Sleep va primero: recovery se ubica en el tiempo por el start de su sleep.
+STORE_ENDPOINTS = {**MONTHLY_ENDPOINTS, 'cycles': 'cycle'}
+
+# La API filtra por start, no por updated_at: cada sync vuelve a pedir estos
+# días antes del último start visto para recoger records re-scoreados.
+LOOKBACK_DAYS = 7
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    kind TEXT NOT NULL,
+    id TEXT NOT NULL,
+    start TEXT,
+    local_date TEXT,
+    updated_at TEXT,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (kind, id)
+);
+CREATE INDEX IF NOT EXISTS idx_records_start ON records (kind, start);
+CREATE INDEX IF NOT EXISTS idx_records_local_date ON records (kind, local_date);
+CREATE INDEX IF NOT EXISTS idx_records_updated_at ON records (kind, updated_at);
+CREATE TABLE IF NOT EXISTS watermarks (
+    kind TEXT PRIMARY KEY,
+    max_start TEXT,
+    max_updated_at TEXT,
+    synced_at TEXT
+);
+"""
+
+_lock = threading.Lock()
+
+
+def connect(path=None):
+    conn = sqlite3.connect(path or DB_FILE)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _record_id(kind, record):
+    # Recovery no tiene id propio: es 1 por cycle
+    if kind == 'recovery':
+        return str(record.cycle_id)
+    return str(record.id)
+
+
+def _parser(kind):
+    return whoop_records.parser(STORE_ENDPOINTS[kind])
+
+
+def _sleep_position(conn, sleep_id):
+    row = conn.execute(
+        "SELECT start, local_date FROM records WHERE kind = 'sleep' AND id = ?", (str(sleep_id),)
+    ).fetchone()
+    return row or (None, None)
+
+
+def upsert(conn, kind, records):
+    """Inserta o actualiza records de un tipo (dicts de la API; el payload se
+    guarda entero). Un record existente solo se reemplaza si su updated_at es
+    más nuevo. Returns: nº de filas escritas."""
+    payloads = list(records)
+    records = list(map(_parser(kind), payloads))
+    written = 0
+    if kind != 'recovery':
+        dates = whoop_aggregates.local_dates(records).astype(str)
+    with _lock, conn:
+        for i, (record, payload) in enumerate(zip(records, payloads)):
+            if kind == 'recovery':
+                # start = el del sleep (inicio del cycle), igual que whoop_aggregates.summarize_months
+                start, local_date = _sleep_position(conn, record.sleep_id)
+                start = start or record.created_at
+                local_date = local_date or (record.created_at or '')[:10] or None
+            else:
+                start = record.start
+                local_date = None if dates[i] == 'NaT' else dates[i]
+            cursor = conn.execute(
+                """
+                INSERT INTO records (kind, id, start, local_date, updated_at, payload)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (kind, id) DO UPDATE SET
+                    start = excluded.start,
+                    local_date = excluded.local_date,
+                    updated_at = excluded.updated_at,
+                    payload = excluded.payload
+                WHERE excluded.updated_at IS NULL
+                   OR records.updated_at IS NULL
+                   OR excluded.updated_at > records.updated_at
+                """,
+                (kind, _record_id(kind, record), start, local_date,
+                 record.updated_at, json.dumps(payload, separators=(',', ':'))),
+            )
+            written += cursor.rowcount
+    return written
+
+
+def _update_watermark(conn, kind):
+    with _lock, conn:
+        conn.execute(
+            """
+            INSERT INTO watermarks (kind, max_start, max_updated_at, synced_at)
+            SELECT ?, MAX(start), MAX(updated_at), ? FROM records WHERE kind = ?
+            ON CONFLICT (kind) DO UPDATE SET
+                max_start = excluded.max_start,
+                max_updated_at = excluded.max_updated_at,
+                synced_at = excluded.synced_at
+            """,
+            (kind, datetime.now().isoformat(), kind),
+        )
+
+
+def get_watermarks(conn=None):
+    """{kind: {'max_start', 'max_updated_at', 'synced_at'}}"""
+    conn = conn or connect()
+    rows = conn.execute("SELECT kind, max_start, max_updated_at, synced_at FROM watermarks").fetchall()
+    return {
+        kind: {'max_start': max_start, 'max_updated_at': max_updated_at, 'synced_at': synced_at}
+        for kind, max_start, max_updated_at, synced_at in rows
+    }
+
+
+def _sync_start(watermarks, default_start):
+    """Desde dónde pedir: el start más viejo de los watermarks menos LOOKBACK_DAYS."""
+    starts = [w['max_start'] for w in watermarks.values() if w.get('max_start')]
+    if len(starts) < len(STORE_ENDPOINTS):
+        return default_start
+    oldest = datetime.strptime(min(starts)[:19], '%Y-%m-%dT%H:%M:%S')
+    return max(default_start, oldest - timedelta(days=LOOKBACK_DAYS))
+
+
+def sync(client, default_start=None, full=False, conn=None):
+    """Baja a SQLite los records nuevos o modificados desde el último watermark.
+
+    - default_start: desde dónde bajar si el store está vacío (default: 1 de enero).
+    - full: ignora los watermarks y re-baja desde default_start.
+    Returns: {kind: filas escritas}.
+    """
+    conn = conn or connect()
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    default_start = default_start or datetime(now.year, 1, 1)
+    start_date = default_start if full else _sync_start(get_watermarks(conn), default_start)
+
+    print(f"      🗄️  Store WHOOP: pidiendo records desde {start_date:%Y-%m-%d}...")
+    fetched = {}
+    # Sin checkpoint: el rango termina en "ahora" (nunca se repite) y los
+    # watermarks ya hacen incremental el próximo sync
+    for name, records, error in client.fetch_endpoints(start_date, now, STORE_ENDPOINTS, checkpoint=False):
+        if isinstance(error, rate_limit.RateLimitError):
+            raise error
+        if error is not None:
+            print(f"         ⚠️  Error en {name}: {error}")
+            continue
+        fetched[name] = records
+
+    written = {}
+    for name in STORE_ENDPOINTS:
+        if name not in fetched:
+            continue
+        written[name] = upsert(conn, name, fetched[name])
+        _update_watermark(conn, name)
+        print(f"         ✅ {name}: {len(fetched[name])} recibidos, {written[name]} nuevos/actualizados")
+    return written
+
+
+def load_records(kind, start, end, conn=None):
+    """Records de un tipo (whoop_records) con start UTC en [start, end) (datetimes naive UTC)."""
+    conn = conn or connect()
+    rows = conn.execute(
+        "SELECT payload FROM records WHERE kind = ? AND start >= ? AND start < ? ORDER BY start",
+        (kind, start.strftime('%Y-%m-%dT%H:%M:%S'), end.strftime('%Y-%m-%dT%H:%M:%S')),
+    ).fetchall()
+    parse = _parser(kind)
+    return [parse(json.loads(payload)) for (payload,) in rows]
+
+
+def month_summary(year, month, conn=None):
+    """Resumen mensual calculado desde el store, sin red.
+
+    Misma ventana UTC y mismo formato que WhoopClientV2.get_monthly_summary.
+    """
+    conn = conn or connect()
+    start_date = datetime(year, month, 1)
+    end_date = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    records = {name: load_records(name, start_date, end_date, conn) for name in MONTHLY_ENDPOINTS}
+    return summarize_month(records, year, month)
+
+
+def range_summaries(months, conn=None):
+    """month_summary de varios meses (de uno o más años) leyendo el store una
+    sola vez: los records del rango van a columnas y se reparten por mes UTC
+    en una pasada (whoop_aggregates.summarize_months).
+    Returns: dict {(year, month): summary} con las métricas de get_monthly_summary.
+    """
+    months = sorted(months)
+    if not months:
+        return {}
+    conn = conn or connect()
+    (first_year, first_month), (last_year, last_month) = months[0], months[-1]
+    start_date = datetime(first_year, first_month, 1)
+    end_date = datetime(last_year + 1, 1, 1) if last_month == 12 else datetime(last_year, last_month + 1, 1)
+    columns = whoop_aggregates.columns_from_records(
+        {name: load_records(name, start_date, end_date, conn) for name in MONTHLY_ENDPOINTS}
+    )
+    return whoop_aggregates.summarize_months(columns, months)
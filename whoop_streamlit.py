@@ -11,16 +11,35 @@ el token del cron y el sync diario moriría con 401 (pasó en junio 2026).
 Si el access token expiró, simplemente se usa el cache.
 """
 
-import requests
 import time
 import json
 import os
 import streamlit as st
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
 from calendar import monthrange
 
+import config
+import http_pool
+import json_cache
+import metrics
+import rate_limit
+import whoop_aggregates
+import whoop_records
 
-WHOOP_API = 'https://api.prod.whoop.com/developer/v2'
+
+WHOOP_API = config.WHOOP_API_BASE
+
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'whoop_cache.json')
+
+# Endpoints paginados en paralelo por get_whoop_monthly_live
+MAX_CONCURRENCY = 3
+
+
+@st.cache_resource
+def _session():
+    """Pooled keep-alive session, reused across reruns and user sessions."""
+    return http_pool.get_session()
 
 
 def _get_tokens():
@@ -63,19 +82,20 @@ def _get_headers():
     return {'Authorization': f'Bearer {tokens["access_token"]}'}
 
 
-def _api_request(endpoint, params=None):
+def _api_request(endpoint, params=None, headers=None):
     """Make an API request. On 401 raise so the caller falls back to cache."""
     url = f"{WHOOP_API}/{endpoint}"
-    headers = _get_headers()
+    headers = headers or _get_headers()
 
-    response = requests.get(url, headers=headers, params=params, timeout=15)
+    response = rate_limit.get_scheduler('whoop').call(
+        metrics.http_call, 'whoop', endpoint, _session().get, url, headers=headers, params=params, timeout=15
+    )
     response.raise_for_status()
     return response.json()
 
 
-def _get_all_records(endpoint, start_date, end_date):
-    """Paginate through all records for a date range."""
-    all_records = []
+def _iter_records(endpoint, start_date, end_date, headers=None):
+    """Yield records page by page for a date range (no full list in memory)."""
     next_token = None
 
     params = {
@@ -88,20 +108,31 @@ def _get_all_records(endpoint, start_date, end_date):
         if next_token:
             params['nextToken'] = next_token
 
-        data = _api_request(endpoint, params=params)
+        data = _api_request(endpoint, params=params, headers=headers)
 
         if 'records' in data and data['records']:
-            all_records.extend(data['records'])
+            yield from data['records']
 
         if data.get('next_token'):
             next_token = data['next_token']
         else:
             break
 
-    return all_records
+
+def _get_records(endpoint, start_date, end_date, headers=None):
+    """Paginate through all records for a date range, parsing each page into
+    compact records (whoop_records) as it arrives."""
+    return list(map(whoop_records.parser(endpoint), _iter_records(endpoint, start_date, end_date, headers)))
+
+
+def _fold_records(endpoint, start_date, end_date, headers, aggregator):
+    parse = whoop_records.parser(endpoint)
+    for record in _iter_records(endpoint, start_date, end_date, headers):
+        aggregator.add(parse(record))
+    return aggregator
 
 
-def get_whoop_monthly_live(year, month):
+def get_whoop_monthly_live(year, month, max_concurrency=MAX_CONCURRENCY):
     """
     Fetch WHOOP monthly data live from API.
     Returns dict with same keys as whoop_cache.json entries.
@@ -124,111 +155,62 @@ def get_whoop_monthly_live(year, month):
         'live': True,
     }
 
-    # --- Sleep (exclude naps, only count valid scores) ---
-    sleeps = _get_all_records('activity/sleep', start_date, end_date)
-    if sleeps:
-        total_sleep_ms = 0
-        total_consistency = 0
-        valid_sleeps = 0
-
-        for sleep in sleeps:
-            if sleep.get('nap', False):
-                continue
-            if sleep.get('score') and sleep['score'].get('stage_summary'):
-                stages = sleep['score']['stage_summary']
-                valid_sleeps += 1
-                actual_sleep_ms = (
-                    stages.get('total_light_sleep_time_milli', 0) +
-                    stages.get('total_slow_wave_sleep_time_milli', 0) +
-                    stages.get('total_rem_sleep_time_milli', 0)
-                )
-                total_sleep_ms += actual_sleep_ms
-                total_consistency += sleep['score'].get('sleep_consistency_percentage', 0)
-
-        if valid_sleeps > 0:
-            result['sleep_hours_avg'] = round((total_sleep_ms / valid_sleeps) / 3600000, 2)
-            result['avg_sleep_consistency'] = round(total_consistency / valid_sleeps, 1)
-
-    # --- Recovery (only count records with valid scores) ---
-    recoveries = _get_all_records('recovery', start_date, end_date)
-    if recoveries:
-        total_recovery = 0
-        total_resting_hr = 0
-        rhr_count = 0
-        valid_recovery = 0
-
-        for rec in recoveries:
-            if rec.get('score') and rec['score'].get('recovery_score', 0) > 0:
-                valid_recovery += 1
-                total_recovery += rec['score'].get('recovery_score', 0)
-                rhr = rec['score'].get('resting_heart_rate', 0)
-                if rhr > 0:
-                    total_resting_hr += rhr
-                    rhr_count += 1
-
-        if valid_recovery > 0:
-            result['avg_recovery_score'] = round(total_recovery / valid_recovery, 1)
-        result['avg_resting_hr'] = round(total_resting_hr / rhr_count, 1) if rhr_count > 0 else 0
-
-    # --- HR Zones from workouts (zone_durations is in workouts, not cycles) ---
-    workouts = _get_all_records('activity/workout', start_date, end_date)
-    if workouts:
-        total_zone_1_3 = 0
-        total_zone_4_5 = 0
-
-        for workout in workouts:
-            if workout.get('score') and workout['score'].get('zone_durations'):
-                zones = workout['score']['zone_durations']
-                total_zone_1_3 += (
-                    zones.get('zone_one_milli', 0) +
-                    zones.get('zone_two_milli', 0) +
-                    zones.get('zone_three_milli', 0)
-                )
-                total_zone_4_5 += (
-                    zones.get('zone_four_milli', 0) +
-                    zones.get('zone_five_milli', 0)
-                )
-
-        result['hr_zones_1_3_hours'] = round(total_zone_1_3 / 3600000, 2)
-        result['hr_zones_4_5_hours'] = round(total_zone_4_5 / 3600000, 2)
-
-    # --- Dias con Meditacion / Sauna (por sport_name, fecha local) ---
-    if workouts:
-        meditation_dates = set()
-        sauna_dates = set()
-        for workout in workouts:
-            name = (workout.get('sport_name') or '').lower()
-            if 'meditation' not in name and 'sauna' not in name:
-                continue
-            start = workout.get('start', '')
-            if not start:
-                continue
-            utc_time = datetime.fromisoformat(start.replace('Z', '+00:00'))
-            tz = workout.get('timezone_offset') or '-06:00'
-            sign = -1 if tz.startswith('-') else 1
-            parts = tz.lstrip('+-').split(':')
-            offset = timedelta(hours=sign * int(parts[0]),
-                               minutes=sign * (int(parts[1]) if len(parts) > 1 else 0))
-            local_date = (utc_time + offset).date()
-            if local_date.year != year or local_date.month != month:
-                continue
-            if 'meditation' in name:
-                meditation_dates.add(local_date)
-            if 'sauna' in name:
-                sauna_dates.add(local_date)
-        result['meditation_days'] = len(meditation_dates)
-        result['sauna_days'] = len(sauna_dates)
+    # Headers se resuelven aquí (lee st.session_state); los threads del pool
+    # solo hacen HTTP.
+    headers = _get_headers()
+
+    # Los tres endpoints son independientes: se paginan en paralelo y cada
+    # página se pasa a columnas apenas llega (ver whoop_aggregates).
+    columns = whoop_aggregates.monthly_columns()
+    endpoints = {
+        'sleep': 'activity/sleep',
+        'recovery': 'recovery',
+        'workouts': 'activity/workout',
+    }
+    workers = max(1, min(max_concurrency, len(endpoints)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='whoop_live') as executor:
+        futures = [
+            executor.submit(_fold_records, endpoint, start_date, end_date, headers, columns[name])
+            for name, endpoint in endpoints.items()
+        ]
+        for future in as_completed(futures):
+            future.result()
+
+    summary = whoop_aggregates.summarize_month(columns, year, month)
+    result['sleep_hours_avg'] = round(summary['avg_sleep_hours'], 2)
+    result['avg_sleep_consistency'] = round(summary['avg_sleep_consistency'], 1)
+    result['avg_recovery_score'] = round(summary['avg_recovery_score'], 1)
+    result['avg_resting_hr'] = summary['avg_resting_hr']
+    result['hr_zones_1_3_hours'] = round(summary['hr_zones_1_3_hours'], 2)
+    result['hr_zones_4_5_hours'] = round(summary['hr_zones_4_5_hours'], 2)
+    result['meditation_days'] = summary['meditation_days']
+    result['sauna_days'] = summary['sauna_days']
 
     return result
 
 
 def load_whoop_cache():
-    """Load WHOOP data from local cache file (fallback)."""
-    cache_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'whoop_cache.json')
-    if os.path.exists(cache_path):
-        with open(cache_path, 'r') as f:
-            return json.load(f)
-    return {}
+    """Load WHOOP data from local cache file (fallback). Read-only (json_cache)."""
+    return json_cache.read_json(CACHE_FILE)
+
+
+def get_whoop_cached(year, month, cache=None):
+    """
+    Get WHOOP data from whoop_cache.json only (or from an already loaded cache).
+    Returns (data_dict, source_string).
+    """
+    cache_key = f"{year}-{month:02d}"
+    try:
+        if cache is None:
+            cache = load_whoop_cache()
+        if cache_key in cache:
+            print(f"[WHOOP] {cache_key} loaded from CACHE")
+            return cache[cache_key], f"CACHE ({cache[cache_key].get('synced_at', '?')})"
+    except Exception as e:
+        print(f"[WHOOP] Cache load failed: {e}")
+
+    print(f"[WHOOP] No data available for {cache_key}")
+    return None, "NO DATA"
 
 
 def get_whoop_data(year, month):
@@ -247,13 +229,4 @@ def get_whoop_data(year, month):
         print(f"[WHOOP] Live fetch failed for {cache_key}: {e}")
 
     # Fall back to cache
-    try:
-        cache = load_whoop_cache()
-        if cache_key in cache:
-            print(f"[WHOOP] {cache_key} loaded from CACHE")
-            return cache[cache_key], f"CACHE ({cache[cache_key].get('synced_at', '?')})"
-    except Exception as e:
-        print(f"[WHOOP] Cache load failed: {e}")
-
-    print(f"[WHOOP] No data available for {cache_key}")
-    return None, "NO DATA"
+    return get_whoop_cached(year, month)
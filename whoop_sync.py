@@ -3,46 +3,48 @@ WHOOP Local Sync - Corre este script en tu computadora local para bajar datos de
 
 Uso:
     python whoop_sync.py              # Sincroniza mes actual
-    python whoop_sync.py --all        # Sincroniza todos los meses del año
+    python whoop_sync.py --all        # Sincroniza los meses del año no asentados (1 paginación por endpoint)
+    python whoop_sync.py --all --force       # Igual, incluyendo los meses ya asentados (ver settlement)
+    python whoop_sync.py --all --per-month   # Igual, pero paginando mes por mes
+    python whoop_sync.py --all --store       # Sync incremental al store SQLite y resumen desde ahí
+    python whoop_sync.py --all --from-store  # Recalcula los meses desde el store, sin red
     python whoop_sync.py --month 1    # Sincroniza enero
     python whoop_sync.py --auth       # Re-autorizar (obtener nuevos tokens)
     python whoop_sync.py --sports     # Lista los sport_name de tus workouts del año
+    python whoop_sync.py --all --concurrency 2   # Máx. endpoints paginados en paralelo (default 3)
+    python whoop_sync.py --all --metrics prom [--metrics-file whoop.prom]   # Vuelca métricas (json | prom)
 
 Los datos se guardan en whoop_cache.json y el dashboard los lee de ahi.
+Si una paginación se corta, el mes queda marcado incomplete (no pisa una
+entrada buena) y el próximo run retoma desde whoop_checkpoints/.
 Esto resuelve el problema de que Streamlit Cloud no puede conectarse a WHOOP.
 """
 
-import json
 import sys
 import os
 from datetime import datetime
 from calendar import monthrange
 
+import json_cache
+import metrics
+import settlement
+
 CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'whoop_cache.json')
 
 
 def load_cache():
-    if os.path.exists(CACHE_FILE):
-        with open(CACHE_FILE, 'r') as f:
-            return json.load(f)
-    return {}
+    # Copia editable: el sync agrega / reemplaza entradas
+    return json_cache.thaw(json_cache.read_json(CACHE_FILE))
 
 
 def save_cache(cache):
-    with open(CACHE_FILE, 'w') as f:
-        json.dump(cache, f, indent=2)
+    json_cache.write_json_atomic(CACHE_FILE, cache, indent=2)
     print(f"\n>> Cache guardado en: {CACHE_FILE}")
 
 
-def sync_month(whoop, year, month, cache):
-    key = f"{year}-{month:02d}"
-    print(f"\n{'='*50}")
-    print(f"   Sincronizando {key}...")
-    print(f"{'='*50}")
-
-    summary = whoop.get_monthly_summary(year, month)
-
-    new_data = {
+def build_entry(summary, year, month):
+    """Entrada de whoop_cache.json a partir de un resumen mensual del cliente."""
+    entry = {
         'year': year,
         'month': month,
         'synced_at': datetime.now().isoformat(),
@@ -54,18 +56,32 @@ def sync_month(whoop, year, month, cache):
         'avg_recovery_score': round(summary.get('avg_recovery_score', 0), 1),
         'avg_resting_hr': round(summary.get('avg_resting_hr', 0), 1),
         'avg_sleep_consistency': round(summary.get('avg_sleep_consistency', 0), 1),
-        'num_sleeps': len(summary.get('sleep', [])),
-        'num_workouts': len(summary.get('workouts', [])),
+        'num_sleeps': summary.get('num_sleeps', 0),
+        'num_workouts': summary.get('num_workouts', 0),
         'meditation_days': summary.get('meditation_days', 0),
         'sauna_days': summary.get('sauna_days', 0),
     }
+    # Endpoints que no terminaron de paginar (ver store_entry)
+    if summary.get('incomplete'):
+        entry['incomplete'] = list(summary['incomplete'])
+    return entry
 
+
+def store_entry(cache, key, new_data):
+    """Guarda new_data en cache[key] salvo que venga vacío o incompleto y ya haya datos."""
     # Protect cache: don't overwrite existing data with empty results (API failure)
     if new_data['num_sleeps'] == 0 and new_data['avg_recovery_score'] == 0 and key in cache:
         print(f"\n   ⚠️  API devolvió datos vacíos para {key}. Manteniendo cache anterior.")
         print(f"   (Cache actual: {cache[key].get('num_sleeps', 0)} noches, synced {cache[key].get('synced_at', '?')})")
         return cache
+    # Paginación cortada en algún endpoint: solo reemplaza otra entrada incompleta
+    if new_data.get('incomplete') and key in cache and not cache[key].get('incomplete'):
+        print(f"\n   ⚠️  Datos incompletos para {key} ({', '.join(new_data['incomplete'])}). Manteniendo cache anterior.")
+        print("   (El próximo sync retoma la paginación desde el checkpoint)")
+        return cache
 
+    previous = cache.get(key)
+    new_data = settlement.mark(new_data, previous, 'num_sleeps')
     cache[key] = new_data
 
     d = cache[key]
@@ -77,10 +93,78 @@ def sync_month(whoop, year, month, cache):
     print(f"   Recovery avg:  {d['avg_recovery_score']}%")
     print(f"   Resting HR:    {d['avg_resting_hr']} bpm")
     print(f"   Sleep Consist: {d['avg_sleep_consistency']}%")
+    change = settlement.report_change(previous, d)
+    if change:
+        print(change)
 
     return cache
 
 
+def sync_month(whoop, year, month, cache):
+    key = f"{year}-{month:02d}"
+    print(f"\n{'='*50}")
+    print(f"   Sincronizando {key}...")
+    print(f"{'='*50}")
+
+    summary = whoop.get_monthly_summary(year, month)
+    return store_entry(cache, key, build_entry(summary, year, month))
+
+
+def sync_year(whoop, year, months, cache):
+    """Sincroniza varios meses paginando cada endpoint una sola vez para todo el rango.
+
+    Las entradas quedan iguales a las de sync_month mes a mes (salvo synced_at).
+    """
+    print(f"\n{'='*50}")
+    print(f"   Sincronizando {year}-{months[0]:02d} a {year}-{months[-1]:02d} (rango completo)...")
+    print(f"{'='*50}")
+
+    summaries = whoop.get_range_summaries(year, months)
+    for month in months:
+        key = f"{year}-{month:02d}"
+        print(f"\n   --- {key} ---")
+        cache = store_entry(cache, key, build_entry(summaries[month], year, month))
+    return cache
+
+
+def sync_months(whoop, year, months, cache):
+    """sync_year por cada tramo de meses consecutivos (sync_month si el tramo es de uno).
+
+    Con meses asentados salteados ([2, 6, 10]) no se pagina todo el rango entre medio.
+    El mes en curso va siempre en su propio tramo: un rango que termina en el
+    futuro no usa checkpoints, así que los meses cerrados se paginan aparte
+    para poder retomarlos si el run se corta.
+    """
+    now = datetime.now()
+    runs = []
+    for month in sorted(months):
+        is_open = (year, month) >= (now.year, now.month)
+        if runs and month == runs[-1][-1] + 1 and not is_open:
+            runs[-1].append(month)
+        else:
+            runs.append([month])
+    for run in runs:
+        if len(run) > 1:
+            cache = sync_year(whoop, year, run, cache)
+        else:
+            cache = sync_month(whoop, year, run[0], cache)
+    return cache
+
+
+def months_from_args(args, now):
+    """[(year, month)] según --all / --month N [--year Y] / mes actual."""
+    if '--all' in args:
+        return [(now.year, month) for month in range(1, now.month + 1)]
+    if '--month' in args:
+        idx = args.index('--month')
+        month = int(args[idx + 1])
+        year = now.year
+        if '--year' in args:
+            year = int(args[args.index('--year') + 1])
+        return [(year, month)]
+    return [(now.year, now.month)]
+
+
 def main():
     args = sys.argv[1:]
     now = datetime.now()
@@ -93,10 +177,25 @@ def main():
         print("\nTokens guardados. Ahora puedes sincronizar con: python whoop_sync.py")
         return
 
+    # Recalcular desde el store local: no necesita tokens ni red
+    if '--from-store' in args:
+        import whoop_store
+        cache = load_cache()
+        summaries = whoop_store.range_summaries(months_from_args(args, now))
+        for (year, month), summary in summaries.items():
+            cache = store_entry(cache, f"{year}-{month:02d}", build_entry(summary, year, month))
+        save_cache(cache)
+        return
+
     # Initialize WHOOP client
     try:
-        from whoop_client_v2_corrected import WhoopClientV2
-        whoop = WhoopClientV2()
+        from whoop_client_v2_corrected import WhoopClientV2, MAX_CONCURRENCY
+        max_concurrency = MAX_CONCURRENCY
+        if '--concurrency' in args:
+            c_idx = args.index('--concurrency')
+            if c_idx + 1 < len(args):
+                max_concurrency = int(args[c_idx + 1])
+        whoop = WhoopClientV2(max_concurrency=max_concurrency)
 
         # WHOOP rota el refresh token en cada refresh: si este run lo rota,
         # el secret WHOOP_TOKENS_JSON de GitHub queda inválido y el cron muere.
@@ -127,11 +226,11 @@ def main():
     # (útil para verificar cómo se llaman Meditación y Sauna en la API)
     if '--sports' in args:
         from collections import Counter
-        workouts = whoop.get_all_records(
-            'activity/workout', datetime(now.year, 1, 1), now
+        workouts = whoop.get_records(
+            'activity/workout', datetime(now.year, 1, 1), now, checkpoint=False
         )
         counts = Counter(
-            (w.get('sport_name') or f"sport_id={w.get('sport_id', '?')}")
+            (w.sport_name or f"sport_id={w.sport_id if w.sport_id is not None else '?'}")
             for w in workouts
         )
         print(f"\n   Actividades {now.year} ({len(workouts)} workouts):")
@@ -141,10 +240,31 @@ def main():
 
     cache = load_cache()
 
-    if '--all' in args:
-        # Sync all months of current year up to current month
-        for month in range(1, now.month + 1):
-            cache = sync_month(whoop, now.year, month, cache)
+    if '--store' in args:
+        import whoop_store
+        whoop_store.sync(whoop, full='--full' in args)
+        for year, month in months_from_args(args, now):
+            key = f"{year}-{month:02d}"
+            print(f"\n   --- {key} (desde store) ---")
+            cache = store_entry(cache, key, build_entry(whoop_store.month_summary(year, month), year, month))
+    elif '--all' in args:
+        # Sync all months of current year up to current month (menos los asentados)
+        months = settlement.pending_months(cache, now.year, range(1, now.month + 1), force='--force' in args)
+        from rate_limit import RateLimitError
+        if '--per-month' in args:
+            for month in months:
+                try:
+                    cache = sync_month(whoop, now.year, month, cache)
+                except RateLimitError as e:
+                    # Se guardan los meses ya completos; el resto queda para el próximo sync
+                    print(f"\n   ⚠️  {e}. Deteniendo en {now.year}-{month:02d}.")
+                    break
+        else:
+            try:
+                cache = sync_months(whoop, now.year, months, cache)
+            except RateLimitError as e:
+                # store_entry ya dejó en cache los tramos completos: se guardan igual
+                print(f"\n   ⚠️  {e}. Se guardan los meses ya sincronizados.")
     elif '--month' in args:
         idx = args.index('--month')
         if idx + 1 < len(args):
@@ -177,6 +297,12 @@ def main():
         print("   El secret de GitHub quedó desactualizado. Actualízalo con:")
         print('   gh secret set WHOOP_TOKENS_JSON --body "$(cat whoop_tokens.json)"')
 
+    import http_pool
+    import rate_limit
+    print(f"\n{http_pool.format_stats()}")
+    print(rate_limit.format_stats())
+    metrics.dump_from_args(args)
+
     print("\nListo! El dashboard usara estos datos automaticamente.")
 
 